@@ -1,11 +1,16 @@
 # тестовая cli допилить автоматическую настройку pip в global и сами команды
 
+import sys
+from pathlib import Path
+from typing import Optional
+
 import typer
 import subprocess
 
 app = typer.Typer()
 
 COMPOSE_FILE = "docker-compose.yml"
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
 
 
 def run(cmd):
@@ -36,5 +41,36 @@ def build(clean: bool = False):
     run(cmd)
 
 
+@app.command()
+def bench(
+    concurrency: str = typer.Option("1,4,16", help="Comma-separated concurrency levels."),
+    requests: int = typer.Option(200, help="Requests per endpoint and concurrency level."),
+    endpoints: str = typer.Option(
+        "edit,s3-file,thumbnail,files-list", help="Comma-separated endpoints to drive."
+    ),
+    megapixels: float = typer.Option(2.0, help="Size of the photo sent to /edit."),
+    s3: str = typer.Option("memory", help='"memory", "moto", or the URL of a local S3 server.'),
+    s3_latency_ms: float = typer.Option(0.0, help="Latency added to every in-memory S3 call."),
+    output: Optional[Path] = typer.Option(None, help="Write the report to this JSON file."),
+):
+    """
+    Load-tests the backend against a local S3 stand-in and a temporary
+    SQLite database, and reports throughput, p50/p95/p99 latency and error
+    rate per endpoint.
+    """
+    sys.path.insert(0, str(BACKEND_DIR))
+    from benchmarks.load_test import run_load_test
+
+    run_load_test(
+        [int(level) for level in concurrency.split(",")],
+        requests,
+        [name.strip() for name in endpoints.split(",")],
+        megapixels=megapixels,
+        s3=s3,
+        s3_latency_ms=s3_latency_ms,
+        output=output,
+    )
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,173 @@
+"""
+Memory-aware admission control for image processing.
+
+Before an image is decoded, its header is read and the peak memory of the
+operation is estimated from its dimensions, mode and parameters
+(`engine.estimate_memory`). The work is then admitted against one
+process-wide memory budget: it waits while the images already being
+processed would push the total over MEMORY_BUDGET_BYTES, for up to
+MEMORY_BUDGET_WAIT seconds, after which `MemoryBudgetExceeded` is raised
+and the endpoints answer 503 with Retry-After.
+
+Work estimated above the whole budget could never be admitted safely, so
+it is refused at once with `ImageTooLarge`, which the endpoints answer with
+a 413.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from PIL import UnidentifiedImageError
+
+from . import engine
+from .config import settings
+from .image_pool import image_pool
+
+
+class MemoryBudgetExceeded(Exception):
+    """
+    Raised when work doesn't fit in the memory budget within the wait limit.
+    """
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("The server is busy processing other images.")
+        self.retry_after = retry_after
+
+
+class ImageTooLarge(Exception):
+    """
+    Raised when work alone is estimated to need more than the whole budget.
+    """
+    def __init__(self, nbytes: int, max_bytes: int) -> None:
+        super().__init__(
+            f"Processing this image needs an estimated {nbytes // 2**20} MiB, "
+            f"more than the server's limit of {max_bytes // 2**20} MiB."
+        )
+        self.nbytes = nbytes
+        self.max_bytes = max_bytes
+
+
+class MemoryBudget:
+    """
+    A counting semaphore over bytes of estimated image memory.
+    """
+    def __init__(self, max_bytes: int, max_wait: float, retry_after: int = 5) -> None:
+        """
+        Initializes the MemoryBudget.
+
+        Args:
+            max_bytes (int): The budget in bytes, or 0 to admit everything.
+            max_wait (float): How long work may wait for the budget by
+                              default, in seconds.
+            retry_after (int): The Retry-After value, in seconds, given to
+                               clients whose work was turned away.
+        """
+        self.max_bytes = max_bytes
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.in_use = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def check(self, nbytes: int) -> None:
+        """
+        Checks that work of a given size could ever be admitted.
+
+        Args:
+            nbytes (int): The estimated memory of the work.
+
+        Raises:
+            ImageTooLarge: If `nbytes` is more than the whole budget.
+        """
+        if 0 < self.max_bytes < nbytes:
+            raise ImageTooLarge(nbytes, self.max_bytes)
+
+    @contextmanager
+    def reserve(self, nbytes: int, wait: float | None = None) -> Iterator[None]:
+        """
+        Holds `nbytes` of the budget for the duration of the block.
+
+        Args:
+            nbytes (int): The estimated memory of the work.
+            wait (float | None): How long to wait for the budget, in seconds;
+                                 None for the default, math.inf to wait for
+                                 as long as it takes.
+
+        Raises:
+            ImageTooLarge: If `nbytes` is more than the whole budget.
+            MemoryBudgetExceeded: If the budget didn't free up in time.
+        """
+        if self.max_bytes <= 0:
+            yield
+            return
+        self.check(nbytes)
+        deadline = time.monotonic() + (self.max_wait if wait is None else wait)
+        with self._condition:
+            self.waiting += 1
+            try:
+                while self.in_use + nbytes > self.max_bytes:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise MemoryBudgetExceeded(self.retry_after)
+                    self._condition.wait(None if math.isinf(remaining) else remaining)
+            finally:
+                self.waiting -= 1
+            self.in_use += nbytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_use -= nbytes
+                self._condition.notify_all()
+
+
+memory_budget = MemoryBudget(
+    settings.MEMORY_BUDGET_BYTES, settings.MEMORY_BUDGET_WAIT, settings.MEMORY_BUDGET_RETRY_AFTER
+)
+
+
+def check_admissible(operation: str, data: bytes, **params) -> None:
+    """
+    Refuses work that could never fit in the budget, without waiting.
+
+    Used to turn such work away before it is queued as a job. An image that
+    can't be read is left for the job itself to report.
+
+    Args:
+        operation (str): The name of the engine operation.
+        data (bytes): The encoded input image.
+        **params: The operation's parameters.
+
+    Raises:
+        ImageTooLarge: If the estimate is more than the whole budget.
+        Image.DecompressionBombError: If the image has far too many pixels.
+    """
+    try:
+        nbytes = engine.estimate_memory(data, operation, **params)
+    except UnidentifiedImageError:
+        return
+    memory_budget.check(nbytes)
+
+
+def run_admitted(operation: str, data: bytes, wait: float | None = None, **params) -> bytes:
+    """
+    Runs an engine operation on the image pool once it fits in the budget.
+
+    Args:
+        operation (str): The name of the engine operation.
+        data (bytes): The encoded input image.
+        wait (float | None): How long to wait for the budget, as for
+                             `MemoryBudget.reserve`.
+        **params: The operation's parameters.
+
+    Raises:
+        ImageTooLarge: If the estimate is more than the whole budget.
+        MemoryBudgetExceeded: If the budget didn't free up in time.
+        Image.DecompressionBombError: If the image has far too many pixels.
+
+    Returns:
+        bytes: The encoded result image.
+    """
+    with memory_budget.reserve(engine.estimate_memory(data, operation, **params), wait):
+        return image_pool.run(operation, data, **params)
@@ -22,6 +22,126 @@ class Settings(BaseSettings):
         ALLOWED_TYPES (list[str]): A list of allowed MIME types for file uploads.
         ORIGINS (list[str]): A list of allowed origins for CORS.
         S3_PUBLIC_URL (str): The public URL prefix for accessing S3 files.
+        DATABASE_URL (str): The SQLAlchemy URL of the database. The async
+            engine uses the matching async driver (aiosqlite, asyncpg or
+            aiomysql).
+        SQLITE_JOURNAL_MODE (str): The SQLite journal mode set on every
+            connection.
+        SQLITE_SYNCHRONOUS (str): The SQLite synchronous level set on every
+            connection.
+        SQLITE_BUSY_TIMEOUT_MS (int): How long SQLite waits for a lock
+            before failing, in milliseconds.
+        DB_POOL_SIZE (int): The number of pooled database connections.
+        DB_MAX_OVERFLOW (int): The number of connections allowed above the
+            pool size.
+        DB_POOL_TIMEOUT (float): How long to wait for a free pooled
+            connection, in seconds.
+        DB_WRITE_BEHIND (bool): Whether ProcessedImage rows are queued and
+            written in periodic group commits instead of per request.
+        DB_WRITE_BEHIND_INTERVAL (float): The maximum time in seconds a
+            queued row waits before it is committed.
+        DB_WRITE_BEHIND_BATCH (int): The number of queued rows that triggers
+            an early commit.
+        FRAME_CACHE_MAX_BYTES (int): The memory budget in bytes for decoded
+            and resized frames kept by the frame cache.
+        FRAME_CACHE_RESIZE_ADMIT_AFTER (int): How many times a frame must be
+            requested at the same size before that resize is cached.
+        S3_MAX_POOL_CONNECTIONS (int): The size of the shared S3 client's
+            HTTP connection pool.
+        S3_CONNECT_TIMEOUT (float): The S3 connection timeout in seconds.
+        S3_READ_TIMEOUT (float): The S3 read timeout in seconds.
+        S3_TCP_KEEPALIVE (bool): Whether to enable TCP keep-alive on S3
+            connections.
+        S3_RETRY_MODE (str): The botocore retry mode ("legacy", "standard"
+            or "adaptive").
+        S3_MAX_ATTEMPTS (int): The maximum number of attempts per S3 call.
+        S3_MULTIPART_THRESHOLD (int): The object size in bytes above which
+            uploads switch to S3 multipart upload.
+        S3_MULTIPART_CHUNKSIZE (int): The multipart part size in bytes.
+        S3_MULTIPART_CONCURRENCY (int): The number of parts uploaded in
+            parallel.
+        S3_IO_WORKERS (int): The size of the thread pool that runs blocking
+            S3 calls for the async endpoints.
+        S3_DOWNLOAD_CHUNK_SIZE (int): The chunk size in bytes used when
+            streaming downloads.
+        S3_PRESIGN_ENDPOINT (str): The S3 endpoint written into presigned
+            URLs, if clients reach the bucket at another address than the
+            server does; defaults to ENDPOINT.
+        S3_PRESIGN_UPLOAD_EXPIRES (int): How long presigned upload URLs are
+            valid, in seconds.
+        S3_REDIRECT_DOWNLOADS (bool): Whether /s3/file answers with a 302 to
+            a presigned S3 URL instead of proxying the object.
+        S3_REDIRECT_EXPIRES (int): How long the presigned download URLs of
+            those redirects are valid, in seconds.
+        IMMUTABLE_CACHE_CONTROL (str): The Cache-Control header sent with
+            UUID-named outputs, which are never rewritten.
+        IMAGE_WORKERS (int): The number of worker processes for image
+            transforms, or 0 to run them inline in the request thread.
+        IMAGE_POOL_START_METHOD (str): The multiprocessing start method for
+            the image workers.
+        MAX_OUTPUT_WIDTH (int): The server-side cap on the width of edit
+            results, or 0 for no cap.
+        MAX_OUTPUT_HEIGHT (int): The server-side cap on the height of edit
+            results, or 0 for no cap.
+        DEFAULT_OUTPUT_FORMAT (str): The output format used when the client
+            asks for none ("jpeg", "webp" or "avif").
+        JPEG_QUALITY (int): The JPEG encoder quality.
+        JPEG_OPTIMIZE (bool): Whether to optimize JPEG Huffman tables.
+        JPEG_PROGRESSIVE (bool): Whether to write progressive JPEGs. Either
+            this or JPEG_OPTIMIZE makes the encoder buffer the whole image's
+            DCT coefficients and take a second pass: on a 24 MP photo with a
+            1.3 white background that is about +185 ms and +115 MiB peak
+            memory per encode (317 ms / +206 MiB against 132 ms / +91 MiB
+            with both off).
+        WEBP_QUALITY (int): The WebP encoder quality.
+        WEBP_METHOD (int): The WebP encoder effort, from 0 (fast) to 6.
+        AVIF_QUALITY (int): The AVIF encoder quality.
+        AVIF_SPEED (int): The AVIF encoder speed, from 0 (slow) to 10.
+        S3_LIST_PAGE_SIZE (int): The default number of keys per page of
+            /s3/list.
+        FILES_LIST_PAGE_SIZE (int): The default number of records per page
+            of /files/list.
+        EDIT_MAX_FILE_SIZE (int): The largest image, in bytes, accepted by
+            the edit endpoints.
+        BATCH_MAX_FILES (int): The maximum number of files per batch request.
+        BATCH_MAX_BYTES (int): The largest request body, in bytes, accepted
+            by the batch endpoint. Every file of a batch is held in memory
+            at once.
+        BATCH_CONCURRENCY (int): The number of images of a batch processed
+            at the same time.
+        JOB_WORKERS (int): The number of threads that run queued edit jobs.
+        JOB_MAX_PENDING (int): The number of queued edit jobs above which new
+            submissions are refused with 503.
+        JOB_POLL_INTERVAL (float): How often, in seconds, idle job workers and
+            long-polling clients re-check the job table.
+        JOB_MAX_WAIT (float): The longest a client may long-poll a job, in
+            seconds. Kept below the proxy timeout.
+        JOB_SPOOL_DIR (str): The directory holding the uploads of queued jobs.
+        THUMBNAIL_SIZES (list[int]): The widths and heights that may be
+            requested from /s3/file; any other size is refused.
+        DERIVATIVE_PREFIX (str): The S3 key prefix resized derivatives are
+            stored under.
+        OBJECT_CACHE_MEMORY_BYTES (int): The memory budget in bytes of the
+            /s3/file object cache.
+        OBJECT_CACHE_MEMORY_MAX_OBJECT_BYTES (int): The largest object kept
+            in memory; larger ones are cached on disk.
+        OBJECT_CACHE_DIR (str): The directory of the object cache's disk tier.
+        OBJECT_CACHE_DISK_BYTES (int): The disk budget in bytes of the object
+            cache, or 0 to disable the disk tier.
+        OBJECT_CACHE_MAX_OBJECT_BYTES (int): The largest object cached at all.
+        METRICS_ENABLED (bool): Whether to collect request metrics and serve
+            them in the Prometheus format at /metrics.
+        MEMORY_BUDGET_BYTES (int): The estimated image memory that may be in
+            use at once across all requests, or 0 for no limit.
+        MEMORY_BUDGET_WAIT (float): How long an image waits for the memory
+            budget, in seconds, before the request gets a 503.
+        MEMORY_BUDGET_RETRY_AFTER (int): The Retry-After value of that 503.
+        PROFILE_SECRET (str): The X-Profile-Token value that runs a request
+            under cProfile and tracemalloc, or "" to disable profiling.
+        PROFILE_DIR (str): The directory profiling reports are saved to.
+        PROFILE_TOP_FUNCTIONS (int): The number of functions in a report.
+        PROFILE_TOP_ALLOCATIONS (int): The number of allocation sites in a
+            report.
     """
     BUCKET_NAME: str = ""
     ENDPOINT: str = ""
@@ -36,6 +156,72 @@ class Settings(BaseSettings):
         "https://image-framer-united.onrender.com",
     ]
     S3_PUBLIC_URL: str = "/s3/file"
+    DATABASE_URL: str = "sqlite:///./sql_app.db"
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_WRITE_BEHIND: bool = False
+    DB_WRITE_BEHIND_INTERVAL: float = 0.5
+    DB_WRITE_BEHIND_BATCH: int = 100
+    FRAME_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    FRAME_CACHE_RESIZE_ADMIT_AFTER: int = 2
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_CONNECT_TIMEOUT: float = 5.0
+    S3_READ_TIMEOUT: float = 60.0
+    S3_TCP_KEEPALIVE: bool = True
+    S3_RETRY_MODE: str = "standard"
+    S3_MAX_ATTEMPTS: int = 3
+    S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNKSIZE: int = 8 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY: int = 4
+    S3_IO_WORKERS: int = 16
+    S3_DOWNLOAD_CHUNK_SIZE: int = 64 * 1024
+    S3_PRESIGN_ENDPOINT: str = ""
+    S3_PRESIGN_UPLOAD_EXPIRES: int = 900
+    S3_REDIRECT_DOWNLOADS: bool = False
+    S3_REDIRECT_EXPIRES: int = 300
+    IMMUTABLE_CACHE_CONTROL: str = "public, max-age=31536000, immutable"
+    IMAGE_WORKERS: int = 0
+    IMAGE_POOL_START_METHOD: str = "spawn"
+    MAX_OUTPUT_WIDTH: int = 0
+    MAX_OUTPUT_HEIGHT: int = 0
+    DEFAULT_OUTPUT_FORMAT: str = "jpeg"
+    JPEG_QUALITY: int = 75
+    JPEG_OPTIMIZE: bool = True
+    JPEG_PROGRESSIVE: bool = True
+    WEBP_QUALITY: int = 80
+    WEBP_METHOD: int = 4
+    AVIF_QUALITY: int = 60
+    AVIF_SPEED: int = 6
+    S3_LIST_PAGE_SIZE: int = 100
+    FILES_LIST_PAGE_SIZE: int = 100
+    EDIT_MAX_FILE_SIZE: int = 32 * 1024 * 1024
+    BATCH_MAX_FILES: int = 100
+    BATCH_MAX_BYTES: int = 128 * 1024 * 1024
+    BATCH_CONCURRENCY: int = 4
+    JOB_WORKERS: int = 2
+    JOB_MAX_PENDING: int = 100
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_MAX_WAIT: float = 30.0
+    JOB_SPOOL_DIR: str = "job_spool"
+    THUMBNAIL_SIZES: list[int] = [64, 128, 256, 320, 480, 640, 960, 1280, 1920]
+    DERIVATIVE_PREFIX: str = "derived/"
+    OBJECT_CACHE_MEMORY_BYTES: int = 64 * 1024 * 1024
+    OBJECT_CACHE_MEMORY_MAX_OBJECT_BYTES: int = 256 * 1024
+    OBJECT_CACHE_DIR: str = "object_cache"
+    OBJECT_CACHE_DISK_BYTES: int = 1024 * 1024 * 1024
+    OBJECT_CACHE_MAX_OBJECT_BYTES: int = 32 * 1024 * 1024
+    METRICS_ENABLED: bool = True
+    MEMORY_BUDGET_BYTES: int = 1024 * 1024 * 1024
+    MEMORY_BUDGET_WAIT: float = 10.0
+    MEMORY_BUDGET_RETRY_AFTER: int = 5
+    PROFILE_SECRET: str = ""
+    PROFILE_DIR: str = "profiles"
+    PROFILE_TOP_FUNCTIONS: int = 40
+    PROFILE_TOP_ALLOCATIONS: int = 25
 
     # model_config = SettingsConfigDict(
     #     env_file=os.path.join(os.path.dirname(
@@ -2,25 +2,168 @@
 """
 Database configuration and session management for the application.
 
-This module sets up the SQLAlchemy engine and session management for the SQLite database.
-It provides a dependency `get_db` to get a database session.
+This module sets up the SQLAlchemy engines and session management for the
+database. It provides a dependency `get_db` for a synchronous session, used
+by the sync routes, and `get_async_db` for an `AsyncSession`, used by async
+routes so that database I/O doesn't block the event loop.
+
+`create_all` only creates missing tables, so `upgrade_schema` also adds the
+columns and indexes that were added to existing tables since the database
+was created.
 """
-from sqlalchemy import create_engine
+from sqlalchemy import MetaData, create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateColumn
 
+from . import metrics
+from .config import settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
 
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Async drivers used for each database backend.
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    Returns the async-driver version of a synchronous database URL.
+
+    Args:
+        url (str): The database URL, e.g. "sqlite:///./sql_app.db".
+
+    Returns:
+        str: The same URL using the async driver of its backend, e.g.
+             "sqlite+aiosqlite:///./sql_app.db".
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or parsed.get_driver_name() == driver:
+        return url
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(
+        hide_password=False
+    )
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def engine_options(url: str) -> dict:
+    """
+    Returns the create_engine options for a database URL.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        dict: The connect_args and connection pool options.
+    """
+    options = {}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if make_url(url).database in (None, "", ":memory:"):
+            # In-memory databases use a single-connection pool.
+            return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=not _is_sqlite(url),
+    )
+    return options
+
+
+def configure_sqlite(sync_engine: Engine) -> None:
+    """
+    Sets the journal mode, synchronous level and busy timeout on every new
+    SQLite connection of an engine.
+
+    WAL lets readers run alongside the single writer, and synchronous=NORMAL
+    only syncs at checkpoints instead of on every commit.
+
+    Args:
+        sync_engine (Engine): The engine, or the sync_engine of an async one.
+    """
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+
+
+def upgrade_schema(bind: Engine, metadata: MetaData) -> None:
+    """
+    Creates missing tables, and adds missing columns and indexes to the
+    tables that already exist.
+
+    Added columns must be nullable, since existing rows get NULL; anything
+    else needs a hand-written migration.
+
+    Args:
+        bind (Engine): The engine of the database to upgrade.
+        metadata (MetaData): The metadata of the models.
+
+    Raises:
+        RuntimeError: If a missing column is not nullable.
+    """
+    existing = set(inspect(bind).get_table_names())
+    metadata.create_all(bind=bind)
+    with bind.begin() as connection:
+        inspector = inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        for table in metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(
+                        f"Cannot add non-nullable column {table.name}.{column.name}; "
+                        "migrate the database by hand."
+                    )
+                ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(
+                    text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+                )
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    async_database_url(SQLALCHEMY_DATABASE_URL),
+    **engine_options(SQLALCHEMY_DATABASE_URL),
+)
+
+if _is_sqlite(SQLALCHEMY_DATABASE_URL):
+    configure_sqlite(engine)
+    configure_sqlite(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
+)
+
 Base = declarative_base()
 
+metrics.instrument_sessions(Session)
+
 Base.metadata.create_all(bind=engine)
 
 
@@ -39,3 +182,29 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependency to get an async database session.
+
+    Yields a new `AsyncSession` for each request and closes it afterward.
+
+    Yields:
+        AsyncSession: A new SQLAlchemy async session.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_session_factory():
+    """
+    Dependency to get the session factory itself.
+
+    Used by streaming responses, whose body runs after the request's
+    dependencies have been closed, so they open and close their own session.
+
+    Returns:
+        sessionmaker: The factory of new SQLAlchemy sessions.
+    """
+    return SessionLocal
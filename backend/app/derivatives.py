@@ -0,0 +1,116 @@
+"""
+Naming and generation bookkeeping for resized derivatives of S3 objects.
+
+A derivative (thumbnail, preview, format conversion) is generated once, on
+first request, and stored next to its original under a deterministic key,
+so every later request is a plain S3 read. Originals are stored under
+UUID or content-hash names and never rewritten, so a derivative never goes
+stale.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from .config import settings
+from .engine import OUTPUT_FORMATS
+
+FITS = ("contain", "cover")
+
+
+class SourceRejected(Exception):
+    """
+    Raised when an original can't be made into a derivative, e.g. because
+    it is not an image.
+    """
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def derived_key(
+    file_key: str,
+    width: int | None,
+    height: int | None,
+    fit: str,
+    output_format: str,
+) -> str:
+    """
+    Returns the S3 key a derivative of an object is stored under.
+
+    Args:
+        file_key (str): The key of the original object.
+        width (int | None): The box width, or None.
+        height (int | None): The box height, or None.
+        fit (str): "contain" or "cover".
+        output_format (str): The output format name.
+
+    Returns:
+        str: The derived key, e.g. "derived/<file_key>/w256-h0-contain.webp".
+    """
+    extension = OUTPUT_FORMATS[output_format].extension
+    return (
+        f"{settings.DERIVATIVE_PREFIX}{file_key}/"
+        f"w{width or 0}-h{height or 0}-{fit}{extension}"
+    )
+
+
+def default_format(file_key: str) -> str:
+    """
+    Picks the output format of a derivative from its original's extension.
+
+    Args:
+        file_key (str): The key of the original object.
+
+    Returns:
+        str: The matching output format, or DEFAULT_OUTPUT_FORMAT when the
+             original is not in one of the output formats.
+    """
+    extension = os.path.splitext(file_key)[1].lower()
+    if extension == ".jpeg":
+        return "jpeg"
+    for name, output_format in OUTPUT_FORMATS.items():
+        if output_format.extension == extension:
+            return name
+    return settings.DEFAULT_OUTPUT_FORMAT
+
+
+class SingleFlight:
+    """
+    Per-key async locks, so that concurrent requests for the same derivative
+    wait for one generation instead of each running their own.
+    """
+    def __init__(self) -> None:
+        """
+        Initializes the SingleFlight.
+        """
+        self._locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[None]:
+        """
+        Holds the lock of a key; locks are dropped once nobody waits on them.
+
+        Args:
+            key (str): The key to lock, e.g. a derived key.
+        """
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+derivative_locks = SingleFlight()
@@ -0,0 +1,492 @@
+"""
+Pure image transforms used by the edit endpoints.
+
+Every function here takes the encoded input image as bytes and returns the
+encoded result as bytes, with no access to the database, S3 or the request,
+so the same code can run inline or inside a worker process of the image pool.
+"""
+import io
+import math
+import time
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+
+from PIL import Image, ImageOps, features
+
+from .config import settings
+from .frame_cache import frame_cache
+
+
+class OutputFormat(NamedTuple):
+    """
+    An output format the engine can encode.
+
+    Attributes:
+        pil_format (str): The Pillow format name.
+        content_type (str): The MIME type stored on the S3 object.
+        extension (str): The file extension of the saved object.
+    """
+    pil_format: str
+    content_type: str
+    extension: str
+
+
+OUTPUT_FORMATS = {
+    "jpeg": OutputFormat("JPEG", "image/jpeg", ".jpg"),
+    "webp": OutputFormat("WEBP", "image/webp", ".webp"),
+    "avif": OutputFormat("AVIF", "image/avif", ".avif"),
+}
+
+JPEG_CONTENT_TYPE = OUTPUT_FORMATS["jpeg"].content_type
+
+
+@contextmanager
+def _timed(timings: dict | None, stage: str) -> Iterator[None]:
+    """
+    Adds the time spent in the block to `timings[stage]`, in seconds.
+
+    Args:
+        timings (dict | None): The per-stage timings, or None to skip timing.
+        stage (str): The stage name.
+    """
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def available_formats() -> list[str]:
+    """
+    Returns the output formats supported by the installed Pillow build.
+
+    Returns:
+        list[str]: The supported format names.
+    """
+    return [
+        name for name in OUTPUT_FORMATS
+        if name == "jpeg" or features.check(name)
+    ]
+
+
+def encoder_options(output_format: str) -> dict:
+    """
+    Returns the Pillow save options for an output format, from settings.
+
+    Args:
+        output_format (str): The output format name.
+
+    Returns:
+        dict: The keyword arguments for `Image.save`.
+    """
+    if output_format == "webp":
+        return {"quality": settings.WEBP_QUALITY, "method": settings.WEBP_METHOD}
+    if output_format == "avif":
+        return {"quality": settings.AVIF_QUALITY, "speed": settings.AVIF_SPEED}
+    return {
+        "quality": settings.JPEG_QUALITY,
+        "optimize": settings.JPEG_OPTIMIZE,
+        "progressive": settings.JPEG_PROGRESSIVE,
+    }
+
+
+def encode(image: Image.Image, output_format: str = "jpeg") -> bytes:
+    """
+    Encodes an image in the given output format.
+
+    Args:
+        image (Image.Image): The image to encode.
+        output_format (str): The output format name.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        format=OUTPUT_FORMATS[output_format].pil_format,
+        **encoder_options(output_format),
+    )
+    return buffer.getvalue()
+
+
+# Modes that reduce() can't work on; thumbnail() shrinks these itself.
+_NO_REDUCE_MODES = ("1", "P")
+
+
+def _to_8bit(image: Image.Image) -> Image.Image:
+    """
+    Converts a 16- or 32-bit integer greyscale image to 8-bit "L".
+
+    Pillow's own conversion clips these values at 255 instead of scaling
+    them, and reduce() and thumbnail() refuse the 16-bit modes. 16-bit
+    images are scaled from their full range; 32-bit ones only if their
+    values go above 255.
+
+    Args:
+        image (Image.Image): An image in an "I" or "I;16" mode.
+
+    Returns:
+        Image.Image: The image in mode "L".
+    """
+    if image.mode.startswith("I;16") or image.getextrema()[1] > 255:
+        image = image.convert("I").point(lambda value: value / 256)
+    return image.convert("L")
+
+
+def open_image(
+    data: bytes,
+    max_width: int | None = None,
+    max_height: int | None = None,
+    scale: float = 1.0,
+) -> Image.Image:
+    """
+    Decodes an image, shrinking it during decode when it exceeds a size limit.
+
+    The limits apply to the final output, which is `scale` times the input
+    size. JPEGs are downscaled in the DCT domain through draft mode, other
+    formats with `reduce()`, so the full-resolution pixels are never held in
+    memory; a final resize then fits the image exactly inside the limits.
+    16- and 32-bit integer images are converted to 8-bit greyscale first.
+
+    Args:
+        data (bytes): The encoded input image.
+        max_width (int | None): The maximum output width, or None.
+        max_height (int | None): The maximum output height, or None.
+        scale (float): The ratio of output size to input size.
+
+    Returns:
+        Image.Image: The decoded, possibly reduced, image.
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.mode == "I" or image.mode.startswith("I;16"):
+        image = _to_8bit(image)
+    if not max_width and not max_height:
+        return image
+
+    target_width = max(int(max_width / scale), 1) if max_width else image.width
+    target_height = max(int(max_height / scale), 1) if max_height else image.height
+    if image.width <= target_width and image.height <= target_height:
+        return image
+
+    if image.format == "JPEG":
+        image.draft(image.mode, (target_width, target_height))
+    else:
+        factor = int(min(image.width / target_width, image.height / target_height))
+        if factor >= 2 and image.mode not in _NO_REDUCE_MODES:
+            image = image.reduce(factor)
+
+    if image.width > target_width or image.height > target_height:
+        image.thumbnail((target_width, target_height), Image.Resampling.LANCZOS)
+    return image
+
+
+# Bytes per pixel of the decoded image, by Pillow mode.
+BYTES_PER_PIXEL = {
+    "1": 1, "L": 1, "P": 1, "LA": 2, "PA": 2, "La": 2, "I;16": 2,
+    "RGB": 3, "YCbCr": 3, "LAB": 3, "HSV": 3,
+    "RGBA": 4, "RGBa": 4, "RGBX": 4, "CMYK": 4, "I": 4, "F": 4,
+}
+
+
+def estimate_memory(
+    data: bytes,
+    operation: str,
+    max_width: int | None = None,
+    max_height: int | None = None,
+    bg_coefficient: float = 1.0,
+    width: int | None = None,
+    height: int | None = None,
+    fit: str = "contain",
+    output_format: str = "jpeg",
+    **params,
+) -> int:
+    """
+    Estimates the peak memory of an engine operation from the image header.
+
+    Only the header is parsed; no pixels are decoded. The estimate counts
+    the decoded input, the intermediate RGBA images, the result and the
+    encoder's own buffers, so it errs on the high side. JPEGs shrunk by
+    draft mode are assumed to decode at up to twice the target size in each
+    direction; other formats decode at full size before they are reduced.
+
+    Args:
+        data (bytes): The encoded input image.
+        operation (str): The name of the engine operation.
+        max_width (int | None): The maximum output width, or None.
+        max_height (int | None): The maximum output height, or None.
+        bg_coefficient (float): The background coefficient of "add-white-bg".
+        width (int | None): The box width of "resize".
+        height (int | None): The box height of "resize".
+        fit (str): The fit of "resize".
+        output_format (str): The output format name.
+        **params: The operation's other parameters, which don't affect memory.
+
+    Raises:
+        Image.DecompressionBombError: If the image has far too many pixels.
+
+    Returns:
+        int: The estimated peak memory in bytes.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        source_width, source_height = image.size
+        bytes_per_pixel = BYTES_PER_PIXEL.get(image.mode, 4)
+        is_jpeg = image.format == "JPEG"
+
+    scale = bg_coefficient if operation == "add-white-bg" else 1.0
+    if operation == "resize":
+        max_width, max_height = width, height
+    ratios = [1.0]
+    if max_width:
+        ratios.append(max_width / scale / source_width)
+    if max_height:
+        ratios.append(max_height / scale / source_height)
+    if operation == "resize" and fit == "cover" and width and height:
+        ratio = min(1.0, max(width / source_width, height / source_height))
+    else:
+        ratio = min(ratios)
+    reduced_pixels = source_width * source_height * ratio * ratio
+
+    source_pixels = source_width * source_height
+    if is_jpeg and ratio < 1.0:
+        source_pixels = min(source_pixels, 4 * reduced_pixels)
+    decoded = source_pixels * bytes_per_pixel
+
+    output_pixels = reduced_pixels
+    if operation == "add-white-bg":
+        # RGBA copy of the input, then an RGBA canvas and its RGB conversion.
+        output_pixels = reduced_pixels * scale * scale
+        working = reduced_pixels * 4 + output_pixels * (4 + 3)
+    elif operation == "add-frame":
+        # RGBA input, resized frame, composite and RGB conversion.
+        working = reduced_pixels * (4 + 4 + 4 + 3)
+    else:
+        working = reduced_pixels * (4 + 4)
+    encoder = output_pixels * _encoder_bytes_per_pixel(output_format)
+    return int(len(data) + decoded + working + encoder)
+
+
+def _encoder_bytes_per_pixel(output_format: str) -> int:
+    """
+    The memory a buffering encoder holds per output pixel.
+
+    Progressive or optimized JPEG makes libjpeg keep the DCT coefficients of
+    the whole image, 2 bytes per sample or 3 per pixel with the default
+    4:2:0 subsampling, and Pillow then sizes its output buffer at one byte
+    per pixel, two from quality 95. Baseline JPEG streams and holds neither.
+    """
+    if output_format != "jpeg":
+        return 0
+    options = encoder_options(output_format)
+    if not (options["optimize"] or options["progressive"]):
+        return 0
+    return 3 + (2 if options["quality"] >= 95 else 1)
+
+
+def has_transparency(image: Image.Image) -> bool:
+    """
+    Checks whether an image has any pixel that is not fully opaque.
+
+    Args:
+        image (Image.Image): The image to check.
+
+    Returns:
+        bool: True if the image has a transparency key or an alpha channel
+              with at least one non-opaque pixel.
+    """
+    if "transparency" in image.info:
+        return True
+    if "A" in image.getbands() or image.mode == "PA":
+        return image.getchannel("A").getextrema()[0] < 255
+    return False
+
+
+def add_white_bg(
+    data: bytes,
+    bg_coefficient: float,
+    max_width: int | None = None,
+    max_height: int | None = None,
+    output_format: str = "jpeg",
+    timings: dict | None = None,
+) -> bytes:
+    """
+    Places an image in the centre of a larger white background.
+
+    Opaque inputs, which covers every JPEG, are pasted straight onto an RGB
+    canvas. The RGBA canvas and alpha-masked paste are only used when the
+    image really has transparency.
+
+    Args:
+        data (bytes): The encoded input image.
+        bg_coefficient (float): The size of the background relative to the
+                                image size.
+        max_width (int | None): The maximum output width, or None.
+        max_height (int | None): The maximum output height, or None.
+        output_format (str): The output format name.
+        timings (dict | None): If given, receives the seconds spent in the
+                               "decode", "composite" and "encode" stages.
+
+    Returns:
+        bytes: The encoded result.
+    """
+    with _timed(timings, "decode"):
+        user_image = open_image(data, max_width, max_height, scale=bg_coefficient)
+        user_image.load()
+    with _timed(timings, "composite"):
+        result = white_bg_composite(user_image, bg_coefficient)
+    with _timed(timings, "encode"):
+        return encode(result, output_format)
+
+
+def white_bg_composite(user_image: Image.Image, bg_coefficient: float) -> Image.Image:
+    """
+    The compositing step of `add_white_bg`, on an already decoded image.
+
+    Args:
+        user_image (Image.Image): The decoded input image.
+        bg_coefficient (float): The size of the background relative to the
+                                image size.
+
+    Returns:
+        Image.Image: The RGB result, ready to encode.
+    """
+    new_width = int(user_image.width * bg_coefficient)
+    new_height = int(user_image.height * bg_coefficient)
+    paste_x = (new_width - user_image.width) // 2
+    paste_y = (new_height - user_image.height) // 2
+
+    if not has_transparency(user_image):
+        if user_image.mode != "RGB":
+            user_image = user_image.convert("RGB")
+        background = Image.new("RGB", (new_width, new_height), "WHITE")
+        background.paste(user_image, (paste_x, paste_y))
+        return background
+
+    user_image = user_image.convert("RGBA")
+    background = Image.new("RGBA", (new_width, new_height), "WHITE")
+    background.paste(user_image, (paste_x, paste_y), user_image)
+    return background.convert("RGB")
+
+
+def add_frame(
+    data: bytes,
+    frame_name: str,
+    max_width: int | None = None,
+    max_height: int | None = None,
+    output_format: str = "jpeg",
+    timings: dict | None = None,
+) -> bytes:
+    """
+    Overlays an image with a frame resized to the image size.
+
+    Args:
+        data (bytes): The encoded input image.
+        frame_name (str): The name of the frame file in the frames directory.
+        max_width (int | None): The maximum output width, or None.
+        max_height (int | None): The maximum output height, or None.
+        output_format (str): The output format name.
+        timings (dict | None): If given, receives the seconds spent in the
+                               "decode", "composite" and "encode" stages.
+
+    Returns:
+        bytes: The encoded result.
+    """
+    with _timed(timings, "decode"):
+        user_image = open_image(data, max_width, max_height)
+        user_image.load()
+    with _timed(timings, "composite"):
+        result = frame_composite(user_image, frame_name)
+    with _timed(timings, "encode"):
+        return encode(result, output_format)
+
+
+def frame_composite(user_image: Image.Image, frame_name: str) -> Image.Image:
+    """
+    The compositing step of `add_frame`, on an already decoded image.
+
+    Args:
+        user_image (Image.Image): The decoded input image.
+        frame_name (str): The name of the frame file in the frames directory.
+
+    Returns:
+        Image.Image: The RGB result, ready to encode.
+    """
+    user_image = user_image.convert("RGBA")
+    frame_image = frame_cache.get(frame_name, user_image.size)
+    return Image.alpha_composite(user_image, frame_image).convert("RGB")
+
+
+def resize(
+    data: bytes,
+    width: int | None = None,
+    height: int | None = None,
+    fit: str = "contain",
+    output_format: str = "jpeg",
+    timings: dict | None = None,
+) -> bytes:
+    """
+    Makes a resized derivative of an image, such as a gallery thumbnail.
+
+    With fit="contain" the image is shrunk to fit inside the box, keeping
+    its aspect ratio. With fit="cover" it is shrunk to fill the box and the
+    overflow is cropped around the centre, so the result is exactly
+    width x height. Images are never enlarged to fit inside a box.
+
+    Args:
+        data (bytes): The encoded input image.
+        width (int | None): The box width, or None for no limit.
+        height (int | None): The box height, or None for no limit.
+        fit (str): "contain" or "cover"; "cover" needs both dimensions.
+        output_format (str): The output format name.
+        timings (dict | None): If given, receives the seconds spent in the
+                               "decode", "composite" (the cover crop and
+                               flattening) and "encode" stages.
+
+    Returns:
+        bytes: The encoded derivative.
+    """
+    with _timed(timings, "decode"):
+        if fit == "cover" and width and height:
+            with Image.open(io.BytesIO(data)) as probe:
+                source_width, source_height = probe.size
+            scale = max(width / source_width, height / source_height)
+            image = open_image(
+                data, math.ceil(source_width * scale), math.ceil(source_height * scale)
+            )
+        else:
+            image = open_image(data, width, height)
+        image.load()
+    with _timed(timings, "composite"):
+        image = _fit_for_output(image, width, height, fit, output_format)
+    with _timed(timings, "encode"):
+        return encode(image, output_format)
+
+
+def _fit_for_output(
+    image: Image.Image, width: int | None, height: int | None, fit: str, output_format: str
+) -> Image.Image:
+    """
+    The compositing step of `resize`: the cover crop, and flattening to a
+    mode the output format can store.
+    """
+    if fit == "cover" and width and height:
+        image = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    if output_format == "jpeg" and has_transparency(image):
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, "WHITE")
+        image = Image.alpha_composite(background, image)
+    if output_format == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGBA" if has_transparency(image) else "RGB")
+    return image
+
+
+OPERATIONS = {
+    "add-white-bg": add_white_bg,
+    "add-frame": add_frame,
+    "resize": resize,
+}
@@ -0,0 +1,219 @@
+"""
+In-process cache for decoded frame images.
+
+This module provides a memory-bounded LRU cache that keeps decoded RGBA
+frames, and their resizes to frequently requested target sizes, in memory so
+that the frame endpoint doesn't have to re-read and re-decode the same PNG
+files on every request. Entries are invalidated when the frame file's mtime
+changes.
+
+User images come in nearly unique sizes, so a resize is only cached once its
+size has been asked for several times, and resizes are always evicted before
+the decoded frames they are made from.
+"""
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from .config import settings
+
+
+class FrameCache:
+    """
+    A thread-safe LRU cache of decoded and resized frame images.
+
+    Cached images are shared between requests and must be treated as
+    read-only by callers.
+    """
+    def __init__(
+        self,
+        frames_dir: Path,
+        max_bytes: int,
+        resize_admit_after: int = 2,
+        max_tracked_sizes: int = 4096,
+    ) -> None:
+        """
+        Initializes the FrameCache.
+
+        Args:
+            frames_dir (Path): The directory that holds the frame files.
+            max_bytes (int): The maximum number of bytes of decoded pixel
+                             data to keep in the cache.
+            resize_admit_after (int): The number of misses on a frame and
+                                      size after which its resize is cached.
+            max_tracked_sizes (int): The number of uncached frame and size
+                                     pairs whose misses are counted.
+        """
+        self.frames_dir = Path(frames_dir)
+        self.max_bytes = max_bytes
+        self.resize_admit_after = resize_admit_after
+        self.max_tracked_sizes = max_tracked_sizes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._resize_misses: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, frame_name: str, size: Optional[tuple[int, int]] = None) -> Image.Image:
+        """
+        Returns a decoded RGBA frame, optionally resized to the given size.
+
+        Each call counts as exactly one hit or miss.
+
+        Args:
+            frame_name (str): The name of the frame file.
+            size (Optional[tuple[int, int]]): The target size, or None for
+                                              the frame at its native size.
+
+        Raises:
+            FileNotFoundError: If the frame file does not exist.
+
+        Returns:
+            Image.Image: The decoded frame image.
+        """
+        frame_path = self.frames_dir / frame_name
+        mtime = frame_path.stat().st_mtime_ns
+        key = (frame_name, size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            admit = size is None or self._admit_resize(key)
+
+        if size is None:
+            image = self._decode(frame_path)
+        else:
+            image = self._base(frame_name, frame_path, mtime).resize(size)
+
+        if admit:
+            self._put(key, mtime, image)
+        return image
+
+    def _base(self, frame_name: str, frame_path: Path, mtime: int) -> Image.Image:
+        """
+        Returns the frame at its native size to resize from, caching it but
+        without counting a hit or miss.
+
+        Args:
+            frame_name (str): The name of the frame file.
+            frame_path (Path): The path of the frame file.
+            mtime (int): The frame file's current mtime.
+
+        Returns:
+            Image.Image: The decoded frame image.
+        """
+        key = (frame_name, None)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        image = self._decode(frame_path)
+        self._put(key, mtime, image)
+        return image
+
+    @staticmethod
+    def _decode(frame_path: Path) -> Image.Image:
+        """
+        Reads a frame file and converts it to RGBA.
+        """
+        with Image.open(frame_path) as frame_file:
+            return frame_file.convert("RGBA")
+
+    def _admit_resize(self, key: tuple) -> bool:
+        """
+        Counts a miss on a resize and decides whether to cache it.
+
+        Must be called with the lock held.
+
+        Args:
+            key (tuple): The cache key of the resize.
+
+        Returns:
+            bool: True once the key has missed `resize_admit_after` times.
+        """
+        misses = self._resize_misses.pop(key, 0) + 1
+        if misses >= self.resize_admit_after:
+            return True
+        self._resize_misses[key] = misses
+        while len(self._resize_misses) > self.max_tracked_sizes:
+            self._resize_misses.popitem(last=False)
+        return False
+
+    def _put(self, key: tuple, mtime: int, image: Image.Image) -> None:
+        """
+        Stores an image in the cache and evicts least recently used entries
+        until the cache fits in its byte budget. The new entry itself is
+        never evicted. Other resizes are evicted first; frames at their
+        native size only go when no other resize is left.
+
+        Args:
+            key (tuple): The cache key.
+            mtime (int): The frame file's mtime at decode time.
+            image (Image.Image): The image to store.
+        """
+        nbytes = image.width * image.height * len(image.getbands())
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            self._entries[key] = (mtime, image, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                victim = next(
+                    (cached for cached in self._entries if cached != key and cached[1] is not None),
+                    None,
+                ) or next(cached for cached in self._entries if cached != key)
+                _, _, evicted_bytes = self._entries.pop(victim)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the cache and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._resize_misses.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The hit, miss and eviction counts, the number of entries
+                  and the number of bytes currently held.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+frame_cache = FrameCache(
+    Path("frames"),
+    settings.FRAME_CACHE_MAX_BYTES,
+    resize_admit_after=settings.FRAME_CACHE_RESIZE_ADMIT_AFTER,
+)
@@ -0,0 +1,64 @@
+"""
+Content hashing helpers.
+
+This module builds the content-addressed keys used to recognise repeated
+uploads and repeated edit requests, so identical work is only done once.
+"""
+import hashlib
+import json
+from typing import BinaryIO
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Returns the SHA-256 hex digest of some bytes.
+
+    Args:
+        data (bytes): The content to hash.
+
+    Returns:
+        str: The hex digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def fileobj_hash(fileobj: BinaryIO) -> str:
+    """
+    Returns the SHA-256 hex digest of a file-like object, read in chunks.
+
+    The file position is restored to the start afterwards.
+
+    Args:
+        fileobj (BinaryIO): A seekable binary file-like object.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    while chunk := fileobj.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def edit_cache_key(input_hash: str, operation: str, **params) -> str:
+    """
+    Builds the cache key for an edit operation.
+
+    Args:
+        input_hash (str): The hex digest of the input image bytes.
+        operation (str): The name of the edit operation.
+        **params: The operation's parameters.
+
+    Returns:
+        str: The hex digest identifying this input, operation and parameters.
+    """
+    payload = json.dumps(
+        {"input": input_hash, "operation": operation, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return content_hash(payload.encode())
@@ -0,0 +1,270 @@
+"""
+Helpers for HTTP caching and partial content.
+
+This module implements the parts of RFC 9110 the API needs: parsing
+`Range` headers, evaluating `If-None-Match`, `If-Modified-Since` and
+`If-Range` preconditions, formatting HTTP dates and negotiating image
+formats from `Accept`.
+"""
+import datetime
+import re
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+# Outputs are stored under uuid4 or SHA-256 content-hash names and never
+# rewritten, so they can be cached forever by browsers and CDNs.
+IMMUTABLE_KEY_RE = re.compile(
+    r"^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{64})"
+    r"(\.[A-Za-z0-9]+)?$"
+)
+
+# Each range of a multi-range request costs one ranged S3 GET, so requests
+# with more ranges than this, after merging, are answered with the whole
+# object instead.
+MAX_RANGES = 16
+
+
+# Starlette renamed these status constants between the versions the app
+# supports, so the codes are defined once here instead.
+HTTP_413_CONTENT_TOO_LARGE = 413
+HTTP_416_RANGE_NOT_SATISFIABLE = 416
+
+
+class RangeNotSatisfiable(Exception):
+    """
+    Raised when none of the requested byte ranges overlap the object.
+    """
+
+
+def format_http_date(value: datetime.datetime) -> str:
+    """
+    Formats a datetime as an HTTP date.
+
+    Args:
+        value (datetime.datetime): The datetime to format.
+
+    Returns:
+        str: The date in IMF-fixdate format.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return format_datetime(value.astimezone(datetime.timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime.datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def _etag_matches(header: str, etag: Optional[str], weak: bool = True) -> bool:
+    if not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    normalized = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == normalized:
+            return True
+    return False
+
+
+def is_not_modified(
+    headers,
+    etag: Optional[str],
+    last_modified: Optional[datetime.datetime],
+) -> bool:
+    """
+    Evaluates If-None-Match and If-Modified-Since against an object.
+
+    If-None-Match takes precedence over If-Modified-Since when both are sent.
+
+    Args:
+        headers (Mapping[str, str]): The request headers.
+        etag (Optional[str]): The object's ETag, including quotes.
+        last_modified (Optional[datetime.datetime]): The object's
+                                                      modification time.
+
+    Returns:
+        bool: True if a 304 Not Modified response should be sent.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        since = _parse_http_date(if_modified_since)
+        if since is not None:
+            return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def range_applies(
+    headers,
+    etag: Optional[str],
+    last_modified: Optional[datetime.datetime],
+) -> bool:
+    """
+    Evaluates If-Range to decide whether a Range header should be honoured.
+
+    Args:
+        headers (Mapping[str, str]): The request headers.
+        etag (Optional[str]): The object's ETag, including quotes.
+        last_modified (Optional[datetime.datetime]): The object's
+                                                      modification time.
+
+    Returns:
+        bool: True if the Range header applies to the current object.
+    """
+    if_range = headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return _etag_matches(if_range, etag, weak=False)
+    since = _parse_http_date(if_range)
+    return (
+        since is not None
+        and last_modified is not None
+        and last_modified.replace(microsecond=0) == since
+    )
+
+
+def _merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_range(
+    header: Optional[str],
+    size: int,
+    max_ranges: int = MAX_RANGES,
+) -> Optional[list[tuple[int, int]]]:
+    """
+    Parses a bytes Range header into inclusive (start, end) offsets.
+
+    Syntactically invalid headers are ignored, as RFC 9110 allows.
+    Overlapping and adjacent ranges are merged and sorted; if more than
+    `max_ranges` remain, the header is ignored as well.
+
+    Args:
+        header (Optional[str]): The Range header value.
+        size (int): The size of the object in bytes.
+        max_ranges (int): The most ranges answered with a 206.
+
+    Raises:
+        RangeNotSatisfiable: If no requested range overlaps the object.
+
+    Returns:
+        Optional[list[tuple[int, int]]]: The satisfiable ranges, or None if
+                                         the whole object should be sent.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges: list[tuple[int, int]] = []
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "":
+                length = int(last)
+                if length <= 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+    ranges = _merge_ranges(ranges)
+    if len(ranges) > max_ranges:
+        return None
+    return ranges
+
+
+def cache_control_for(file_key: str, immutable_value: str) -> str:
+    """
+    Returns the Cache-Control header for an object key.
+
+    Args:
+        file_key (str): The key of the object.
+        immutable_value (str): The Cache-Control value for immutable,
+                               UUID- or hash-named outputs.
+
+    Returns:
+        str: The Cache-Control header value.
+    """
+    if IMMUTABLE_KEY_RE.match(file_key):
+        return immutable_value
+    return "no-cache"
+
+
+def negotiate_image_format(
+    accept: Optional[str],
+    formats: dict[str, str],
+    default: str,
+) -> str:
+    """
+    Picks an image format from an Accept header.
+
+    Only formats the client names explicitly are chosen over the default;
+    wildcards such as `image/*` and `*/*` fall back to the default format.
+    The default wins ties; other ties are broken by the order of `formats`.
+
+    Args:
+        accept (Optional[str]): The Accept header value.
+        formats (dict[str, str]): The available format names mapped to their
+                                  MIME types, in order of preference.
+        default (str): The format to use when nothing better is accepted.
+
+    Returns:
+        str: The chosen format name.
+    """
+    if not accept:
+        return default
+    weights: dict[str, float] = {}
+    for item in accept.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[media_type.lower()] = quality
+
+    best, best_quality = default, weights.get(formats.get(default, ""), 0.0)
+    for name, content_type in formats.items():
+        quality = weights.get(content_type, 0.0)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
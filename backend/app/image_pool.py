@@ -0,0 +1,169 @@
+"""
+Process pool that runs the image engine off the GIL.
+
+The edit endpoints hand their work to `image_pool.run`. With
+`IMAGE_WORKERS` set to 0 the operation runs inline in the calling thread;
+otherwise it runs in a pre-warmed `ProcessPoolExecutor` whose workers have
+the frames preloaded. Input and output bytes travel through shared memory
+blocks, so only the block names are pickled.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+
+from . import engine, metrics, profiling
+from .config import settings
+from .frame_cache import frame_cache
+
+
+def _init_worker(frames_dir: str) -> None:
+    """
+    Initializes a worker process by preloading every frame into its cache.
+
+    Args:
+        frames_dir (str): The absolute path of the frames directory.
+    """
+    frame_cache.frames_dir = Path(frames_dir)
+    for frame_path in sorted(frame_cache.frames_dir.glob("*.png")):
+        try:
+            frame_cache.get(frame_path.name)
+        except OSError:
+            continue
+
+
+def _warm() -> None:
+    """
+    A no-op task used to force worker processes to start.
+    """
+    time.sleep(0.05)
+
+
+def _run_in_worker(
+    operation: str, in_name: str, in_size: int, params: dict
+) -> tuple[str, int, dict]:
+    """
+    Runs an engine operation on input read from shared memory.
+
+    Args:
+        operation (str): The name of the engine operation.
+        in_name (str): The name of the shared memory block holding the input.
+        in_size (int): The number of input bytes in the block.
+        params (dict): The operation's parameters.
+
+    Returns:
+        tuple[str, int, dict]: The name of the shared memory block holding
+                               the result, the result size and the stage
+                               timings. The caller owns the block and must
+                               unlink it.
+    """
+    in_shm = SharedMemory(name=in_name)
+    view = in_shm.buf[:in_size]
+    timings = {}
+    try:
+        result = engine.OPERATIONS[operation](view, timings=timings, **params)
+    finally:
+        view.release()
+        in_shm.close()
+
+    out_shm = SharedMemory(create=True, size=max(len(result), 1))
+    out_shm.buf[:len(result)] = result
+    out_shm.close()
+    return out_shm.name, len(result), timings
+
+
+class ImagePool:
+    """
+    Runs image engine operations inline or in a pool of worker processes.
+    """
+    def __init__(self, workers: int, frames_dir: Path, start_method: str = "spawn") -> None:
+        """
+        Initializes the ImagePool.
+
+        Args:
+            workers (int): The number of worker processes, or 0 to run
+                           operations inline.
+            frames_dir (Path): The directory that holds the frame files.
+            start_method (str): The multiprocessing start method.
+        """
+        self.workers = workers
+        self.frames_dir = Path(frames_dir)
+        self.start_method = start_method
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Starts and pre-warms the worker processes, if any are configured.
+        """
+        if self.workers <= 0:
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(str(self.frames_dir.resolve()),),
+            )
+            warmups = [self._executor.submit(_warm) for _ in range(self.workers)]
+            for future in warmups:
+                future.result()
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def run(self, operation: str, data: bytes, **params) -> bytes:
+        """
+        Runs an engine operation and waits for its result.
+
+        The time spent in each stage of the operation is recorded in the
+        metrics. Requests being profiled run the operation inline, so that
+        it shows up in the profile.
+
+        Args:
+            operation (str): The name of the engine operation.
+            data (bytes): The encoded input image.
+            **params: The operation's parameters.
+
+        Returns:
+            bytes: The encoded result image.
+        """
+        if self.workers <= 0 or profiling.active():
+            timings = {}
+            try:
+                return engine.OPERATIONS[operation](data, timings=timings, **params)
+            finally:
+                metrics.observe_stages(timings)
+        if self._executor is None:
+            self.start()
+
+        in_shm = SharedMemory(create=True, size=max(len(data), 1))
+        try:
+            in_shm.buf[:len(data)] = data
+            out_name, out_size, timings = self._executor.submit(
+                _run_in_worker, operation, in_shm.name, len(data), params
+            ).result()
+        finally:
+            in_shm.close()
+            in_shm.unlink()
+        metrics.observe_stages(timings)
+
+        out_shm = SharedMemory(name=out_name)
+        try:
+            return bytes(out_shm.buf[:out_size])
+        finally:
+            out_shm.close()
+            out_shm.unlink()
+
+
+image_pool = ImagePool(settings.IMAGE_WORKERS, Path("frames"), settings.IMAGE_POOL_START_METHOD)
@@ -0,0 +1,238 @@
+"""
+Validation of uploaded files, shared by the edit and S3 upload endpoints.
+
+Uploads are checked before their content is read into memory: first the
+size, then the real file type, sniffed from the magic bytes at the start
+of the file rather than taken from the client's Content-Type. Only then is
+the file read for Pillow, or handed as a file object to S3.
+
+Starlette spools a multipart body to a temporary file before the endpoint
+runs, so `UploadLimitMiddleware` also caps the size of the request body of
+the upload endpoints while it is being received, and answers 413 as soon
+as the cap is passed instead of spooling the rest.
+"""
+import os
+from typing import Iterable
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from .http_utils import HTTP_413_CONTENT_TOO_LARGE
+
+# Bytes read from the start of a file to detect its type.
+SNIFF_BYTES = 32
+
+# Room for the multipart boundaries, headers and small form fields around
+# the file in a request body.
+MULTIPART_OVERHEAD = 64 * 1024
+
+# The types the edit endpoints accept, all of which Pillow decodes.
+IMAGE_TYPES = frozenset({
+    "image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff", "image/avif",
+})
+
+_MAGIC = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"%PDF-", "application/pdf"),
+)
+
+# The file extension given to stored uploads of each sniffed type, so the
+# same bytes get the same name whatever the client called the file.
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/bmp": ".bmp",
+    "image/tiff": ".tiff",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "image/heic": ".heic",
+    "image/heif": ".heif",
+    "application/pdf": ".pdf",
+}
+
+_ISOBMFF_BRANDS = {
+    b"avif": "image/avif",
+    b"avis": "image/avif",
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"mif1": "image/heif",
+}
+
+
+class UploadRejected(Exception):
+    """
+    Raised when an upload is too large or not of an accepted type.
+    """
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def sniff_content_type(head: bytes) -> str | None:
+    """
+    Detects a file's type from its first bytes.
+
+    Args:
+        head (bytes): The first SNIFF_BYTES bytes of the file, or fewer.
+
+    Returns:
+        str | None: The MIME type, or None if it isn't recognised.
+    """
+    for magic, content_type in _MAGIC:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        return _ISOBMFF_BRANDS.get(head[8:12])
+    return None
+
+
+def upload_size(file: UploadFile) -> int:
+    """
+    Returns the size of an upload without reading it.
+
+    Args:
+        file (UploadFile): The spooled upload.
+
+    Returns:
+        int: The size in bytes.
+    """
+    if file.size is not None:
+        return file.size
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+def validate_upload(file: UploadFile, allowed_types: Iterable[str], max_bytes: int) -> str:
+    """
+    Checks an upload's size and sniffed type, reading only its first bytes.
+
+    The file is left at position 0, ready to be read or streamed.
+
+    Args:
+        file (UploadFile): The spooled upload.
+        allowed_types (Iterable[str]): The accepted MIME types.
+        max_bytes (int): The largest accepted size.
+
+    Raises:
+        UploadRejected: With 413 if the file is too large, or 415 if its
+                        content is not of an accepted type.
+
+    Returns:
+        str: The sniffed MIME type.
+    """
+    if upload_size(file) > max_bytes:
+        raise UploadRejected(HTTP_413_CONTENT_TOO_LARGE, f"File is too large; the limit is {max_bytes} bytes.")
+    file.file.seek(0)
+    head = file.file.read(SNIFF_BYTES)
+    file.file.seek(0)
+    content_type = sniff_content_type(head)
+    if content_type is None or content_type not in set(allowed_types):
+        raise UploadRejected(415, "File type is not supported.")
+    return content_type
+
+
+def read_image_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """
+    Validates an image upload for the edit endpoints and reads it.
+
+    Args:
+        file (UploadFile): The spooled upload.
+        max_bytes (int): The largest accepted size.
+
+    Raises:
+        UploadRejected: If the file is too large or not a supported image.
+
+    Returns:
+        bytes: The file content.
+    """
+    validate_upload(file, IMAGE_TYPES, max_bytes)
+    return file.file.read()
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that caps the request body size of upload endpoints.
+
+    Requests with a larger Content-Length are refused before their body is
+    read; chunked requests are cut off as soon as they pass the cap.
+    """
+    def __init__(self, app, limits: dict[str, int]) -> None:
+        """
+        Initializes the UploadLimitMiddleware.
+
+        Args:
+            app: The ASGI app.
+            limits (dict[str, int]): The largest request body in bytes, by
+                                     the path of a POST endpoint.
+        """
+        self.app = app
+        self.limits = limits
+
+    @staticmethod
+    def _too_large(limit: int) -> JSONResponse:
+        return JSONResponse(
+            {"detail": f"Request body is larger than {limit} bytes."},
+            status_code=HTTP_413_CONTENT_TOO_LARGE,
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        limit = self.limits.get(path)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            await self._too_large(limit)(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadRejected(HTTP_413_CONTENT_TOO_LARGE, "Request body is too large.")
+            return message
+
+        async def guarded_send(message) -> None:
+            nonlocal started
+            # Whatever the app made of the cut-off body is replaced by a 413.
+            if exceeded and not started:
+                return
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # Errors raised because the body was cut off are answered below.
+            if not exceeded:
+                raise
+        if exceeded and not started:
+            await self._too_large(limit)(scope, receive, send)
@@ -0,0 +1,365 @@
+"""
+Persistent queue of edit jobs.
+
+Submitting an edit as a job stores the upload in a spool directory and a
+row in the `edit_jobs` table, and returns at once. A small pool of worker
+threads claims queued jobs oldest first and runs them through a runner
+supplied by the edit router, so a large image no longer holds an HTTP
+connection open for the whole decode, composite, encode and upload cycle.
+
+Clients poll a job, or long-poll it: `JobQueue.wait` resolves as soon as a
+worker of this process finishes the job, and falls back to re-reading the
+table every `JOB_POLL_INTERVAL` seconds.
+
+Jobs left "running" by a crashed process are queued again when the queue
+starts, which assumes one application process per database.
+"""
+import asyncio
+import datetime
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from PIL import Image
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Runs one job: (db, job, contents) -> (result URL, stage timings in ms).
+JobRunner = Callable[[Session, models.EditJob, bytes], tuple[str, dict]]
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is submitted while too many jobs are already queued.
+    """
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class JobQueue:
+    """
+    A SQLite-backed FIFO queue of edit jobs drained by worker threads.
+    """
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        spool_dir: Path,
+        workers: int,
+        max_pending: int,
+        poll_interval: float,
+    ) -> None:
+        """
+        Initializes the JobQueue.
+
+        Args:
+            session_factory (Callable[[], Session]): Creates the sessions used
+                                                     by the workers.
+            spool_dir (Path): The directory holding the uploads of queued jobs.
+            workers (int): The number of worker threads.
+            max_pending (int): The number of queued jobs above which
+                               `submit` raises QueueFull.
+            poll_interval (float): How often idle workers re-check the table,
+                                   in seconds.
+        """
+        self.session_factory = session_factory
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self._runner: JobRunner | None = None
+        self._threads: list[threading.Thread] = []
+        self._condition = threading.Condition()
+        self._claim_lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._stopping = False
+        self._waiters: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._waiters_lock = threading.Lock()
+
+    def start(self, runner: JobRunner) -> None:
+        """
+        Requeues interrupted jobs and starts the worker threads.
+
+        Args:
+            runner (JobRunner): Runs one job and returns its result URL and
+                                stage timings.
+        """
+        with self._condition:
+            if self._threads:
+                return
+            self._runner = runner
+            self._stopping = False
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        with self.session_factory() as db:
+            db.execute(
+                update(models.EditJob)
+                .where(models.EditJob.status == "running")
+                .values(status="queued", started_at=None)
+            )
+            db.commit()
+        for n in range(max(1, self.workers)):
+            thread = threading.Thread(target=self._work, name=f"edit-job-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """
+        Stops the worker threads once their current jobs are finished.
+
+        Queued jobs stay in the table and are picked up on the next start.
+        """
+        with self._condition:
+            threads, self._threads = self._threads, []
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in threads:
+            thread.join()
+
+    def pending(self, db: Session) -> int:
+        """
+        Counts the jobs waiting for a worker.
+
+        Args:
+            db (Session): The database session.
+
+        Returns:
+            int: The number of queued jobs.
+        """
+        return db.scalar(
+            select(func.count()).select_from(models.EditJob)
+            .where(models.EditJob.status == "queued")
+        )
+
+    def submit(
+        self,
+        db: Session,
+        operation: str,
+        params: dict,
+        original_filename: str,
+        contents: bytes,
+    ) -> models.EditJob:
+        """
+        Spools the upload and queues a job for it.
+
+        Submits are serialized so that concurrent ones can't both pass the
+        `max_pending` check before either has committed its job.
+
+        Args:
+            db (Session): The database session.
+            operation (str): The engine operation to apply.
+            params (dict): The operation's parameters.
+            original_filename (str): The original filename of the upload.
+            contents (bytes): The uploaded image bytes.
+
+        Raises:
+            QueueFull: If `max_pending` jobs are already queued.
+
+        Returns:
+            models.EditJob: The queued job.
+        """
+        with self._submit_lock:
+            if self.pending(db) >= self.max_pending:
+                raise QueueFull()
+            job = models.EditJob(
+                id=uuid.uuid4().hex,
+                status="queued",
+                operation=operation,
+                params=params,
+                original_filename=original_filename,
+            )
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            self._spool_path(job.id).write_bytes(contents)
+            db.add(job)
+            try:
+                db.commit()
+            except Exception:
+                self._spool_path(job.id).unlink(missing_ok=True)
+                raise
+        db.refresh(job)
+        with self._condition:
+            self._condition.notify()
+        return job
+
+    def cancel(self, db: Session, job_id: str) -> bool:
+        """
+        Cancels a job that no worker has picked up yet.
+
+        Args:
+            db (Session): The database session.
+            job_id (str): The job id.
+
+        Returns:
+            bool: Whether the job was cancelled. Running and finished jobs
+                  are left alone.
+        """
+        cancelled = db.execute(
+            update(models.EditJob)
+            .where(models.EditJob.id == job_id, models.EditJob.status == "queued")
+            .values(status="cancelled", finished_at=_utcnow())
+        ).rowcount
+        db.commit()
+        if cancelled:
+            self._spool_path(job_id).unlink(missing_ok=True)
+            self._notify(job_id)
+        return bool(cancelled)
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """
+        Waits until a worker of this process finishes a job, or the timeout
+        runs out, whichever comes first.
+
+        Args:
+            job_id (str): The job id.
+            timeout (float): The longest to wait, in seconds.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._waiters_lock:
+            self._waiters.setdefault(job_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._waiters_lock:
+                waiters = self._waiters.get(job_id, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+
+    def _notify(self, job_id: str) -> None:
+        with self._waiters_lock:
+            waiters = self._waiters.pop(job_id, [])
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(
+                lambda future=future: future.done() or future.set_result(None)
+            )
+
+    def _spool_path(self, job_id: str) -> Path:
+        return self.spool_dir / job_id
+
+    def _claim(self, db: Session) -> models.EditJob | None:
+        """
+        Marks the oldest queued job as running and returns it.
+        """
+        with self._claim_lock:
+            while True:
+                job_id = db.scalar(
+                    select(models.EditJob.id)
+                    .where(models.EditJob.status == "queued")
+                    .order_by(models.EditJob.created_at, models.EditJob.id)
+                    .limit(1)
+                )
+                if job_id is None:
+                    return None
+                claimed = db.execute(
+                    update(models.EditJob)
+                    .where(models.EditJob.id == job_id, models.EditJob.status == "queued")
+                    .values(status="running", started_at=_utcnow())
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return db.get(models.EditJob, job_id)
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+            try:
+                with self.session_factory() as db:
+                    job = self._claim(db)
+                    if job is not None:
+                        self._execute(db, job)
+            except Exception:
+                logger.exception("Edit job worker failed")
+                job = None
+            if job is None:
+                with self._condition:
+                    if not self._stopping:
+                        self._condition.wait(self.poll_interval)
+
+    def _execute(self, db: Session, job: models.EditJob) -> None:
+        """
+        Runs a claimed job and records its outcome and timings.
+        """
+        started = time.perf_counter()
+        # SQLite hands datetimes back naive; both columns are stored in UTC.
+        queued_for = job.started_at.replace(tzinfo=None) - job.created_at.replace(tzinfo=None)
+        timings = {"queue_wait_ms": _ms(queued_for.total_seconds())}
+        try:
+            contents = self._spool_path(job.id).read_bytes()
+            result_url, stage_timings = self._runner(db, job, contents)
+            timings.update(stage_timings)
+            job.status = "succeeded"
+            job.result_url = result_url
+        except Image.DecompressionBombError:
+            db.rollback()
+            job.status = "failed"
+            job.error = "Image size is too large."
+        except Exception as e:
+            db.rollback()
+            job.status = "failed"
+            job.error = f"An error occurred during processing: {e}"
+        timings["run_ms"] = _ms(time.perf_counter() - started)
+        job_id = job.id
+        job.timings = timings
+        job.finished_at = _utcnow()
+        try:
+            db.commit()
+        except Exception:
+            logger.exception("Could not record the outcome of edit job %s", job_id)
+            db.rollback()
+            self._fail(job_id, timings, "The job's result could not be recorded.")
+        finally:
+            self._spool_path(job_id).unlink(missing_ok=True)
+            self._notify(job_id)
+
+    def _fail(self, job_id: str, timings: dict, error: str) -> None:
+        """
+        Marks a running job as failed in a fresh session, so it doesn't stay
+        "running" until the next restart when its own session broke.
+
+        Args:
+            job_id (str): The job id.
+            timings (dict): The job's timings so far.
+            error (str): The error message.
+        """
+        try:
+            with self.session_factory() as db:
+                db.execute(
+                    update(models.EditJob)
+                    .where(models.EditJob.id == job_id, models.EditJob.status == "running")
+                    .values(status="failed", error=error, timings=timings,
+                            finished_at=_utcnow())
+                )
+                db.commit()
+        except Exception:
+            logger.exception("Could not mark edit job %s as failed", job_id)
+
+
+job_queue = JobQueue(
+    SessionLocal,
+    Path(settings.JOB_SPOOL_DIR),
+    settings.JOB_WORKERS,
+    settings.JOB_MAX_PENDING,
+    settings.JOB_POLL_INTERVAL,
+)
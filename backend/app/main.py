@@ -6,6 +6,7 @@ This file initializes the FastAPI application, sets up CORS middleware,
 and includes the routers for different API endpoints.
 """
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from app.s3 import s3_bucket_service_factory
 from fastapi import FastAPI, Request
@@ -16,16 +17,47 @@ from fastapi.staticfiles import StaticFiles
 
 from . import models
 from .config import settings
-from .database import engine
+from .database import engine, upgrade_schema
+from .image_pool import image_pool
+from .ingest import MULTIPART_OVERHEAD, UploadLimitMiddleware
+from .jobs import job_queue
+from .metrics import MetricsMiddleware
+from .object_cache import object_cache
+from .profiling import ProfileMiddleware
+from .write_behind import write_behind
 from .routers import s3Handler
 from .routers import editHandler
 from .routers import dbHandler
+from .routers import metricsHandler
 
-models.Base.metadata.create_all(bind=engine)
+upgrade_schema(engine, models.Base.metadata)
 # --- Настройка статических файлов и шаблонов ---
 Path("frames").mkdir(exist_ok=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the image worker pool, the write-behind queue and the edit job
+    workers on startup, and stops them on shutdown. The object cache's disk
+    files are removed on shutdown, and those left by earlier processes on
+    startup.
+    """
+    object_cache.prune_stale()
+    image_pool.start()
+    if write_behind is not None:
+        write_behind.start()
+    job_queue.start(editHandler.run_job)
+    yield
+    job_queue.stop()
+    if write_behind is not None:
+        write_behind.stop()
+    image_pool.shutdown()
+    object_cache.clear()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="alice.com API",   
     root_path="/api",                
     root_path_in_servers=True,        
@@ -37,6 +69,19 @@ app = FastAPI(
 app.include_router(s3Handler.router, prefix="/s3")
 app.include_router(editHandler.router, prefix="/edit")
 app.include_router(dbHandler.router, prefix="/files")
+if settings.METRICS_ENABLED:
+    app.include_router(metricsHandler.router, prefix="/metrics")
+
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/s3/upload": settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+        "/edit/add-white-bg/": settings.EDIT_MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+        "/edit/add-frame/": settings.EDIT_MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+        "/edit/jobs": settings.EDIT_MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+        "/edit/batch": settings.BATCH_MAX_BYTES,
+    },
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,4 +89,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets browsers read the pagination cursor of /files/list.
+    expose_headers=["X-Next-Cursor"],
 )
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+if settings.PROFILE_SECRET:
+    app.add_middleware(
+        ProfileMiddleware,
+        secret=settings.PROFILE_SECRET,
+        output_dir=Path(settings.PROFILE_DIR),
+        top_functions=settings.PROFILE_TOP_FUNCTIONS,
+        top_allocations=settings.PROFILE_TOP_ALLOCATIONS,
+    )
@@ -0,0 +1,270 @@
+"""
+Prometheus metrics for the request and image pipeline.
+
+Collects per-stage latency histograms (decode, composite, encode, S3
+upload and database commit), S3 call counts and bytes sent and received,
+HTTP request latency per endpoint, the number of in-flight requests, the
+queue depth of the thread pools and the use of the image memory budget.
+`/metrics` serves them in the Prometheus text format.
+
+Everything here is a counter increment or a histogram observation on the
+request path; the gauges are only read when /metrics is scraped.
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.gc_collector import GCCollector
+from prometheus_client.platform_collector import PlatformCollector
+from prometheus_client.process_collector import ProcessCollector
+
+STAGE_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+registry = CollectorRegistry()
+ProcessCollector(registry=registry)
+PlatformCollector(registry=registry)
+GCCollector(registry=registry)
+
+STAGE_SECONDS = Histogram(
+    "image_framer_stage_seconds",
+    "Time spent in each stage of the image pipeline.",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+    registry=registry,
+)
+REQUEST_SECONDS = Histogram(
+    "image_framer_http_request_duration_seconds",
+    "HTTP request latency by endpoint.",
+    ["method", "handler", "status"],
+    buckets=STAGE_BUCKETS,
+    registry=registry,
+)
+IN_FLIGHT = Gauge(
+    "image_framer_http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    registry=registry,
+)
+S3_CALLS = Counter(
+    "image_framer_s3_calls",
+    "S3 API calls by operation and HTTP status.",
+    ["operation", "status"],
+    registry=registry,
+)
+S3_BYTES = Counter(
+    "image_framer_s3_bytes",
+    "Bytes sent to and received from S3.",
+    ["direction"],
+    registry=registry,
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """
+    Records the duration of one pipeline stage.
+
+    Args:
+        stage (str): The stage name, e.g. "decode" or "upload".
+        seconds (float): The duration in seconds.
+    """
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_stages(timings: dict) -> None:
+    """
+    Records the stage timings filled in by an engine operation.
+
+    Args:
+        timings (dict): The seconds spent per stage.
+    """
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Times the enclosed block as a pipeline stage.
+
+    Args:
+        name (str): The stage name.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def _content_length(headers) -> int:
+    try:
+        return int(headers.get("content-length") or 0)
+    except ValueError:
+        return 0
+
+
+def _on_s3_send(request, **kwargs) -> None:
+    S3_BYTES.labels("sent").inc(_content_length(request.headers))
+
+
+def _on_s3_call(http_response, parsed, model, **kwargs) -> None:
+    S3_CALLS.labels(model.name, str(http_response.status_code)).inc()
+    if model.name != "HeadObject":
+        S3_BYTES.labels("received").inc(_content_length(http_response.headers))
+
+
+def _on_s3_error(model, exception=None, **kwargs) -> None:
+    if exception is not None:
+        S3_CALLS.labels(model.name, "error").inc()
+
+
+def instrument_s3_client(client) -> None:
+    """
+    Registers botocore event hooks that count an S3 client's calls and bytes.
+
+    Sent bytes are counted once per attempt, from the request's
+    Content-Length; received bytes from the response's Content-Length, so
+    streamed bodies are counted in full whether or not they are read.
+
+    Args:
+        client (boto3.client): The S3 client.
+    """
+    events = client.meta.events
+    events.register("before-send.s3", _on_s3_send)
+    events.register("after-call.s3", _on_s3_call)
+    events.register("after-call-error.s3", _on_s3_error)
+
+
+def instrument_sessions(session_class) -> None:
+    """
+    Times every commit of a SQLAlchemy session class as the "db_commit"
+    stage, including the final flush.
+
+    Args:
+        session_class (type): The Session class, e.g. sqlalchemy.orm.Session.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(session_class, "before_commit")
+    def start_commit_timer(session):
+        session.info["metrics_commit_started"] = time.perf_counter()
+
+    @event.listens_for(session_class, "after_commit")
+    def stop_commit_timer(session):
+        started = session.info.pop("metrics_commit_started", None)
+        if started is not None:
+            observe_stage("db_commit", time.perf_counter() - started)
+
+
+class _PoolCollector:
+    """
+    Reports the thread pool and memory budget gauges, read when the
+    metrics are scraped.
+    """
+    def collect(self):
+        threadpool = GaugeMetricFamily(
+            "image_framer_threadpool_tasks",
+            "Tasks in the default threadpool, which runs sync routes.",
+            labels=["state"],
+        )
+        try:
+            from anyio.to_thread import current_default_thread_limiter
+
+            stats = current_default_thread_limiter().statistics()
+        except Exception:
+            # Outside an event loop there is no threadpool to report on.
+            stats = None
+        if stats is not None:
+            threadpool.add_metric(["running"], stats.borrowed_tokens)
+            threadpool.add_metric(["waiting"], stats.tasks_waiting)
+            threadpool.add_metric(["limit"], stats.total_tokens)
+        yield threadpool
+
+        s3_queue = GaugeMetricFamily(
+            "image_framer_s3_io_queue_depth",
+            "S3 calls waiting for a thread of the S3 I/O executor.",
+            labels=["bucket"],
+        )
+        from .s3 import _services
+
+        for service in list(_services.values()):
+            executor = service._io_executor
+            if executor is not None:
+                s3_queue.add_metric([service.bucket_name], executor._work_queue.qsize())
+        yield s3_queue
+
+        from .admission import memory_budget
+
+        budget = GaugeMetricFamily(
+            "image_framer_memory_budget_bytes",
+            "Estimated image memory admitted by the memory budget.",
+            labels=["state"],
+        )
+        budget.add_metric(["in_use"], memory_budget.in_use)
+        budget.add_metric(["limit"], memory_budget.max_bytes)
+        yield budget
+        yield GaugeMetricFamily(
+            "image_framer_memory_budget_waiting",
+            "Images waiting for the memory budget.",
+            value=memory_budget.waiting,
+        )
+
+
+registry.register(_PoolCollector())
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records request latency and in-flight requests.
+
+    Requests are labelled with the name of the endpoint function that
+    handled them, e.g. "get_file_by_key", rather than the raw path, so the
+    number of series stays bounded; requests that match no API route share
+    the "other" label.
+    """
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            handler = getattr(scope.get("route"), "name", "other")
+            REQUEST_SECONDS.labels(scope["method"], handler, str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Renders every metric in the Prometheus text format.
+
+    Returns:
+        tuple[bytes, str]: The body and its content type.
+    """
+    return generate_latest(registry), CONTENT_TYPE_LATEST
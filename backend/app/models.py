@@ -4,10 +4,16 @@ SQLAlchemy models for the application.
 
 This module defines the database schema using SQLAlchemy's declarative base.
 """
-from sqlalchemy import Column, Integer, String
+import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
 from .database import Base
 
 
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
 class ProcessedImage(Base):
     """
     Represents a processed image in the database.
@@ -16,9 +22,88 @@ class ProcessedImage(Base):
         id (int): The primary key for the processed image.
         original_filename (str): The original filename of the uploaded image.
         processed_url (str): The URL of the processed image.
+        cache_key (str): The hash of the input bytes, operation and
+                         parameters that produced this image.
+        created_at (datetime): When the image was processed, in UTC.
     """
     __tablename__ = "processed_images"
 
     id = Column(Integer, primary_key=True, index=True)
-    original_filename = Column(String)
+    original_filename = Column(String, index=True)
     processed_url = Column(String, unique=True)
+    cache_key = Column(String, unique=True, index=True, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=True)
+
+    __table_args__ = (
+        # Serves time-range queries and keyset pagination within them.
+        Index("ix_processed_images_created_at_id", "created_at", "id"),
+    )
+
+
+class EditJob(Base):
+    """
+    Represents a queued edit job.
+
+    Attributes:
+        id (str): The job id handed back to the client.
+        status (str): "queued", "running", "succeeded", "failed" or
+                      "cancelled".
+        operation (str): The engine operation to apply.
+        params (dict): The operation's parameters.
+        original_filename (str): The original filename of the upload.
+        result_url (str): The URL of the processed image, once succeeded.
+        error (str): The error message, once failed.
+        timings (dict): Per-stage durations of the job in milliseconds.
+        created_at (datetime): When the job was submitted, in UTC.
+        started_at (datetime): When a worker picked the job up, in UTC.
+        finished_at (datetime): When the job finished, in UTC.
+    """
+    __tablename__ = "edit_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False)
+    operation = Column(String, nullable=False)
+    params = Column(JSON, nullable=False)
+    original_filename = Column(String)
+    result_url = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    timings = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Serves the FIFO claim of the oldest queued job.
+        Index("ix_edit_jobs_status_created_at", "status", "created_at"),
+    )
+
+
+class DirectUpload(Base):
+    """
+    Represents an upload that goes straight from the client to S3.
+
+    A row is created when the presigned URL is issued and completed once
+    the client reports the upload done and the object checks out.
+
+    Attributes:
+        id (int): The primary key.
+        key (str): The S3 key the client uploads to.
+        original_filename (str): The filename given by the client.
+        content_type (str): The content type the upload was signed for.
+        max_size (int): The largest size the upload was signed for.
+        size (int): The size of the stored object, once completed.
+        status (str): "pending" or "completed".
+        created_at (datetime): When the upload URL was issued, in UTC.
+        completed_at (datetime): When the upload was completed, in UTC.
+    """
+    __tablename__ = "direct_uploads"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True, nullable=False)
+    original_filename = Column(String)
+    content_type = Column(String, nullable=False)
+    max_size = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=True)
+    status = Column(String, nullable=False, default="pending")
+    created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
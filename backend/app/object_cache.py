@@ -0,0 +1,302 @@
+"""
+Local read-through cache for S3 objects served by /s3/file.
+
+Outputs are stored under UUID or content-hash names and never rewritten, and
+they are typically read again right after they are created. This module
+keeps recently used objects locally in two LRU tiers: small objects as bytes
+in memory, larger ones as files on local disk, which are served with
+`FileResponse` so the kernel can `sendfile` them. Objects enter the cache
+when they are first read from S3, or when the edit endpoints upload them.
+
+Only immutable keys may be cached, since a rewritten object would never be
+refreshed.
+
+Each process keeps its disk tier in its own `objects-*` directory, which it
+holds an exclusive flock on. The directory is removed on shutdown, and
+directories left behind by processes that died are pruned on startup.
+"""
+import datetime
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from .config import settings
+
+
+# Disk tier directories without a lock file are only pruned once they are
+# this old, in seconds, so one that is being created is left alone.
+_UNLOCKED_GRACE = 60.0
+
+
+class CachedObject(NamedTuple):
+    """
+    A cached S3 object.
+
+    Attributes:
+        size (int): The object size in bytes.
+        content_type (str): The object's content type.
+        etag (Optional[str]): The object's ETag, including quotes, if known.
+        last_modified (datetime.datetime): The object's modification time.
+        data (Optional[bytes]): The content, for objects in the memory tier.
+        path (Optional[Path]): The local file, for objects in the disk tier.
+    """
+    size: int
+    content_type: str
+    etag: Optional[str]
+    last_modified: datetime.datetime
+    data: Optional[bytes] = None
+    path: Optional[Path] = None
+
+
+class ObjectCache:
+    """
+    A thread-safe, size-bounded LRU cache of S3 objects with a memory tier
+    and a local-disk tier.
+    """
+    def __init__(
+        self,
+        memory_max_bytes: int,
+        memory_max_object_bytes: int,
+        disk_dir: Path,
+        disk_max_bytes: int,
+        max_object_bytes: int,
+    ) -> None:
+        """
+        Initializes the ObjectCache.
+
+        Args:
+            memory_max_bytes (int): The byte budget of the memory tier.
+            memory_max_object_bytes (int): The largest object kept in memory;
+                                           larger ones go to disk.
+            disk_dir (Path): The directory under which the disk tier keeps
+                             its files. Each cache instance uses its own
+                             subdirectory.
+            disk_max_bytes (int): The byte budget of the disk tier, or 0 to
+                                  disable it.
+            max_object_bytes (int): The largest object cached at all.
+        """
+        self.memory_max_bytes = memory_max_bytes
+        self.memory_max_object_bytes = memory_max_object_bytes
+        self.disk_dir = Path(disk_dir)
+        self.disk_max_bytes = disk_max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self._memory: OrderedDict[str, CachedObject] = OrderedDict()
+        self._disk: OrderedDict[str, CachedObject] = OrderedDict()
+        self._disk_root: Optional[Path] = None
+        self._root_lock_file = None
+        self._lock = threading.Lock()
+
+    def cacheable(self, size: int) -> bool:
+        """
+        Checks whether an object of a given size fits in either tier.
+
+        Args:
+            size (int): The object size in bytes.
+
+        Returns:
+            bool: True if `put` would keep such an object.
+        """
+        if size <= self.memory_max_object_bytes and size <= self.memory_max_bytes:
+            return True
+        return size <= min(self.max_object_bytes, self.disk_max_bytes)
+
+    def get(self, key: str) -> Optional[CachedObject]:
+        """
+        Returns a cached object and marks it as recently used.
+
+        Args:
+            key (str): The object key.
+
+        Returns:
+            Optional[CachedObject]: The cached object, or None on a miss.
+        """
+        with self._lock:
+            for tier in (self._memory, self._disk):
+                entry = tier.get(key)
+                if entry is not None:
+                    tier.move_to_end(key)
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        content_type: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[datetime.datetime] = None,
+    ) -> None:
+        """
+        Stores an object, evicting least recently used ones to stay in budget.
+
+        Objects too large for either tier are ignored.
+
+        Args:
+            key (str): The object key.
+            data (bytes): The object content.
+            content_type (str): The object's content type.
+            etag (Optional[str]): The object's ETag, if known.
+            last_modified (Optional[datetime.datetime]): The object's
+                                                         modification time;
+                                                         defaults to now.
+        """
+        size = len(data)
+        if not self.cacheable(size):
+            return
+        entry = CachedObject(
+            size=size,
+            content_type=content_type,
+            etag=etag,
+            last_modified=last_modified or datetime.datetime.now(datetime.timezone.utc),
+        )
+
+        if size <= self.memory_max_object_bytes and size <= self.memory_max_bytes:
+            with self._lock:
+                self._discard(key)
+                self._memory[key] = entry._replace(data=bytes(data))
+                self.memory_bytes += size
+                while self.memory_bytes > self.memory_max_bytes:
+                    _, evicted = self._memory.popitem(last=False)
+                    self.memory_bytes -= evicted.size
+                    self.evictions += 1
+            return
+
+        path = self._root() / hashlib.sha256(key.encode()).hexdigest()
+        # Write under a temporary name so readers never see a partial file.
+        partial = path.with_suffix(f".{threading.get_ident()}.part")
+        partial.write_bytes(data)
+        os.replace(partial, path)
+        with self._lock:
+            self._discard(key, unlink=False)
+            self._disk[key] = entry._replace(path=path)
+            self.disk_bytes += size
+            while self.disk_bytes > self.disk_max_bytes:
+                _, evicted = self._disk.popitem(last=False)
+                self.disk_bytes -= evicted.size
+                self.evictions += 1
+                evicted.path.unlink(missing_ok=True)
+
+    def discard(self, key: str) -> None:
+        """
+        Removes an object from both tiers, if it is cached.
+
+        Args:
+            key (str): The object key.
+        """
+        with self._lock:
+            self._discard(key)
+
+    def clear(self) -> None:
+        """
+        Removes all entries and their files, and resets the counters.
+        """
+        with self._lock:
+            self._memory.clear()
+            self._disk.clear()
+            root, self._disk_root = self._disk_root, None
+            lock_file, self._root_lock_file = self._root_lock_file, None
+            self.memory_bytes = 0
+            self.disk_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
+        if lock_file is not None:
+            lock_file.close()
+
+    def prune_stale(self) -> int:
+        """
+        Removes the disk tier directories of processes that are gone.
+
+        A directory is stale when nobody holds the flock on its lock file.
+        Directories of live processes sharing `disk_dir` are left alone.
+
+        Returns:
+            int: The number of directories removed.
+        """
+        if not self.disk_dir.is_dir():
+            return 0
+        removed = 0
+        for root in self.disk_dir.glob("objects-*"):
+            if not root.is_dir() or root == self._disk_root:
+                continue
+            lock_path = root / ".lock"
+            if not lock_path.exists():
+                if time.time() - root.stat().st_mtime < _UNLOCKED_GRACE:
+                    continue
+            else:
+                with open(lock_path, "a") as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+            shutil.rmtree(root, ignore_errors=True)
+            removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: The hit, miss and eviction counts, and the entries and
+                  bytes held by each tier.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self.memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self.disk_bytes,
+            }
+
+    def _discard(self, key: str, unlink: bool = True) -> None:
+        """
+        Drops a key from both tiers. Must be called with the lock held.
+        """
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= old.size
+        old = self._disk.pop(key, None)
+        if old is not None:
+            self.disk_bytes -= old.size
+            if unlink:
+                old.path.unlink(missing_ok=True)
+
+    def _root(self) -> Path:
+        with self._lock:
+            if self._disk_root is None:
+                self.disk_dir.mkdir(parents=True, exist_ok=True)
+                root = Path(tempfile.mkdtemp(prefix="objects-", dir=self.disk_dir))
+                # Held until clear() or exit, so prune_stale() skips the directory.
+                self._root_lock_file = open(root / ".lock", "a")
+                fcntl.flock(self._root_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._disk_root = root
+            return self._disk_root
+
+
+object_cache = ObjectCache(
+    settings.OBJECT_CACHE_MEMORY_BYTES,
+    settings.OBJECT_CACHE_MEMORY_MAX_OBJECT_BYTES,
+    Path(settings.OBJECT_CACHE_DIR),
+    settings.OBJECT_CACHE_DISK_BYTES,
+    settings.OBJECT_CACHE_MAX_OBJECT_BYTES,
+)
@@ -0,0 +1,255 @@
+"""
+Opt-in profiling of single requests with cProfile and tracemalloc.
+
+Debug mode is off unless PROFILE_SECRET is set. A request that carries the
+secret in its `X-Profile-Token` header is then run under tracemalloc, and
+its endpoint function under cProfile. The report lists the functions with
+the most cumulative time and the source lines that allocated the most
+memory. It is either saved to PROFILE_DIR, as `<id>.prof` (a pstats dump
+for snakeviz and friends) and `<id>.txt`, with the id returned in the
+`X-Profile-Report` header, or returned in place of the response body when
+the request also sends `X-Profile-Output: inline`.
+
+cProfile only sees the thread the endpoint runs in: the threadpool thread
+of a sync route, or the event loop of an async one, where other requests'
+coroutines running at the same time show up too. tracemalloc sees every
+thread. While a request is profiled, image operations run inline instead
+of in the image pool, so Pillow's work shows up in the profile.
+
+Only one request is profiled at a time; another profiled request gets a
+409 until it finishes.
+"""
+import contextvars
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, PlainTextResponse
+
+TOKEN_HEADER = "x-profile-token"
+OUTPUT_HEADER = "x-profile-output"
+
+_current: contextvars.ContextVar["RequestProfile | None"] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+_busy = threading.Lock()
+
+
+class RequestProfile:
+    """
+    The profiler and results of one profiled request.
+    """
+    def __init__(self, request_id: str) -> None:
+        """
+        Initializes the RequestProfile.
+
+        Args:
+            request_id (str): The id the report is saved under.
+        """
+        self.request_id = request_id
+        self.profiler = cProfile.Profile()
+        self.snapshot = None
+        self.peak_bytes = 0
+        self.elapsed = 0.0
+
+    def report(self, top_functions: int, top_allocations: int) -> str:
+        """
+        Formats the profile as text.
+
+        Args:
+            top_functions (int): The number of functions to list.
+            top_allocations (int): The number of allocation sites to list.
+
+        Returns:
+            str: The report.
+        """
+        out = io.StringIO()
+        out.write(f"request {self.request_id}: {self.elapsed * 1000:.1f} ms, "
+                  f"peak traced memory {self.peak_bytes / 2**20:.1f} MiB\n\n")
+        try:
+            stats = pstats.Stats(self.profiler, stream=out)
+        except TypeError:
+            # The endpoint never ran, e.g. the request failed validation.
+            out.write("no profile data\n")
+        else:
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_functions)
+        if self.snapshot is not None:
+            out.write(f"top {top_allocations} allocation sites:\n")
+            for stat in self.snapshot.statistics("lineno")[:top_allocations]:
+                out.write(f"{stat}\n")
+        return out.getvalue()
+
+
+def active() -> bool:
+    """
+    Returns whether the current request is being profiled.
+
+    Returns:
+        bool: True inside a profiled request.
+    """
+    return _current.get() is not None
+
+
+def profiled(endpoint: Callable) -> Callable:
+    """
+    Wraps an endpoint so it runs under the request's profiler, if any.
+
+    Sync endpoints stay sync, so FastAPI still runs them in the threadpool
+    and the profiler is enabled in that thread. Wrapping is idempotent:
+    `include_router` builds every route again with the same route class,
+    and a second wrapper would enable the profiler while it is active.
+
+    Args:
+        endpoint (Callable): The endpoint function.
+
+    Returns:
+        Callable: The wrapped endpoint.
+    """
+    if getattr(endpoint, "__profiled__", False):
+        return endpoint
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            profile.profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.profiler.disable()
+        async_wrapper.__profiled__ = True
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.profiler.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.profiler.disable()
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    An APIRoute whose endpoint can be profiled with `ProfileMiddleware`.
+
+    Use it as the `route_class` of a router.
+    """
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+class ProfileMiddleware:
+    """
+    ASGI middleware that profiles requests carrying the profiling secret.
+    """
+    def __init__(self, app, secret: str, output_dir: Path,
+                 top_functions: int = 40, top_allocations: int = 25) -> None:
+        """
+        Initializes the ProfileMiddleware.
+
+        Args:
+            app: The ASGI app.
+            secret (str): The value of X-Profile-Token that enables
+                          profiling; an empty secret disables it.
+            output_dir (Path): Where saved reports are written.
+            top_functions (int): The number of functions in a report.
+            top_allocations (int): The number of allocation sites in a report.
+        """
+        self.app = app
+        self.secret = secret
+        self.output_dir = Path(output_dir)
+        self.top_functions = top_functions
+        self.top_allocations = top_allocations
+
+    def _authorized(self, headers: Headers) -> bool:
+        token = headers.get(TOKEN_HEADER)
+        return bool(self.secret) and token is not None and hmac.compare_digest(
+            token.encode(), self.secret.encode()
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not self._authorized(headers):
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            response = JSONResponse(
+                {"message": "Another request is being profiled."}, status_code=409
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self._profile(scope, receive, send, headers.get(OUTPUT_HEADER) == "inline")
+        finally:
+            _busy.release()
+
+    async def _profile(self, scope, receive, send, inline: bool) -> None:
+        profile = RequestProfile(uuid.uuid4().hex)
+        status_code = 500
+
+        async def send_profiled(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if inline:
+                    return
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-report", profile.request_id.encode())
+                ]
+            elif inline:
+                return
+            await send(message)
+
+        token = _current.set(profile)
+        # Leave tracing on if it was started outside, e.g. by PYTHONTRACEMALLOC.
+        was_tracing = tracemalloc.is_tracing()
+        if was_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            profile.elapsed = time.perf_counter() - started
+            profile.snapshot = tracemalloc.take_snapshot()
+            profile.peak_bytes = tracemalloc.get_traced_memory()[1]
+            if not was_tracing:
+                tracemalloc.stop()
+            _current.reset(token)
+
+        report = profile.report(self.top_functions, self.top_allocations)
+        if inline:
+            response = PlainTextResponse(
+                report, headers={"X-Profile-Report": profile.request_id,
+                                 "X-Profile-Status": str(status_code)}
+            )
+            await response(scope, receive, send)
+            return
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        profile.profiler.dump_stats(self.output_dir / f"{profile.request_id}.prof")
+        (self.output_dir / f"{profile.request_id}.txt").write_text(report)
+
@@ -4,37 +4,151 @@ API router for database-related operations.
 This module defines the API endpoints for listing processed images
 stored in the database.
 """
-from fastapi import APIRouter, Depends, status
+import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, status
 from fastapi.responses import JSONResponse
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
+from ..config import settings
 from ..schemas import ErrorResponse
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models import ProcessedImage
 
 router = APIRouter()
 
 
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    """
+    Normalizes a datetime to UTC, treating naive values as UTC already.
+
+    Args:
+        value (datetime.datetime): The datetime to normalize.
+
+    Returns:
+        datetime.datetime: The datetime in UTC.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def list_images_query(
+    cursor: int | None,
+    limit: int,
+    original_filename: str | None,
+    created_after: datetime.datetime | None,
+    created_before: datetime.datetime | None,
+):
+    """
+    Builds the keyset-paginated query for processed images.
+
+    Only the columns needed by the response are selected, so rows come back
+    as lightweight tuples instead of ORM objects. One row more than `limit`
+    is fetched to tell whether another page follows.
+
+    Args:
+        cursor (int | None): Only return images with an id above this one.
+        limit (int): The page size.
+        original_filename (str | None): Only return images uploaded under
+                                        this filename.
+        created_after (datetime.datetime | None): Only return images created
+                                                  at or after this time.
+        created_before (datetime.datetime | None): Only return images created
+                                                   before this time.
+
+    Returns:
+        Select: The SQLAlchemy select statement.
+    """
+    query = select(
+        ProcessedImage.id,
+        ProcessedImage.original_filename,
+        ProcessedImage.processed_url,
+        ProcessedImage.created_at,
+    )
+    if cursor is not None:
+        query = query.where(ProcessedImage.id > cursor)
+    if original_filename is not None:
+        query = query.where(ProcessedImage.original_filename == original_filename)
+    if created_after is not None:
+        query = query.where(ProcessedImage.created_at >= _as_utc(created_after))
+    if created_before is not None:
+        query = query.where(ProcessedImage.created_at < _as_utc(created_before))
+    return query.order_by(ProcessedImage.id).limit(limit + 1)
+
+
+def serialize_rows(rows, limit: int) -> tuple[list[dict], int | None]:
+    """
+    Turns result rows into JSON-ready dicts and finds the next cursor.
+
+    Args:
+        rows (Sequence[Row]): The rows returned by `list_images_query`.
+        limit (int): The page size the query was run with.
+
+    Returns:
+        tuple[list[dict], int | None]: The serialized images, and the cursor
+                                       of the next page or None on the last
+                                       page.
+    """
+    rows = list(rows)
+    has_more = len(rows) > limit
+    items = [
+        {
+            "id": row.id,
+            "original_filename": row.original_filename,
+            "processed_url": row.processed_url,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = items[-1]["id"] if has_more else None
+    return items, next_cursor
+
+
 @router.get("/list")
 async def get_db_image_files(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    cursor: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = settings.FILES_LIST_PAGE_SIZE,
+    original_filename: str | None = None,
+    created_after: datetime.datetime | None = None,
+    created_before: datetime.datetime | None = None,
 ):
     """
-    Retrieve a list of all processed images from the database.
+    Retrieve one page of processed images from the database.
+
+    Pages are keyset-paginated on `id`: pass the value of the `X-Next-Cursor`
+    response header as `cursor` to fetch the next page. The header is absent
+    on the last page.
 
     Args:
-        db (Session): The database session, injected by Depends(get_db).
+        db (AsyncSession): The async database session, injected by
+                           Depends(get_async_db).
+        cursor (int | None): The id after which the page starts.
+        limit (int): The maximum number of images to return.
+        original_filename (str | None): Only return images uploaded under
+                                        this filename.
+        created_after (datetime.datetime | None): Only return images created
+                                                  at or after this time.
+        created_before (datetime.datetime | None): Only return images created
+                                                   before this time.
 
     Returns:
-        list[ProcessedImage]: A list of processed image records.
+        JSONResponse: A list of processed image records.
         JSONResponse: An error response if a database error occurs.
     """
     try:
-        files = db.scalars(select(ProcessedImage)).all()
-        return files
+        result = await db.execute(
+            list_images_query(cursor, limit, original_filename, created_after, created_before)
+        )
+        rows = result.all()
+        items, next_cursor = serialize_rows(rows, limit)
+        headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+        return JSONResponse(content=items, headers=headers)
     except SQLAlchemyError as e:
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,77 +1,399 @@
 """
 API router for image editing operations.
 
-This module defines endpoints for adding a white background to an image and
-adding a frame to an image.
+This module defines endpoints for adding a white background to an image,
+adding a frame to an image, and applying either operation to a batch of
+images in one request. Single edits can also be queued as jobs that are
+polled for their result. The pixel work itself lives in `app.engine` and
+is run through `app.image_pool` once `app.admission` has admitted it
+against the memory budget.
 """
-import io
+import asyncio
+import json
+import logging
+import math
+import time
 import uuid
 from pathlib import Path
+from typing import Annotated, Callable
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from PIL import Image
 
-from .. import models, schemas
+from .. import engine, models, schemas
+from ..admission import ImageTooLarge, MemoryBudgetExceeded, check_admissible, run_admitted
 from ..config import settings
-from ..database import get_db
+from ..database import get_async_db, get_db, get_session_factory
+from ..hashing import content_hash, edit_cache_key
+from ..http_utils import HTTP_413_CONTENT_TOO_LARGE, negotiate_image_format
+from ..ingest import UploadRejected, read_image_upload
+from ..jobs import ACTIVE_STATUSES, QueueFull, job_queue
+from ..object_cache import object_cache
+from ..profiling import ProfiledRoute
 from ..s3 import s3_bucket_service_factory
+from ..write_behind import write_behind
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=ProfiledRoute)
 
 # Create a single S3 service instance for reuse.
 s3 = s3_bucket_service_factory(settings)
 
+# The engine operations that /batch and /jobs accept.
+EDIT_OPERATIONS = ("add-white-bg", "add-frame")
+
+# The background size relative to the image. The canvas grows with its
+# square, so it is bounded to keep the output and the memory estimate sane.
+MAX_BG_COEFFICIENT = 4.0
+BgCoefficient = Annotated[float, Query(ge=1.0, le=MAX_BG_COEFFICIENT)]
+
+
+def _cache_key(contents: bytes, operation: str, params: dict) -> str:
+    """
+    Builds the cache key for an edit request.
+
+    Frame edits also depend on the frame file, so its mtime is part of the key.
+
+    Args:
+        contents (bytes): The uploaded image bytes.
+        operation (str): The name of the engine operation.
+        params (dict): The operation's parameters.
+
+    Returns:
+        str: The edit cache key.
+    """
+    key_params = dict(params)
+    if operation == "add-frame":
+        frame_path = Path("frames") / params["frame_name"]
+        key_params["frame_mtime"] = frame_path.stat().st_mtime_ns
+    return edit_cache_key(content_hash(contents), operation, **key_params)
+
+
+def _output_limits(max_width: int | None, max_height: int | None) -> dict:
+    """
+    Combines the requested output size limits with the server-side caps.
+
+    Args:
+        max_width (int | None): The maximum output width requested.
+        max_height (int | None): The maximum output height requested.
+
+    Returns:
+        dict: The effective max_width / max_height engine parameters; a
+              limit that is not set is left out.
+    """
+    limits = {}
+    for name, requested, cap in (
+        ("max_width", max_width, settings.MAX_OUTPUT_WIDTH),
+        ("max_height", max_height, settings.MAX_OUTPUT_HEIGHT),
+    ):
+        values = [value for value in (requested, cap) if value and value > 0]
+        if values:
+            limits[name] = min(values)
+    return limits
+
+
+def _output_format(request: Request, output_format: str | None) -> str:
+    """
+    Chooses the output format from the explicit parameter or the Accept header.
+
+    Args:
+        request (Request): The incoming request.
+        output_format (str | None): The format requested by parameter.
+
+    Raises:
+        HTTPException: If the requested format is not supported.
+
+    Returns:
+        str: The output format name.
+    """
+    available = engine.available_formats()
+    if output_format is not None:
+        output_format = output_format.lower()
+        if output_format not in available:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported output format '{output_format}'.",
+            )
+        return output_format
+    return negotiate_image_format(
+        request.headers.get("accept"),
+        {name: engine.OUTPUT_FORMATS[name].content_type for name in ("avif", "webp", "jpeg")
+         if name in available},
+        settings.DEFAULT_OUTPUT_FORMAT,
+    )
+
+
+def _operation_params(
+    request: Request,
+    operation: str,
+    bg_coefficient: float,
+    frame_name: str,
+    max_width: int | None,
+    max_height: int | None,
+    output_format: str | None,
+) -> dict:
+    """
+    Validates an operation name and builds its engine parameters.
+
+    Args:
+        request (Request): The incoming request, used for its Accept header.
+        operation (str): The operation to apply, "add-white-bg" or "add-frame".
+        bg_coefficient (float): The background coefficient for "add-white-bg".
+        frame_name (str): The name of the frame file for "add-frame".
+        max_width (int | None): The maximum width of the result.
+        max_height (int | None): The maximum height of the result.
+        output_format (str | None): The output format requested by parameter.
+
+    Raises:
+        HTTPException: If the operation is unknown, the frame is not found or
+                       the output format is not supported.
+
+    Returns:
+        dict: The operation's engine parameters.
+    """
+    if operation not in EDIT_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown operation '{operation}'.",
+        )
+    if operation == "add-frame":
+        params = {"frame_name": frame_name}
+        if not (Path("frames") / frame_name).is_file():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Frame '{frame_name}' not found.",
+            )
+    else:
+        params = {"bg_coefficient": bg_coefficient}
+    params.update(_output_limits(max_width, max_height))
+    params["output_format"] = _output_format(request, output_format)
+    return params
+
+
+def _upload_result(result: bytes, encoding: engine.OutputFormat) -> str:
+    """
+    Uploads an edit result to S3 under a new UUID name.
+
+    The result is also put in the local object cache, since it is usually
+    fetched again right away.
+
+    Args:
+        result (bytes): The encoded result.
+        encoding (engine.OutputFormat): The result's output format.
+
+    Returns:
+        str: The key of the uploaded object.
+    """
+    saved_filename = f"{uuid.uuid4()}{encoding.extension}"
+    etag = s3.upload_object(saved_filename, result, content_type=encoding.content_type)
+    object_cache.put(saved_filename, result, encoding.content_type, etag=etag)
+    return saved_filename
+
+
+def _discard_result(result_url: str) -> None:
+    """
+    Deletes an uploaded edit result that lost the race to record its cache
+    key, so it doesn't stay behind in the bucket unreferenced.
+
+    Args:
+        result_url (str): The URL of the unrecorded result.
+    """
+    saved_filename = result_url.removeprefix(f"{settings.S3_PUBLIC_URL}/")
+    object_cache.discard(saved_filename)
+    try:
+        s3.delete_object(saved_filename)
+    except Exception:
+        logger.exception("Could not delete unrecorded edit result %s", saved_filename)
+
+
+def _read_image(file: UploadFile) -> bytes:
+    """
+    Reads an uploaded image once its size and sniffed type are validated.
+
+    Args:
+        file (UploadFile): The uploaded image.
+
+    Raises:
+        HTTPException: 413 if the file is larger than EDIT_MAX_FILE_SIZE, or
+                       415 if it is not an image the engine can decode.
+
+    Returns:
+        bytes: The image bytes.
+    """
+    try:
+        return read_image_upload(file, settings.EDIT_MAX_FILE_SIZE)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+
+def _overloaded(exc: MemoryBudgetExceeded) -> HTTPException:
+    """
+    Builds the 503 response for work turned away by the memory budget.
+
+    Args:
+        exc (MemoryBudgetExceeded): The admission error.
+
+    Returns:
+        HTTPException: A 503 with a Retry-After header.
+    """
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _too_large(exc: ImageTooLarge) -> HTTPException:
+    """
+    Builds the 413 response for work that could never fit the memory budget.
+
+    Args:
+        exc (ImageTooLarge): The admission error.
+
+    Returns:
+        HTTPException: A 413 explaining the limit.
+    """
+    return HTTPException(status_code=HTTP_413_CONTENT_TOO_LARGE, detail=str(exc))
+
+
+def _find_cached(db: Session, cache_key: str) -> str | None:
+    """
+    Looks up the URL of a previously processed image by its cache key.
+
+    Rows still waiting in the write-behind queue are found as well.
+
+    Args:
+        db (Session): The database session.
+        cache_key (str): The edit cache key.
+
+    Returns:
+        str | None: The URL of the existing image, if any.
+    """
+    if write_behind is not None:
+        queued_url = write_behind.lookup(cache_key)
+        if queued_url is not None:
+            return queued_url
+    return db.scalars(
+        select(models.ProcessedImage.processed_url)
+        .where(models.ProcessedImage.cache_key == cache_key)
+    ).first()
+
+
+def _save_result(
+    db: Session,
+    original_filename: str,
+    result_url: str,
+    cache_key: str,
+) -> str:
+    """
+    Stores a processed image record.
+
+    With write-behind enabled the row is only queued for the next group
+    commit. If a concurrent request stored the same cache key first, its URL
+    is returned instead and the result uploaded under `result_url` is
+    deleted.
+
+    Args:
+        db (Session): The database session.
+        original_filename (str): The original filename of the upload.
+        result_url (str): The URL of the processed image.
+        cache_key (str): The edit cache key.
+
+    Returns:
+        str: The URL recorded for this cache key.
+    """
+    if write_behind is not None:
+        recorded_url = write_behind.submit(original_filename, result_url, cache_key)
+        if recorded_url != result_url:
+            _discard_result(result_url)
+        return recorded_url
+
+    db_image = models.ProcessedImage(
+        original_filename=original_filename,
+        processed_url=result_url,
+        cache_key=cache_key,
+    )
+    db.add(db_image)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing_url = _find_cached(db, cache_key)
+        if existing_url is None:
+            raise
+        _discard_result(result_url)
+        return existing_url
+    db.refresh(db_image)
+    return result_url
+
 
 @router.post("/add-white-bg/", response_model=schemas.ImageResponse)
 def process_add_white_bg(
+    request: Request,
     db: Session = Depends(get_db),
     file: UploadFile = File(...),
-    bg_coefficient: float = 1.3,
+    bg_coefficient: BgCoefficient = 1.3,
+    max_width: int | None = None,
+    max_height: int | None = None,
+    output_format: str | None = None,
 ) -> dict:
     """
     Places the uploaded image on a white background, saves it to S3,
     and stores its information in the database.
 
+    A repeated request with the same image bytes and coefficient returns the
+    existing URL without reprocessing or uploading anything.
+
     Args:
+        request (Request): The incoming request, used for its Accept header.
         db (Session): The database session.
         file (UploadFile): The image file to process.
         bg_coefficient (float): The coefficient to determine the size of the
-                                white background relative to the image size.
+                                white background relative to the image size,
+                                from 1 to MAX_BG_COEFFICIENT.
+        max_width (int | None): The maximum width of the result. Large inputs
+                                are shrunk while decoding to fit.
+        max_height (int | None): The maximum height of the result.
+        output_format (str | None): The output format ("jpeg", "webp" or
+                                    "avif"). Negotiated from the Accept
+                                    header when not given.
 
     Raises:
-        HTTPException: If the image is too large or if an error occurs
-                       during processing.
+        HTTPException: If the upload is too large or not a supported image,
+                       the edit would need more than the whole memory budget
+                       (413), the server is out of image memory (503 with
+                       Retry-After), or an error occurs during processing.
 
     Returns:
         dict: A dictionary containing the original filename and the URL of
               the processed image.
     """
+    fmt = _output_format(request, output_format)
+    contents = _read_image(file)
     try:
-        contents = file.file.read()
-        user_image = Image.open(io.BytesIO(contents)).convert("RGBA")
-        new_width = int(user_image.width * bg_coefficient)
-        new_height = int(user_image.height * bg_coefficient)
-        background = Image.new("RGBA", (new_width, new_height), "WHITE")
-        paste_x = (new_width - user_image.width) // 2
-        paste_y = (new_height - user_image.height) // 2
-        background.paste(user_image, (paste_x, paste_y), user_image)
-        final_image = background.convert("RGB")
-
-        unique_id = uuid.uuid4()
-        saved_filename = f"{unique_id}.jpg"
-        buffer = io.BytesIO()
-        final_image.save(buffer, format="JPEG")
-        s3.upload_object(saved_filename, buffer.getvalue())
-        result_url = f"{settings.S3_PUBLIC_URL}/{saved_filename}"
+        params = {
+            "bg_coefficient": bg_coefficient,
+            "output_format": fmt,
+            **_output_limits(max_width, max_height),
+        }
+        cache_key = _cache_key(contents, "add-white-bg", params)
+        cached_url = _find_cached(db, cache_key)
+        if cached_url is not None:
+            return {"filename": file.filename, "url": cached_url}
 
-        db_image = models.ProcessedImage(
-            original_filename=file.filename,
-            processed_url=result_url,
-        )
-        db.add(db_image)
-        db.commit()
-        db.refresh(db_image)
+        result = run_admitted("add-white-bg", contents, **params)
+
+        encoding = engine.OUTPUT_FORMATS[fmt]
+        saved_filename = _upload_result(result, encoding)
+        result_url = f"{settings.S3_PUBLIC_URL}/{saved_filename}"
+        result_url = _save_result(db, file.filename, result_url, cache_key)
 
         return {"filename": file.filename, "url": result_url}
     except Image.DecompressionBombError:
@@ -79,6 +401,10 @@ def process_add_white_bg(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Image size is too large.",
         )
+    except ImageTooLarge as e:
+        raise _too_large(e)
+    except MemoryBudgetExceeded as e:
+        raise _overloaded(e)
     except Exception as e:  # pragma: no cover - defensive programming
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -88,22 +414,39 @@ def process_add_white_bg(
 
 @router.post("/add-frame/", response_model=schemas.ImageResponse)
 def process_add_frame(
+    request: Request,
     db: Session = Depends(get_db),
     file: UploadFile = File(...),
     frame_name: str = "frame.png",
+    max_width: int | None = None,
+    max_height: int | None = None,
+    output_format: str | None = None,
 ) -> dict:
     """
     Overlays the uploaded image with a specified frame, saves it to S3,
     and stores its information in the database.
 
+    A repeated request with the same image bytes and frame returns the
+    existing URL without reprocessing or uploading anything.
+
     Args:
+        request (Request): The incoming request, used for its Accept header.
         db (Session): The database session.
         file (UploadFile): The image file to process.
         frame_name (str): The name of the frame file to apply.
+        max_width (int | None): The maximum width of the result. Large inputs
+                                are shrunk while decoding to fit.
+        max_height (int | None): The maximum height of the result.
+        output_format (str | None): The output format ("jpeg", "webp" or
+                                    "avif"). Negotiated from the Accept
+                                    header when not given.
 
     Raises:
-        HTTPException: If the frame is not found, the image is too large,
-                       or an error occurs during processing.
+        HTTPException: If the frame is not found, the upload is too large
+                       or not a supported image, the edit would need more
+                       than the whole memory budget (413), the server is out
+                       of image memory (503 with Retry-After), or an error
+                       occurs during processing.
 
     Returns:
         dict: A dictionary containing the original filename and the URL of
@@ -115,27 +458,26 @@ def process_add_frame(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Frame '{frame_name}' not found.",
         )
+    fmt = _output_format(request, output_format)
+    contents = _read_image(file)
 
     try:
-        user_image = Image.open(file.file).convert("RGBA")
-        frame_image = Image.open(frame_path).convert("RGBA")
-        frame_image = frame_image.resize(user_image.size)
-        combined = Image.alpha_composite(user_image, frame_image).convert("RGB")
-
-        unique_id = uuid.uuid4()
-        saved_filename = f"{unique_id}.jpg"
-        buffer = io.BytesIO()
-        combined.save(buffer, format="JPEG")
-        s3.upload_object(saved_filename, buffer.getvalue())
-        result_url = f"{settings.S3_PUBLIC_URL}/{saved_filename}"
+        params = {
+            "frame_name": frame_name,
+            "output_format": fmt,
+            **_output_limits(max_width, max_height),
+        }
+        cache_key = _cache_key(contents, "add-frame", params)
+        cached_url = _find_cached(db, cache_key)
+        if cached_url is not None:
+            return {"filename": file.filename, "url": cached_url}
 
-        db_image = models.ProcessedImage(
-            original_filename=file.filename,
-            processed_url=result_url,
-        )
-        db.add(db_image)
-        db.commit()
-        db.refresh(db_image)
+        result = run_admitted("add-frame", contents, **params)
+
+        encoding = engine.OUTPUT_FORMATS[fmt]
+        saved_filename = _upload_result(result, encoding)
+        result_url = f"{settings.S3_PUBLIC_URL}/{saved_filename}"
+        result_url = _save_result(db, file.filename, result_url, cache_key)
 
         return {"filename": file.filename, "url": result_url}
     except Image.DecompressionBombError:
@@ -143,8 +485,417 @@ def process_add_frame(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Image size is too large.",
         )
+    except ImageTooLarge as e:
+        raise _too_large(e)
+    except MemoryBudgetExceeded as e:
+        raise _overloaded(e)
     except Exception as e:  # pragma: no cover - defensive programming
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred during processing: {e}",
         )
+
+
+def _save_batch(db: Session, rows: list[dict]) -> list[str]:
+    """
+    Stores the records of a batch in a single transaction.
+
+    If the batch collides with a concurrent request on a cache key, the rows
+    are stored one by one instead, and the URL that request stored first is
+    kept for that key.
+
+    Args:
+        db (Session): The database session.
+        rows (list[dict]): The original_filename, processed_url and
+                           cache_key of each new image.
+
+    Returns:
+        list[str]: The URL recorded for each row's cache key, in row order.
+    """
+    if not rows:
+        return []
+    if write_behind is None:
+        db.add_all(models.ProcessedImage(**row) for row in rows)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        else:
+            return [row["processed_url"] for row in rows]
+    return [
+        _save_result(db, row["original_filename"], row["processed_url"], row["cache_key"])
+        for row in rows
+    ]
+
+
+def _read_batch(files: list[UploadFile], operation: str, params: dict) -> list[dict]:
+    """
+    Reads and validates the files of a batch, and computes their cache keys.
+
+    Args:
+        files (list[UploadFile]): The uploaded images.
+        operation (str): The name of the engine operation.
+        params (dict): The operation's parameters.
+
+    Returns:
+        list[dict]: The "filename" of each file, with its "contents" and
+                    "cache_key", or the "error" it was rejected with.
+    """
+    uploads = []
+    for file in files:
+        try:
+            contents = read_image_upload(file, settings.EDIT_MAX_FILE_SIZE)
+        except UploadRejected as e:
+            uploads.append({"filename": file.filename, "error": e.message})
+            continue
+        uploads.append({
+            "filename": file.filename,
+            "contents": contents,
+            "cache_key": _cache_key(contents, operation, params),
+        })
+    return uploads
+
+
+@router.post("/batch")
+async def process_batch(
+    request: Request,
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+    files: list[UploadFile] = File(...),
+    operation: str = "add-white-bg",
+    bg_coefficient: BgCoefficient = 1.3,
+    frame_name: str = "frame.png",
+    max_width: int | None = None,
+    max_height: int | None = None,
+    output_format: str | None = None,
+) -> StreamingResponse:
+    """
+    Applies one edit operation to many images in a single request.
+
+    Images are processed and uploaded concurrently, and each result is
+    streamed back as one NDJSON line as soon as it is ready. An image sent
+    more than once is processed once, and its repeats are reported as
+    cached. All new records are written in a single transaction once every
+    image is done, and a final summary line reports the totals. If another
+    request stored one of the same edits first, its URL is the one recorded,
+    and the summary lists it under "reconciled" with the image's index.
+
+    The stream outlives the request's dependencies, so it opens its own
+    database session.
+
+    Args:
+        request (Request): The incoming request, used for its Accept header.
+        session_factory (Callable[[], Session]): Creates the stream's
+                                                 database session.
+        files (list[UploadFile]): The image files to process.
+        operation (str): The operation to apply, "add-white-bg" or "add-frame".
+        bg_coefficient (float): The background coefficient for "add-white-bg".
+        frame_name (str): The name of the frame file for "add-frame".
+        max_width (int | None): The maximum width of each result.
+        max_height (int | None): The maximum height of each result.
+        output_format (str | None): The output format for every result.
+                                    Negotiated from the Accept header when
+                                    not given.
+
+    Raises:
+        HTTPException: If the operation is unknown, the frame is not found or
+                       too many files are sent.
+
+    Returns:
+        StreamingResponse: An application/x-ndjson stream with one line per
+                           image followed by a summary line.
+    """
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_FILES} files can be sent per batch.",
+        )
+    params = _operation_params(
+        request, operation, bg_coefficient, frame_name, max_width, max_height, output_format
+    )
+    encoding = engine.OUTPUT_FORMATS[params["output_format"]]
+
+    # The uploads are closed once this function returns, before the stream
+    # below runs, so every file is read and validated up front.
+    uploads = await run_in_threadpool(_read_batch, files, operation, params)
+    repeats: dict[str, list[int]] = {}
+    for index, upload in enumerate(uploads):
+        if "cache_key" in upload:
+            repeats.setdefault(upload["cache_key"], []).append(index)
+
+    slots = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    # A Session must not be used from several threads at once.
+    db_lock = asyncio.Lock()
+    new_rows: list[dict] = []
+
+    async def process_one(db: Session, cache_key: str, indices: list[int]) -> list[dict]:
+        upload = uploads[indices[0]]
+        async with slots:
+            try:
+                async with db_lock:
+                    cached_url = await run_in_threadpool(_find_cached, db, cache_key)
+                if cached_url is not None:
+                    outcome = {"url": cached_url, "cached": True}
+                else:
+                    result = await run_in_threadpool(
+                        run_admitted, operation, upload["contents"], **params
+                    )
+                    saved_filename = await run_in_threadpool(_upload_result, result, encoding)
+                    result_url = f"{settings.S3_PUBLIC_URL}/{saved_filename}"
+                    new_rows.append({
+                        "original_filename": upload["filename"],
+                        "processed_url": result_url,
+                        "cache_key": cache_key,
+                    })
+                    outcome = {"url": result_url, "cached": False}
+            except Exception as e:
+                outcome = {"error": f"An error occurred during processing: {e}"}
+        lines = []
+        for repeat, index in enumerate(indices):
+            line = {"index": index, "filename": uploads[index]["filename"], **outcome}
+            if repeat and "url" in line:
+                line["cached"] = True
+            lines.append(line)
+        return lines
+
+    async def results():
+        db = session_factory()
+        tasks = [
+            asyncio.create_task(process_one(db, cache_key, indices))
+            for cache_key, indices in repeats.items()
+        ]
+        failed = cached = 0
+        try:
+            for index, upload in enumerate(uploads):
+                if "error" in upload:
+                    failed += 1
+                    yield json.dumps({"index": index, "filename": upload["filename"],
+                                      "error": upload["error"]}) + "\n"
+            for next_done in asyncio.as_completed(tasks):
+                for line in await next_done:
+                    failed += "error" in line
+                    cached += bool(line.get("cached"))
+                    yield json.dumps(line) + "\n"
+            recorded_urls = await run_in_threadpool(_save_batch, db, new_rows)
+            summary = {
+                "done": True,
+                "total": len(files),
+                "processed": len(new_rows),
+                "cached": cached,
+                "failed": failed,
+            }
+            reconciled = [
+                {"index": index, "url": recorded_url}
+                for row, recorded_url in zip(new_rows, recorded_urls)
+                if recorded_url != row["processed_url"]
+                for index in repeats[row["cache_key"]]
+            ]
+            if reconciled:
+                summary["reconciled"] = reconciled
+            yield json.dumps(summary) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            db.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def run_job(db: Session, job: models.EditJob, contents: bytes) -> tuple[str, dict]:
+    """
+    Runs a queued edit job; called from the job queue's worker threads.
+
+    Args:
+        db (Session): The database session.
+        job (models.EditJob): The claimed job.
+        contents (bytes): The uploaded image bytes.
+
+    Returns:
+        tuple[str, dict]: The URL of the processed image, and the durations
+                          of the process and upload stages in milliseconds.
+    """
+    cache_key = _cache_key(contents, job.operation, job.params)
+    cached_url = _find_cached(db, cache_key)
+    if cached_url is not None:
+        return cached_url, {"cached": True}
+
+    started = time.perf_counter()
+    # Queued jobs wait for the memory budget instead of failing.
+    result = run_admitted(job.operation, contents, wait=math.inf, **job.params)
+    process_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    encoding = engine.OUTPUT_FORMATS[job.params["output_format"]]
+    started = time.perf_counter()
+    saved_filename = _upload_result(result, encoding)
+    upload_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    result_url = f"{settings.S3_PUBLIC_URL}/{saved_filename}"
+    result_url = _save_result(db, job.original_filename, result_url, cache_key)
+    return result_url, {"cached": False, "process_ms": process_ms, "upload_ms": upload_ms}
+
+
+def _job_response(job: models.EditJob) -> dict:
+    """
+    Serializes a job for the job endpoints.
+
+    Args:
+        job (models.EditJob): The job.
+
+    Returns:
+        dict: The job's public fields.
+    """
+    return {
+        "id": job.id,
+        "status": job.status,
+        "operation": job.operation,
+        "filename": job.original_filename,
+        "url": job.result_url,
+        "error": job.error,
+        "timings": job.timings,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _job_not_found(job_id: str) -> HTTPException:
+    """
+    Builds the 404 response for an unknown job.
+
+    Args:
+        job_id (str): The id of the missing job.
+
+    Returns:
+        HTTPException: The error response.
+    """
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Job '{job_id}' not found.",
+    )
+
+
+@router.post(
+    "/jobs",
+    response_model=schemas.JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def submit_job(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    file: UploadFile = File(...),
+    operation: str = "add-white-bg",
+    bg_coefficient: BgCoefficient = 1.3,
+    frame_name: str = "frame.png",
+    max_width: int | None = None,
+    max_height: int | None = None,
+    output_format: str | None = None,
+) -> dict:
+    """
+    Queues an edit and returns its job without waiting for the result.
+
+    Args:
+        request (Request): The incoming request, used for its Accept header.
+        response (Response): The response, used to set the Location header.
+        db (Session): The database session.
+        file (UploadFile): The image file to process.
+        operation (str): The operation to apply, "add-white-bg" or "add-frame".
+        bg_coefficient (float): The background coefficient for "add-white-bg".
+        frame_name (str): The name of the frame file for "add-frame".
+        max_width (int | None): The maximum width of the result.
+        max_height (int | None): The maximum height of the result.
+        output_format (str | None): The output format. Negotiated from the
+                                    Accept header when not given.
+
+    Raises:
+        HTTPException: If the operation is unknown, the frame is not found,
+                       the upload is too large or not a supported image, the
+                       edit would need more than the whole memory budget
+                       (413), or too many jobs are queued (503 with
+                       Retry-After).
+
+    Returns:
+        dict: The queued job. The Location header points at it.
+    """
+    params = _operation_params(
+        request, operation, bg_coefficient, frame_name, max_width, max_height, output_format
+    )
+    contents = _read_image(file)
+    try:
+        check_admissible(operation, contents, **params)
+        job = job_queue.submit(db, operation, params, file.filename, contents)
+    except Image.DecompressionBombError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Image size is too large.",
+        )
+    except ImageTooLarge as e:
+        raise _too_large(e)
+    except QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many queued jobs, try again later.",
+            headers={"Retry-After": str(max(1, math.ceil(settings.JOB_POLL_INTERVAL)))},
+        )
+    response.headers["Location"] = str(request.url_for("get_job", job_id=job.id))
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobResponse)
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    wait: float = Query(0, ge=0, description="Seconds to long-poll for the job to finish."),
+) -> dict:
+    """
+    Returns a job, optionally long-polling until it finishes.
+
+    Args:
+        job_id (str): The job id.
+        db (AsyncSession): The async database session.
+        wait (float): How long to wait for a queued or running job to
+                      finish, in seconds; capped at JOB_MAX_WAIT.
+
+    Raises:
+        HTTPException: If the job does not exist.
+
+    Returns:
+        dict: The job.
+    """
+    job = await db.get(models.EditJob, job_id)
+    if job is None:
+        raise _job_not_found(job_id)
+    deadline = time.monotonic() + min(wait, settings.JOB_MAX_WAIT)
+    while job.status in ACTIVE_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        await job_queue.wait(job_id, min(remaining, settings.JOB_POLL_INTERVAL))
+        job = await db.get(models.EditJob, job_id, populate_existing=True)
+    return _job_response(job)
+
+
+@router.delete("/jobs/{job_id}", response_model=schemas.JobResponse)
+def cancel_job(job_id: str, db: Session = Depends(get_db)) -> dict:
+    """
+    Cancels a job that has not started yet.
+
+    Args:
+        job_id (str): The job id.
+        db (Session): The database session.
+
+    Raises:
+        HTTPException: If the job does not exist (404), or is already
+                       running or finished (409).
+
+    Returns:
+        dict: The cancelled job.
+    """
+    if db.get(models.EditJob, job_id) is None:
+        raise _job_not_found(job_id)
+    if not job_queue.cancel(db, job_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Only queued jobs can be cancelled.",
+        )
+    job = db.get(models.EditJob, job_id, populate_existing=True)
+    return _job_response(job)
@@ -0,0 +1,24 @@
+"""
+API router for the Prometheus metrics endpoint.
+"""
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from .. import metrics
+
+router = APIRouter()
+
+
+@router.get("", include_in_schema=False)
+async def get_metrics() -> Response:
+    """
+    Returns the application metrics in the Prometheus text format.
+
+    The endpoint is async so the threadpool gauges are read from the event
+    loop that owns the threadpool.
+
+    Returns:
+        Response: The rendered metrics.
+    """
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
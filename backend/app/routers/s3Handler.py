@@ -1,58 +1,653 @@
 """
 API router for S3 bucket operations.
 
-This module defines endpoints for listing objects, retrieving an object by key,
-and uploading files to the S3 bucket.
+This module defines endpoints for listing objects, retrieving an object or a
+resized derivative of it by key, and uploading files to the S3 bucket,
+either through the server or straight to the bucket with presigned URLs.
 """
+import datetime
 import os
-from typing import Annotated
+import re
+from typing import Annotated, AsyncIterator, Awaitable, Callable
 import uuid
-from fastapi import APIRouter, File, UploadFile, status
-from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import closing
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, File, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from PIL import Image, UnidentifiedImageError
 
+from .. import engine
+from ..admission import ImageTooLarge, MemoryBudgetExceeded, run_admitted
 from ..s3 import s3_bucket_service_factory
 from ..config import settings
+from ..database import get_async_db
+from ..derivatives import FITS, SourceRejected, default_format, derivative_locks, derived_key
+from ..hashing import fileobj_hash
+from ..http_utils import (
+    HTTP_413_CONTENT_TOO_LARGE,
+    HTTP_416_RANGE_NOT_SATISFIABLE,
+    IMMUTABLE_KEY_RE,
+    RangeNotSatisfiable,
+    cache_control_for,
+    format_http_date,
+    is_not_modified,
+    parse_range,
+    range_applies,
+)
+from ..ingest import (
+    EXTENSIONS,
+    IMAGE_TYPES,
+    SNIFF_BYTES,
+    UploadRejected,
+    sniff_content_type,
+    upload_size,
+    validate_upload,
+)
+from ..models import DirectUpload
+from ..object_cache import CachedObject, object_cache
+from ..profiling import ProfiledRoute
 from ..schemas import *
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 s3 = s3_bucket_service_factory(settings)
 
-@router.get("/list")
-def get_list_objects() -> list[str]:
+@router.get("/list", response_model=ObjectListResponse)
+def get_list_objects(
+    prefix: str = "",
+    page_size: Annotated[int, Query(ge=1, le=1000)] = settings.S3_LIST_PAGE_SIZE,
+    continuation_token: str | None = None,
+) -> dict:
     """
-    Retrieves a list of all object keys from the S3 bucket.
+    Retrieves one page of object keys from the S3 bucket.
+
+    Pass the returned `next_token` as `continuation_token` to fetch the next
+    page; it is null on the last page.
+
+    Args:
+        prefix (str): Only list keys starting with this prefix.
+        page_size (int): The maximum number of keys to return.
+        continuation_token (str | None): The token of the page to fetch.
+
+    Returns:
+        dict: The keys of the page and the token of the next page.
+    """
+    keys, next_token = s3.list_objects_page(prefix, page_size, continuation_token)
+    return {"keys": keys, "next_token": next_token}
+
+
+def _is_missing(error) -> bool:
+    """
+    Checks whether an S3 error means the object does not exist.
+
+    Args:
+        error (Any): A ClientError, or any other value.
+
+    Returns:
+        bool: True for NoSuchKey / 404 errors.
+    """
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get("Error", {}).get("Code")
+    return code in ("NoSuchKey", "404", "NotFound")
+
+
+def _redirect(file_key: str) -> RedirectResponse:
+    """
+    Redirects a download to a short-lived presigned S3 URL.
+
+    The redirect is only cached for half the URL's lifetime, so a cached
+    redirect never points at an expired URL.
+
+    Args:
+        file_key (str): The key of the object.
+
+    Returns:
+        RedirectResponse: A 302 to the presigned URL.
+    """
+    return RedirectResponse(
+        s3.presigned_get_url(file_key, settings.S3_REDIRECT_EXPIRES),
+        status_code=status.HTTP_302_FOUND,
+        headers={"Cache-Control": f"private, max-age={settings.S3_REDIRECT_EXPIRES // 2}"},
+    )
+
+
+def _not_found(file_key: str) -> JSONResponse:
+    """
+    Builds the 404 response for a missing object.
+
+    Args:
+        file_key (str): The key of the missing object.
+
+    Returns:
+        JSONResponse: The error response.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content=ErrorResponse(message=f"File '{file_key}' not found!").model_dump(),
+    )
+
+
+def _object_headers(file_key: str, obj: dict) -> dict:
+    """
+    Builds the caching headers for an S3 object.
+
+    Args:
+        file_key (str): The key of the object.
+        obj (dict): An S3 get_object or head_object response.
+
+    Returns:
+        dict: The ETag, Last-Modified, Cache-Control and Accept-Ranges headers.
+    """
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control_for(file_key, settings.IMMUTABLE_CACHE_CONTROL),
+    }
+    if obj.get("ETag"):
+        headers["ETag"] = obj["ETag"]
+    if obj.get("LastModified"):
+        headers["Last-Modified"] = format_http_date(obj["LastModified"])
+    return headers
+
+
+def _multipart_byteranges(
+    file_key: str,
+    ranges: list[tuple[int, int]],
+    size: int,
+    media_type: str,
+) -> tuple[str, int, AsyncIterator[bytes]]:
+    """
+    Builds a multipart/byteranges body from one ranged S3 GET per range.
+
+    `parse_range` has already merged the ranges and capped their number at
+    MAX_RANGES, so a request makes at most that many S3 calls.
+
+    Args:
+        file_key (str): The key of the object.
+        ranges (list[tuple[int, int]]): The inclusive byte ranges to send.
+        size (int): The total size of the object.
+        media_type (str): The object's content type.
+
+    Returns:
+        tuple[str, int, AsyncIterator[bytes]]: The boundary, the total body
+                                               length and the body iterator.
+    """
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    length = sum(len(h) for h in part_headers) + 2 * (len(ranges) - 1) + len(closing)
+    length += sum(end - start + 1 for start, end in ranges)
+
+    async def body() -> AsyncIterator[bytes]:
+        for index, ((start, end), header) in enumerate(zip(ranges, part_headers)):
+            if index:
+                yield b"\r\n"
+            yield header
+            obj = await s3.aget_object_by_key(file_key, f"bytes={start}-{end}")
+            if isinstance(obj, ClientError):
+                raise obj
+            async for chunk in s3.iter_body(obj["Body"]):
+                yield chunk
+        yield closing
+
+    return boundary, length, body()
+
+
+async def _read_through(file_key: str, obj: dict) -> AsyncIterator[bytes]:
+    """
+    Streams an S3 object body and puts the object in the local cache once
+    it has been sent completely.
+
+    Args:
+        file_key (str): The key of the object.
+        obj (dict): The S3 get_object response.
+
+    Yields:
+        bytes: The chunks of the body.
+    """
+    chunks = []
+    async for chunk in s3.iter_body(obj['Body']):
+        chunks.append(chunk)
+        yield chunk
+    await s3.run_io(
+        object_cache.put,
+        file_key,
+        b"".join(chunks),
+        obj.get('ContentType') or 'application/octet-stream',
+        obj.get('ETag'),
+        obj.get('LastModified'),
+    )
+
+
+def _body(file_key: str, obj: dict, cacheable: bool) -> AsyncIterator[bytes]:
+    """
+    Returns the body iterator of an S3 object, reading it through the local
+    cache when the object may be cached.
+
+    Args:
+        file_key (str): The key of the object.
+        obj (dict): The S3 get_object response.
+        cacheable (bool): Whether the object's key is immutable.
+
+    Returns:
+        AsyncIterator[bytes]: The chunks of the body.
+    """
+    size = obj.get('ContentLength')
+    if cacheable and size is not None and object_cache.cacheable(size):
+        return _read_through(file_key, obj)
+    return s3.iter_body(obj['Body'])
+
+
+class _CachedFileResponse(FileResponse):
+    """
+    A FileResponse for a disk cache entry that serves the object from S3
+    instead if the file is evicted before the response starts.
+    """
+    def __init__(
+        self, path, fallback: Callable[[], Awaitable[Response]], **kwargs
+    ) -> None:
+        """
+        Initializes the _CachedFileResponse.
+
+        Args:
+            path: The cached file.
+            fallback (Callable[[], Awaitable[Response]]): Builds the response
+                                                         served from S3.
+            **kwargs: The FileResponse arguments.
+        """
+        super().__init__(path, **kwargs)
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            stat_result = await run_in_threadpool(os.stat, self.path)
+        except FileNotFoundError:
+            response = await self.fallback()
+            await response(scope, receive, send)
+            return
+        self.stat_result = stat_result
+        self.set_stat_headers(stat_result)
+        await super().__call__(scope, receive, send)
+
+
+def _serve_cached(
+    cached: CachedObject,
+    request: Request,
+    cache_name: str,
+    fallback: Callable[[], Awaitable[Response]],
+) -> Response | None:
+    """
+    Serves an object from the local cache.
+
+    Args:
+        cached (CachedObject): The cached object.
+        request (Request): The incoming request, used for its conditional
+                           and Range headers.
+        cache_name (str): The key whose name decides the Cache-Control header.
+        fallback (Callable[[], Awaitable[Response]]): Serves the object from
+                                                     S3, for a disk entry
+                                                     evicted before it is
+                                                     sent.
+
+    Returns:
+        Response | None: The response, or None if the request must go to S3
+                         (a multi-range request on a memory entry, or a disk
+                         entry without an ETag).
+    """
+    if cached.path is not None and cached.etag is None:
+        # FileResponse would make up a stat-based ETag that differs from the
+        # one S3 sends; reading through S3 caches the object with its own.
+        return None
+
+    headers = _object_headers(
+        cache_name, {"ETag": cached.etag, "LastModified": cached.last_modified}
+    )
+    if is_not_modified(request.headers, cached.etag, cached.last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if cached.path is not None:
+        # FileResponse answers Range and If-Range itself and sends the file
+        # with sendfile where the server supports it.
+        return _CachedFileResponse(
+            cached.path, fallback, media_type=cached.content_type, headers=headers
+        )
+
+    ranges = None
+    if range_applies(request.headers, cached.etag, cached.last_modified):
+        try:
+            ranges = parse_range(request.headers.get("range"), cached.size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{cached.size}"
+            return Response(status_code=HTTP_416_RANGE_NOT_SATISFIABLE, headers=headers)
+    if ranges is None:
+        return Response(content=cached.data, media_type=cached.content_type, headers=headers)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers['Content-Range'] = f"bytes {start}-{end}/{cached.size}"
+        return Response(
+            content=cached.data[start:end + 1],
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=cached.content_type,
+            headers=headers,
+        )
+    return None
+
+
+async def _serve_object(
+    file_key: str, request: Request, cache_name: str, use_cache: bool = True
+):
+    """
+    Serves an S3 object, honouring conditional and Range headers.
+
+    Args:
+        file_key (str): The key of the object to serve.
+        request (Request): The incoming request, used for its conditional
+                           and Range headers.
+        cache_name (str): The key whose name decides the Cache-Control
+                          header; a derivative uses its original's.
+        use_cache (bool): Whether the object may be served from the local
+                          cache; it is still read through it.
+
+    Returns:
+        StreamingResponse: The object content as a streaming response.
+        Response: An empty 304 or 416 response.
+        JSONResponse: A 404 response if the object does not exist.
+    """
+    cacheable = IMMUTABLE_KEY_RE.match(cache_name) is not None
+    if cacheable and use_cache:
+        cached = object_cache.get(file_key)
+        if cached is not None:
+            response = _serve_cached(
+                cached,
+                request,
+                cache_name,
+                lambda: _serve_object(file_key, request, cache_name, use_cache=False),
+            )
+            if response is not None:
+                return response
+
+    conditional = any(
+        name in request.headers
+        for name in ("range", "if-none-match", "if-modified-since")
+    )
+    if not conditional:
+        # Plain GETs need no metadata up front, so skip the HEAD round trip.
+        obj = await s3.aget_object_by_key(file_key)
+        if _is_missing(obj):
+            return _not_found(file_key)
+        if isinstance(obj, ClientError):
+            raise obj
+        media_type = obj.get('ContentType') or 'application/octet-stream'
+        headers = _object_headers(cache_name, obj)
+        if obj.get('ContentLength') is not None:
+            headers['Content-Length'] = str(obj['ContentLength'])
+        return StreamingResponse(
+            content=_body(file_key, obj, cacheable), media_type=media_type, headers=headers
+        )
+
+    try:
+        meta = await s3.ahead_object(file_key)
+    except ClientError as e:
+        if _is_missing(e):
+            return _not_found(file_key)
+        raise
+    media_type = meta.get('ContentType') or 'application/octet-stream'
+    size = meta['ContentLength']
+    etag = meta.get('ETag')
+    last_modified = meta.get('LastModified')
+    headers = _object_headers(cache_name, meta)
+
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    ranges = None
+    if range_applies(request.headers, etag, last_modified):
+        try:
+            ranges = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=HTTP_416_RANGE_NOT_SATISFIABLE, headers=headers)
+
+    if ranges is None:
+        obj = await s3.aget_object_by_key(file_key)
+        if isinstance(obj, ClientError):
+            raise obj
+        headers['Content-Length'] = str(size)
+        return StreamingResponse(
+            content=_body(file_key, obj, cacheable), media_type=media_type, headers=headers
+        )
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        obj = await s3.aget_object_by_key(file_key, f"bytes={start}-{end}")
+        if isinstance(obj, ClientError):
+            raise obj
+        headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+        headers['Content-Length'] = str(end - start + 1)
+        return StreamingResponse(
+            content=s3.iter_body(obj['Body']),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    boundary, length, body = _multipart_byteranges(file_key, ranges, size, media_type)
+    headers['Content-Length'] = str(length)
+    return StreamingResponse(
+        content=body,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers,
+    )
+
+
+def _derivative_error(
+    width: int | None,
+    height: int | None,
+    fit: str,
+    output_format: str | None,
+) -> str | None:
+    """
+    Validates the resize parameters of a derivative request.
+
+    Args:
+        width (int | None): The requested width.
+        height (int | None): The requested height.
+        fit (str): The requested fit.
+        output_format (str | None): The requested output format.
+
+    Returns:
+        str | None: The error message, or None if the parameters are valid.
+    """
+    for name, value in (("w", width), ("h", height)):
+        if value is not None and value not in settings.THUMBNAIL_SIZES:
+            return f"Unsupported {name}={value}; allowed sizes are {settings.THUMBNAIL_SIZES}."
+    if fit not in FITS:
+        return f"Unsupported fit '{fit}'; use one of {list(FITS)}."
+    if fit == "cover" and (width is None or height is None):
+        return "fit=cover needs both w and h."
+    if output_format is not None and output_format.lower() not in engine.available_formats():
+        return f"Unsupported format '{output_format}'."
+    return None
+
+
+async def _exists(key: str) -> bool:
+    """
+    Checks with a HEAD request whether an object exists.
+
+    Args:
+        key (str): The key of the object.
 
     Returns:
-        list[str]: A list of object keys.
+        bool: True if the object exists.
     """
-    return s3.list_objects()
+    try:
+        await s3.ahead_object(key)
+        return True
+    except ClientError as e:
+        if not _is_missing(e):
+            raise
+        return False
+
+
+async def _generate_derivative(file_key: str, key: str, params: dict) -> bool:
+    """
+    Generates a derivative and stores it under its derived key.
+
+    Concurrent requests for the same derivative share one generation: the
+    first one resizes and uploads, the others wait for it and then find the
+    stored object. The original's type and size are checked from the GET's
+    headers before its body is read.
+
+    Args:
+        file_key (str): The key of the original object.
+        key (str): The derived key.
+        params (dict): The parameters of the engine's resize operation.
+
+    Raises:
+        SourceRejected: With 415 if the original is not an image, 413 if it
+                        is larger than EDIT_MAX_FILE_SIZE or would need more
+                        than the whole memory budget, or 400 if it has too
+                        many pixels.
+
+    Returns:
+        bool: False if the original does not exist.
+    """
+    async with derivative_locks.lock(key):
+        if await _exists(key):
+            return True
+        obj = await s3.aget_object_by_key(file_key)
+        if _is_missing(obj):
+            return False
+        if isinstance(obj, ClientError):
+            raise obj
+        with closing(obj['Body']):
+            source_type = (obj.get('ContentType') or "").split(";")[0].strip().lower()
+            if source_type not in IMAGE_TYPES:
+                raise SourceRejected(
+                    status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"'{file_key}' is not an image."
+                )
+            if obj.get('ContentLength', 0) > settings.EDIT_MAX_FILE_SIZE:
+                raise SourceRejected(HTTP_413_CONTENT_TOO_LARGE, f"'{file_key}' is too large to resize.")
+            data = await s3.run_io(obj['Body'].read)
+        try:
+            result = await run_in_threadpool(run_admitted, "resize", data, **params)
+        except UnidentifiedImageError:
+            raise SourceRejected(
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"'{file_key}' could not be decoded."
+            )
+        except Image.DecompressionBombError:
+            raise SourceRejected(status.HTTP_400_BAD_REQUEST, "Image size is too large.")
+        except ImageTooLarge as e:
+            raise SourceRejected(HTTP_413_CONTENT_TOO_LARGE, str(e))
+        content_type = engine.OUTPUT_FORMATS[params["output_format"]].content_type
+        etag = await s3.aupload_object(key, result, content_type=content_type)
+        if IMMUTABLE_KEY_RE.match(file_key):
+            await s3.run_io(object_cache.put, key, result, content_type, etag)
+    return True
 
 
 @router.get("/file/{file_key}")
-async def get_file_by_key(file_key: str):
+async def get_file_by_key(
+    file_key: str,
+    request: Request,
+    w: int | None = None,
+    h: int | None = None,
+    fit: str = "contain",
+    output_format: str | None = Query(None, alias="format"),
+):
     """
-    Retrieves a file from the S3 bucket by its key.
+    Retrieves a file from the S3 bucket by its key, or a resized derivative
+    of it.
+
+    The S3 ETag and Last-Modified values are passed through, conditional
+    requests (If-None-Match, If-Modified-Since) are answered with 304, and
+    single or multiple byte ranges are served as 206 responses using ranged
+    S3 GETs.
+
+    Objects with immutable (UUID or hash) names are read through a local
+    cache, so repeated reads don't go to S3.
+
+    With any of `w`, `h` or `format`, a derivative is served instead. It is
+    generated on first request, stored under a derived key, and read
+    straight from S3 or the local cache after that. Generation waits for
+    the image memory budget, and gets a 503 with Retry-After when it
+    doesn't free up in time.
+
+    With S3_REDIRECT_DOWNLOADS set, the object or derivative isn't proxied:
+    the response is a 302 to a short-lived presigned S3 URL, and S3 itself
+    answers conditional and Range requests.
 
     Args:
         file_key (str): The key of the file to retrieve.
+        request (Request): The incoming request, used for its conditional
+                           and Range headers.
+        w (int | None): The derivative width, one of THUMBNAIL_SIZES.
+        h (int | None): The derivative height, one of THUMBNAIL_SIZES.
+        fit (str): "contain" to fit inside w x h, or "cover" to fill and
+                   crop to exactly w x h.
+        output_format (str | None): The derivative format ("jpeg", "webp"
+                                    or "avif"); defaults to the original's.
 
     Returns:
         StreamingResponse: The file content as a streaming response.
+        RedirectResponse: A 302 to S3, in redirect mode.
+        Response: An empty 304 or 416 response.
         JSONResponse: An error response if the file cannot be retrieved.
     """
     try:
-        obj = s3.get_object_by_key(file_key)
-        # Ensure proper headers for browsers/clients
-        media_type = getattr(obj, 'get', None) and obj.get('ContentType') or 'application/octet-stream'
-        headers = {}
-        try:
-            if obj.get('ContentLength'):
-                headers['Content-Length'] = str(obj['ContentLength'])
-        except Exception:
-            pass
+        if w is None and h is None and output_format is None:
+            if settings.S3_REDIRECT_DOWNLOADS:
+                return _redirect(file_key)
+            return await _serve_object(file_key, request, file_key)
 
-        return StreamingResponse(content=obj['Body'], media_type=media_type, headers=headers)
+        error = _derivative_error(w, h, fit, output_format)
+        if error is not None:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content=ErrorResponse(message=error).model_dump(),
+            )
+        fmt = output_format.lower() if output_format else default_format(file_key)
+        key = derived_key(file_key, w, h, fit, fmt)
+        # Only a missing derivative takes the single-flight lock.
+        if settings.S3_REDIRECT_DOWNLOADS:
+            if await _exists(key):
+                return _redirect(key)
+        else:
+            response = await _serve_object(key, request, file_key)
+            if response.status_code != status.HTTP_404_NOT_FOUND:
+                return response
+        params = {"fit": fit, "output_format": fmt}
+        if w is not None:
+            params["width"] = w
+        if h is not None:
+            params["height"] = h
+        if not await _generate_derivative(file_key, key, params):
+            return _not_found(file_key)
+        if settings.S3_REDIRECT_DOWNLOADS:
+            return _redirect(key)
+        return await _serve_object(key, request, file_key)
+    except SourceRejected as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content=ErrorResponse(message=e.message).model_dump(),
+        )
+    except MemoryBudgetExceeded as e:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=ErrorResponse(message=str(e)).model_dump(),
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -68,7 +663,12 @@ async def upload_file(file: Annotated[UploadFile, File()]) -> dict:
     """
     Uploads a file to the S3 bucket.
 
-    The file size and content type are validated against the application settings.
+    The file size and content type are validated against the application
+    settings before the file is read. The type is sniffed from the file's
+    magic bytes, not taken from the client, and is stored on the object.
+    Files are stored under the SHA-256 of their content and the extension of
+    their sniffed type, so uploading the same bytes twice only stores them
+    once, whatever the files were called.
 
     Args:
         file (UploadFile): The file to upload.
@@ -77,37 +677,38 @@ async def upload_file(file: Annotated[UploadFile, File()]) -> dict:
         JSONResponse: A success or error response.
     """
     try:
-
-        file_content = await file.read()
-
-        # Валидация размера файла
-        if len(file_content) > settings.MAX_FILE_SIZE:
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content=ErrorResponse(
-                    message="File is too large!").model_dump()
-            )
-
-        # Валидация типа файла
-        if file.content_type not in settings.ALLOWED_TYPES:
+        try:
+            content_type = validate_upload(file, settings.ALLOWED_TYPES, settings.MAX_FILE_SIZE)
+        except UploadRejected as e:
             return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content=ErrorResponse(
-                    message="File type is unknown!").model_dump()
+                status_code=e.status_code,
+                content=ErrorResponse(message=e.message).model_dump()
             )
+        file_size = upload_size(file)
 
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        # Content-addressed names make repeated uploads of the same bytes a
+        # cheap HEAD instead of a second copy in the bucket.
+        file_extension = EXTENSIONS.get(content_type, "")
+        file_hash = await s3.run_io(fileobj_hash, file.file)
+        unique_filename = f"{file_hash}{file_extension}"
 
-        s3.upload_object(unique_filename, file_content)
+        deduplicated = True
+        try:
+            await s3.ahead_object(unique_filename)
+        except ClientError as e:
+            if not _is_missing(e):
+                raise
+            deduplicated = False
+            await s3.aupload_object(unique_filename, file.file, content_type=content_type)
 
         return JSONResponse(content=SuccessResponse(
             message="File uploaded successfully",
             data={
                 "original_filename": file.filename,
                 "s3_filename": unique_filename,
-                "size": len(file_content),
-                "content_type": file.content_type,
+                "size": file_size,
+                "content_type": content_type,
+                "deduplicated": deduplicated,
             }
         ).model_dump())
 
@@ -119,3 +720,152 @@ async def upload_file(file: Annotated[UploadFile, File()]) -> dict:
         )
     finally:
         await file.close()
+
+
+_EXTENSION_RE = re.compile(r"\.[A-Za-z0-9]{1,10}")
+
+
+@router.post("/presign", response_model=PresignResponse)
+async def presign_upload(
+    request: Request,
+    body: PresignRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Issues a presigned URL that uploads a file straight to the bucket.
+
+    The file never passes through the server. The upload is signed for one
+    new UUID key, the declared content type and at most the declared size,
+    and S3 refuses anything else. Once it is done, the client reports it to
+    `complete_url` so the object is checked and registered.
+
+    Args:
+        request (Request): The incoming request, used to build complete_url.
+        body (PresignRequest): The file's name, type and size, and whether
+                               to sign a POST form or a PUT URL.
+        db (AsyncSession): The database session.
+
+    Returns:
+        dict: The key, upload URL and what to send with the file.
+        JSONResponse: An error response if the file type, size or method
+                      is not accepted.
+    """
+    content_type = body.content_type.lower()
+    if content_type not in settings.ALLOWED_TYPES:
+        return JSONResponse(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            content=ErrorResponse(message="File type is not supported.").model_dump(),
+        )
+    if not 0 < body.size <= settings.MAX_FILE_SIZE:
+        return JSONResponse(
+            status_code=HTTP_413_CONTENT_TOO_LARGE,
+            content=ErrorResponse(
+                message=f"File is too large; the limit is {settings.MAX_FILE_SIZE} bytes."
+            ).model_dump(),
+        )
+    if body.method not in ("post", "put"):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content=ErrorResponse(message="method must be 'post' or 'put'.").model_dump(),
+        )
+
+    extension = os.path.splitext(body.filename)[1].lower()
+    if not _EXTENSION_RE.fullmatch(extension):
+        extension = ""
+    key = f"{uuid.uuid4()}{extension}"
+    expires_in = settings.S3_PRESIGN_UPLOAD_EXPIRES
+    if body.method == "post":
+        form = s3.presigned_post(key, content_type, body.size, expires_in)
+        upload = {"method": "POST", "url": form["url"], "fields": form["fields"]}
+    else:
+        url = s3.presigned_put_url(key, content_type, body.size, expires_in)
+        upload = {"method": "PUT", "url": url, "headers": {"Content-Type": content_type}}
+
+    db.add(DirectUpload(
+        key=key,
+        original_filename=body.filename,
+        content_type=content_type,
+        max_size=body.size,
+    ))
+    await db.commit()
+    return {
+        "key": key,
+        "expires_in": expires_in,
+        "complete_url": str(request.url_for("complete_upload")),
+        **upload,
+    }
+
+
+@router.post("/presign/complete")
+async def complete_upload(
+    body: CompleteUploadRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Registers a direct-to-bucket upload once the client reports it done.
+
+    The object's size is read with a HEAD and its type sniffed from its
+    first bytes with a ranged GET, so the check costs two small requests
+    whatever the file size. Objects that don't match what was signed are
+    deleted. Completing an upload twice returns the same result.
+
+    Args:
+        body (CompleteUploadRequest): The key of the upload.
+        db (AsyncSession): The database session.
+
+    Returns:
+        JSONResponse: The registered object, or an error response if the
+                      key is unknown, the object is missing (409, retry
+                      later) or it doesn't match the upload's conditions.
+    """
+    upload = (await db.scalars(
+        select(DirectUpload).where(DirectUpload.key == body.key)
+    )).first()
+    if upload is None:
+        return _not_found(body.key)
+
+    if upload.status != "completed":
+        try:
+            head = await s3.ahead_object(upload.key)
+        except ClientError as e:
+            if not _is_missing(e):
+                raise
+            return JSONResponse(
+                status_code=status.HTTP_409_CONFLICT,
+                content=ErrorResponse(message="The file has not been uploaded yet.").model_dump(),
+            )
+        obj = await s3.aget_object_by_key(upload.key, f"bytes=0-{SNIFF_BYTES - 1}")
+        if isinstance(obj, ClientError):
+            raise obj
+        with closing(obj["Body"]):
+            sniffed = sniff_content_type(await s3.run_io(obj["Body"].read))
+
+        error = None
+        if head["ContentLength"] > upload.max_size:
+            error = (HTTP_413_CONTENT_TOO_LARGE, "File is larger than declared.")
+        elif sniffed != upload.content_type:
+            error = (status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "File content doesn't match its type.")
+        if error is not None:
+            await s3.run_io(s3.delete_object, upload.key)
+            await db.delete(upload)
+            await db.commit()
+            return JSONResponse(
+                status_code=error[0],
+                content=ErrorResponse(message=error[1]).model_dump(),
+            )
+
+        upload.size = head["ContentLength"]
+        upload.status = "completed"
+        upload.completed_at = datetime.datetime.now(datetime.timezone.utc)
+        await db.commit()
+
+    return JSONResponse(content=SuccessResponse(
+        message="File uploaded successfully",
+        data={
+            "original_filename": upload.original_filename,
+            "s3_filename": upload.key,
+            "url": f"{settings.S3_PUBLIC_URL}/{upload.key}",
+            "size": upload.size,
+            "content_type": upload.content_type,
+        }
+    ).model_dump())
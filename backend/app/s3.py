@@ -3,11 +3,24 @@ S3 Bucket Service for interacting with S3-compatible storage.
 
 This module provides a service class for performing operations like creating buckets,
 uploading, and listing objects in an S3-compatible storage.
+
+The factory hands out one long-lived service, and so one boto3 client, per
+bucket, so requests reuse warm pooled connections instead of resolving
+credentials and opening new TLS connections each time.
 """
+import asyncio
+import functools
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, BinaryIO, Iterator
+
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 from botocore.exceptions import ClientError
 
+from . import metrics
 from .config import Settings
 
 
@@ -21,6 +34,11 @@ class S3BucketService:
         endpoint: str,
         access_key: str,
         secret_key: str,
+        client_config: Config | None = None,
+        transfer_config: TransferConfig | None = None,
+        io_workers: int = 16,
+        download_chunk_size: int = 64 * 1024,
+        presign_endpoint: str = "",
     ) -> None:
         """
         Initializes the S3BucketService.
@@ -30,28 +48,130 @@ class S3BucketService:
             endpoint (str): The S3 endpoint URL.
             access_key (str): The access key for the S3 bucket.
             secret_key (str): The secret key for the S3 bucket.
+            client_config (Config | None): The botocore client configuration
+                                           (pool size, timeouts, retries).
+            transfer_config (TransferConfig | None): The multipart upload
+                                                     threshold, part size and
+                                                     concurrency.
+            io_workers (int): The size of the dedicated thread pool that runs
+                              blocking S3 calls for async callers.
+            download_chunk_size (int): The chunk size in bytes used when
+                                       streaming object bodies.
+            presign_endpoint (str): The endpoint URL put in presigned URLs,
+                                    when clients reach the bucket at a
+                                    different address than the server;
+                                    defaults to `endpoint`.
         """
         self.bucket_name = bucket_name
         self.endpoint = endpoint
         self.access_key = access_key
         self.secret_key = secret_key
+        self.client_config = client_config or Config(signature_version="s3v4")
+        self.transfer_config = transfer_config or TransferConfig()
+        self.io_workers = io_workers
+        self.download_chunk_size = download_chunk_size
+        self.presign_endpoint = presign_endpoint
+        self._client = None
+        self._presign_client = None
+        self._client_lock = threading.Lock()
+        self._io_executor = None
 
-    def create_s3_client(self) -> boto3.client:
+    def create_s3_client(self, endpoint: str | None = None) -> boto3.client:
         """
-        Creates and returns a boto3 S3 client.
+        Creates and returns a new boto3 S3 client.
+
+        Uses a dedicated boto3 session, since the default session is not
+        safe to share between threads.
+
+        Args:
+            endpoint (str | None): The endpoint URL, if not the service's.
 
         Returns:
             boto3.client: An S3 client instance.
         """
-        client = boto3.client(
+        session = boto3.session.Session()
+        client = session.client(
             "s3",
-            endpoint_url=self.endpoint,
+            endpoint_url=(endpoint or self.endpoint) or None,
             aws_access_key_id=self.access_key,
             aws_secret_access_key=self.secret_key,
-            config=Config(signature_version="s3v4"),
+            config=self.client_config,
         )
+        metrics.instrument_s3_client(client)
         return client
 
+    @property
+    def client(self) -> boto3.client:
+        """
+        Returns the shared S3 client, creating it on first use.
+
+        boto3 clients are thread-safe once created, so the same client and
+        its connection pool are reused by every request.
+
+        Returns:
+            boto3.client: The shared S3 client instance.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self.create_s3_client()
+        return self._client
+
+    @property
+    def presign_client(self) -> boto3.client:
+        """
+        Returns the client that signs URLs handed to clients.
+
+        Signing is local, so this client never opens a connection; it only
+        differs from `client` in the endpoint written into the URLs.
+
+        Returns:
+            boto3.client: The presigning S3 client.
+        """
+        if not self.presign_endpoint or self.presign_endpoint == self.endpoint:
+            return self.client
+        if self._presign_client is None:
+            with self._client_lock:
+                if self._presign_client is None:
+                    self._presign_client = self.create_s3_client(self.presign_endpoint)
+        return self._presign_client
+
+    @property
+    def io_executor(self) -> ThreadPoolExecutor:
+        """
+        Returns the bounded thread pool used for blocking S3 I/O.
+
+        Keeping S3 calls off the event loop and off FastAPI's default
+        threadpool means one slow S3 response can't stall other requests.
+
+        Returns:
+            ThreadPoolExecutor: The I/O executor.
+        """
+        if self._io_executor is None:
+            with self._client_lock:
+                if self._io_executor is None:
+                    self._io_executor = ThreadPoolExecutor(
+                        max_workers=self.io_workers, thread_name_prefix="s3-io"
+                    )
+        return self._io_executor
+
+    async def run_io(self, func, *args, **kwargs):
+        """
+        Runs a blocking function on the S3 I/O executor.
+
+        Args:
+            func (Callable): The blocking function to run.
+            *args: Positional arguments for the function.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            Any: The function's return value.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.io_executor, functools.partial(func, *args, **kwargs)
+        )
+
     def create_bucket(self):
         """
         Creates the S3 bucket if it doesn't exist.
@@ -60,80 +180,362 @@ class S3BucketService:
             Exception: An exception if the bucket creation fails, otherwise None.
         """
         try:
-            client = self.create_s3_client()
-            client.create_bucket(Bucket=self.bucket_name)
+            self.client.create_bucket(Bucket=self.bucket_name)
         except Exception as e:
             return e
 
-    def get_object_by_key(self, file_key):
+    def get_object_by_key(self, file_key, byte_range: str | None = None):
         """
         Retrieves an object from the S3 bucket by its key.
 
         Args:
             file_key (str): The key of the object to retrieve.
+            byte_range (str | None): An optional HTTP Range value, such as
+                                     "bytes=0-1023", for a ranged GET.
 
         Returns:
             dict: The S3 object, or a ClientError if the object is not found.
         """
-        client = self.create_s3_client()
-
+        extra_args = {"Range": byte_range} if byte_range else {}
         try:
-            return client.get_object(Bucket=self.bucket_name, Key=file_key)
+            return self.client.get_object(Bucket=self.bucket_name, Key=file_key, **extra_args)
         except ClientError as e:
             return e
 
-    def list_objects(self, ) -> list[str]:
+    def head_object(self, file_key) -> dict:
+        """
+        Retrieves an object's metadata without its body.
+
+        Args:
+            file_key (str): The key of the object.
+
+        Raises:
+            ClientError: If the object is not found or the request fails.
+
+        Returns:
+            dict: The S3 head_object response.
+        """
+        return self.client.head_object(Bucket=self.bucket_name, Key=file_key)
+
+    def delete_object(self, file_key) -> None:
+        """
+        Deletes an object from the S3 bucket.
+
+        Args:
+            file_key (str): The key of the object.
+        """
+        self.client.delete_object(Bucket=self.bucket_name, Key=file_key)
+
+    def presigned_get_url(self, file_key: str, expires_in: int) -> str:
+        """
+        Creates a presigned URL that downloads an object directly from S3.
+
+        Args:
+            file_key (str): The key of the object.
+            expires_in (int): How long the URL is valid, in seconds.
+
+        Returns:
+            str: The presigned GET URL.
+        """
+        return self.presign_client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket_name, "Key": file_key},
+            ExpiresIn=expires_in,
+        )
+
+    def presigned_put_url(
+        self, file_key: str, content_type: str, content_length: int, expires_in: int
+    ) -> str:
+        """
+        Creates a presigned URL that uploads an object directly to S3.
+
+        The content type and length are part of the signature, so the client
+        must send exactly these Content-Type and Content-Length headers.
+
+        Args:
+            file_key (str): The key to upload to.
+            content_type (str): The Content-Type the client will send.
+            content_length (int): The exact size of the upload in bytes.
+            expires_in (int): How long the URL is valid, in seconds.
+
+        Returns:
+            str: The presigned PUT URL.
+        """
+        return self.presign_client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket_name,
+                "Key": file_key,
+                "ContentType": content_type,
+                "ContentLength": content_length,
+            },
+            ExpiresIn=expires_in,
+        )
+
+    def presigned_post(
+        self, file_key: str, content_type: str, max_size: int, expires_in: int
+    ) -> dict:
+        """
+        Creates a presigned POST form that uploads an object directly to S3.
+
+        The policy pins the key and content type and limits the size, so S3
+        itself refuses any other upload.
+
+        Args:
+            file_key (str): The key to upload to.
+            content_type (str): The only accepted Content-Type.
+            max_size (int): The largest accepted upload in bytes.
+            expires_in (int): How long the form is valid, in seconds.
+
+        Returns:
+            dict: The form's "url" and the "fields" to send with the file.
+        """
+        return self.presign_client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=file_key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expires_in,
+        )
+
+    async def aget_object_by_key(self, file_key, byte_range: str | None = None):
+        """
+        Retrieves an object from the S3 bucket without blocking the event loop.
+
+        Args:
+            file_key (str): The key of the object to retrieve.
+            byte_range (str | None): An optional HTTP Range value for a
+                                     ranged GET.
+
+        Returns:
+            dict: The S3 object, or a ClientError if the object is not found.
+        """
+        return await self.run_io(self.get_object_by_key, file_key, byte_range)
+
+    async def ahead_object(self, file_key) -> dict:
+        """
+        Retrieves an object's metadata without blocking the event loop.
+
+        Args:
+            file_key (str): The key of the object.
+
+        Raises:
+            ClientError: If the object is not found or the request fails.
+
+        Returns:
+            dict: The S3 head_object response.
+        """
+        return await self.run_io(self.head_object, file_key)
+
+    async def iter_body(self, body, chunk_size: int | None = None) -> AsyncIterator[bytes]:
+        """
+        Streams an object body in chunks, reading each chunk on the I/O executor.
+
+        Args:
+            body (StreamingBody): The body of an S3 get_object response.
+            chunk_size (int | None): The chunk size in bytes, defaulting to
+                                     the service's download chunk size.
+
+        Yields:
+            bytes: The next chunk of the object.
+        """
+        chunk_size = chunk_size or self.download_chunk_size
+        try:
+            while True:
+                chunk = await self.run_io(body.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    def list_objects(self, prefix: str = "") -> list[str]:
         """
         Lists all object keys in the S3 bucket.
 
+        This loads every key into memory; prefer `iter_object_keys` or
+        `list_objects_page` for large buckets.
+
+        Args:
+            prefix (str): Only list keys starting with this prefix.
+
         Returns:
             list[str]: A list of object keys.
         """
-        client = self.create_s3_client()
+        return list(self.iter_object_keys(prefix))
 
-        response = client.list_objects_v2(
-            Bucket=self.bucket_name)
-        storage_content: list[str] = []
+    def list_objects_page(
+        self,
+        prefix: str = "",
+        page_size: int = 1000,
+        continuation_token: str | None = None,
+    ) -> tuple[list[str], str | None]:
+        """
+        Lists a single page of object keys.
 
-        try:
-            contents = response["Contents"]
-        except KeyError:
-            return storage_content
+        Args:
+            prefix (str): Only list keys starting with this prefix.
+            page_size (int): The maximum number of keys to return (up to 1000).
+            continuation_token (str | None): The token returned with the
+                                             previous page, if any.
 
-        for item in contents:
-            storage_content.append(item["Key"])
+        Returns:
+            tuple[list[str], str | None]: The keys of this page, and the token
+                                          for the next page or None if this
+                                          is the last page.
+        """
+        kwargs = {"Bucket": self.bucket_name, "Prefix": prefix, "MaxKeys": page_size}
+        if continuation_token:
+            kwargs["ContinuationToken"] = continuation_token
+        response = self.client.list_objects_v2(**kwargs)
+        keys = [item["Key"] for item in response.get("Contents", [])]
+        next_token = response.get("NextContinuationToken") if response.get("IsTruncated") else None
+        return keys, next_token
+
+    def iter_object_keys(self, prefix: str = "", page_size: int = 1000) -> Iterator[str]:
+        """
+        Yields every object key in the bucket, fetching one page at a time.
 
-        return storage_content
+        Only one page of keys is held in memory at once.
+
+        Args:
+            prefix (str): Only list keys starting with this prefix.
+            page_size (int): The number of keys fetched per request.
+
+        Yields:
+            str: The next object key.
+        """
+        token = None
+        while True:
+            keys, token = self.list_objects_page(prefix, page_size, token)
+            yield from keys
+            if token is None:
+                return
 
-    def upload_object(self, source_file_name: str, content: bytes) -> None:
+    def upload_object(
+        self,
+        source_file_name: str,
+        content: bytes | BinaryIO,
+        content_type: str | None = None,
+    ) -> str | None:
         """
         Uploads an object to the S3 bucket.
 
+        The upload time is recorded as the "upload" metrics stage.
+
+        File-like objects are streamed through the boto3 transfer manager,
+        which switches to a parallel multipart upload above the configured
+        threshold and only keeps a bounded number of parts in memory.
+
         Args:
             source_file_name (str): The key to use for the object in the bucket.
-            content (bytes): The content of the object to upload.
+            content (bytes | BinaryIO): The content of the object to upload,
+                                        either as bytes or a readable binary
+                                        file-like object.
+            content_type (str | None): The Content-Type to store on the object.
 
         Raises:
             ClientError: If the upload fails.
 
         Returns:
-            dict: The response from the S3 put_object call.
+            str | None: The ETag of the stored object for single-request
+                        uploads, or None when the transfer manager was used.
         """
-        client = self.create_s3_client()
-        try:
-            response = client.put_object(
-                Bucket=self.bucket_name,
-                Key=source_file_name,
-                Body=content,
+        with metrics.stage("upload"):
+            extra_args = {"ContentType": content_type} if content_type else {}
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                if len(content) < self.transfer_config.multipart_threshold:
+                    response = self.client.put_object(
+                        Bucket=self.bucket_name,
+                        Key=source_file_name,
+                        Body=content,
+                        **extra_args,
+                    )
+                    return (response or {}).get("ETag")
+                content = io.BytesIO(content)
+
+            self.client.upload_fileobj(
+                content,
+                self.bucket_name,
+                source_file_name,
+                ExtraArgs=extra_args or None,
+                Config=self.transfer_config,
             )
-            return response
-        except ClientError as e:
-            raise e
+            return None
+
+    async def aupload_object(
+        self,
+        source_file_name: str,
+        content: bytes | BinaryIO,
+        content_type: str | None = None,
+    ) -> str | None:
+        """
+        Uploads an object to the S3 bucket without blocking the event loop.
+
+        Args:
+            source_file_name (str): The key to use for the object in the bucket.
+            content (bytes | BinaryIO): The content of the object to upload.
+            content_type (str | None): The Content-Type to store on the object.
+
+        Returns:
+            str | None: The ETag of the stored object, when known.
+        """
+        return await self.run_io(self.upload_object, source_file_name, content, content_type)
+
+
+_services: dict[tuple, S3BucketService] = {}
+_services_lock = threading.Lock()
+
+
+def s3_client_config(settings: Settings) -> Config:
+    """
+    Builds the botocore client configuration from settings.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        Config: The client configuration.
+    """
+    return Config(
+        signature_version="s3v4",
+        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+        connect_timeout=settings.S3_CONNECT_TIMEOUT,
+        read_timeout=settings.S3_READ_TIMEOUT,
+        tcp_keepalive=settings.S3_TCP_KEEPALIVE,
+        retries={
+            "mode": settings.S3_RETRY_MODE,
+            "max_attempts": settings.S3_MAX_ATTEMPTS,
+        },
+    )
+
+
+def s3_transfer_config(settings: Settings) -> TransferConfig:
+    """
+    Builds the multipart transfer configuration from settings.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        TransferConfig: The transfer configuration.
+    """
+    return TransferConfig(
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+        max_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+    )
 
 
 def s3_bucket_service_factory(settings: Settings) -> S3BucketService:
     """
-    Factory function to create an S3BucketService instance from settings.
+    Returns the process-wide S3BucketService for the given settings.
+
+    Services are shared per bucket, endpoint and credentials, so every
+    router that asks for one ends up using the same pooled client.
 
     Args:
         settings (Settings): The application settings.
@@ -141,4 +543,20 @@ def s3_bucket_service_factory(settings: Settings) -> S3BucketService:
     Returns:
         S3BucketService: An instance of S3BucketService.
     """
-    return S3BucketService(settings.BUCKET_NAME, settings.ENDPOINT, settings.ACCESS_KEY, settings.SECRET_KEY)
+    key = (settings.BUCKET_NAME, settings.ENDPOINT, settings.ACCESS_KEY, settings.SECRET_KEY)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = S3BucketService(
+                settings.BUCKET_NAME,
+                settings.ENDPOINT,
+                settings.ACCESS_KEY,
+                settings.SECRET_KEY,
+                client_config=s3_client_config(settings),
+                transfer_config=s3_transfer_config(settings),
+                io_workers=settings.S3_IO_WORKERS,
+                download_chunk_size=settings.S3_DOWNLOAD_CHUNK_SIZE,
+                presign_endpoint=settings.S3_PRESIGN_ENDPOINT,
+            )
+            _services[key] = service
+        return service
@@ -25,6 +25,96 @@ class ImageResponse(BaseModel):
         orm_mode = True
 
 
+class ObjectListResponse(BaseModel):
+    """
+    Schema for one page of S3 object keys.
+
+    Attributes:
+        keys (list[str]): The object keys of this page.
+        next_token (Optional[str]): The continuation token of the next page,
+                                    or None on the last page.
+    """
+    keys: list[str]
+    next_token: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    """
+    Schema for a queued edit job.
+
+    Attributes:
+        id (str): The job id.
+        status (str): "queued", "running", "succeeded", "failed" or
+                      "cancelled".
+        operation (str): The edit operation.
+        filename (Optional[str]): The original filename of the upload.
+        url (Optional[str]): The URL of the processed image, once succeeded.
+        error (Optional[str]): The error message, once failed.
+        timings (Optional[dict]): Per-stage durations in milliseconds.
+        created_at (datetime.datetime): When the job was submitted.
+        started_at (Optional[datetime.datetime]): When a worker started it.
+        finished_at (Optional[datetime.datetime]): When it finished.
+    """
+    id: str
+    status: str
+    operation: str
+    filename: Optional[str] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+    timings: Optional[dict] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+
+class PresignRequest(BaseModel):
+    """
+    Schema for a request for a direct-to-bucket upload URL.
+
+    Attributes:
+        filename (str): The name of the file to upload.
+        content_type (str): The file's MIME type.
+        size (int): The file's size in bytes.
+        method (str): "post" for a presigned form, "put" for a presigned URL.
+    """
+    filename: str
+    content_type: str
+    size: int
+    method: str = "post"
+
+
+class PresignResponse(BaseModel):
+    """
+    Schema for a direct-to-bucket upload URL.
+
+    Attributes:
+        key (str): The S3 key the file will be stored under.
+        method (str): The HTTP method to upload with, "POST" or "PUT".
+        url (str): The URL to upload to.
+        fields (dict): The form fields to send before the file, for POST.
+        headers (dict): The headers to send with the file, for PUT.
+        expires_in (int): How long the URL is valid, in seconds.
+        complete_url (str): Where to report the upload done.
+    """
+    key: str
+    method: str
+    url: str
+    fields: dict = {}
+    headers: dict = {}
+    expires_in: int
+    complete_url: str
+
+
+class CompleteUploadRequest(BaseModel):
+    """
+    Schema for reporting a direct-to-bucket upload done.
+
+    Attributes:
+        key (str): The key returned when the upload URL was issued.
+    """
+    key: str
+
+
 class SuccessResponse(BaseModel):
     """
     Generic schema for a successful API response.
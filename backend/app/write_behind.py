@@ -0,0 +1,179 @@
+"""
+Write-behind queue for ProcessedImage rows.
+
+When `DB_WRITE_BEHIND` is enabled, the edit endpoints hand their new rows to
+this queue instead of committing them themselves. A background thread
+commits everything queued in one transaction every
+`DB_WRITE_BEHIND_INTERVAL` seconds, or sooner once `DB_WRITE_BEHIND_BATCH`
+rows are waiting, so HTTP responses no longer wait on disk flushes and
+concurrent edits don't queue up on the SQLite write lock.
+"""
+import logging
+import threading
+from typing import Callable
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    Batches ProcessedImage inserts into periodic group commits.
+    """
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float,
+        batch_size: int,
+    ) -> None:
+        """
+        Initializes the WriteBehindQueue.
+
+        Args:
+            session_factory (Callable[[], Session]): Creates the sessions used
+                                                     for each group commit.
+            interval (float): The maximum time in seconds between commits.
+            batch_size (int): The number of queued rows that triggers an
+                              early commit.
+        """
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.commits = 0
+        self.rows_written = 0
+        self._pending: dict[str, dict] = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Starts the background commit thread.
+        """
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="db-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread after committing everything queued.
+        """
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def submit(self, original_filename: str, processed_url: str, cache_key: str) -> str:
+        """
+        Queues a ProcessedImage row for the next group commit.
+
+        A row with the same cache key that is still queued wins, and its URL
+        is returned instead.
+
+        Args:
+            original_filename (str): The original filename of the upload.
+            processed_url (str): The URL of the processed image.
+            cache_key (str): The edit cache key.
+
+        Returns:
+            str: The URL recorded for this cache key.
+        """
+        with self._condition:
+            existing = self._pending.get(cache_key)
+            if existing is not None:
+                return existing["processed_url"]
+            self._pending[cache_key] = {
+                "original_filename": original_filename,
+                "processed_url": processed_url,
+                "cache_key": cache_key,
+            }
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+        return processed_url
+
+    def lookup(self, cache_key: str) -> str | None:
+        """
+        Returns the URL of a queued, not yet committed row.
+
+        Args:
+            cache_key (str): The edit cache key.
+
+        Returns:
+            str | None: The queued URL, or None.
+        """
+        with self._condition:
+            row = self._pending.get(cache_key)
+            return row["processed_url"] if row is not None else None
+
+    def flush(self) -> int:
+        """
+        Commits every queued row in a single transaction.
+
+        Rows whose cache key already exists in the database are dropped.
+
+        Returns:
+            int: The number of rows written.
+        """
+        with self._flush_lock:
+            with self._condition:
+                rows = list(self._pending.values())
+            if not rows:
+                return 0
+
+            written = len(rows)
+            with self.session_factory() as db:
+                db.add_all(models.ProcessedImage(**row) for row in rows)
+                try:
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                    written = 0
+                    for row in rows:
+                        db.add(models.ProcessedImage(**row))
+                        try:
+                            db.commit()
+                            written += 1
+                        except IntegrityError:
+                            db.rollback()
+
+            with self._condition:
+                for row in rows:
+                    if self._pending.get(row["cache_key"]) is row:
+                        del self._pending[row["cache_key"]]
+            self.commits += 1
+            self.rows_written += written
+            return written
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._condition.wait(self.interval)
+                if self._stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write-behind commit failed, will retry")
+
+
+write_behind = (
+    WriteBehindQueue(SessionLocal, settings.DB_WRITE_BEHIND_INTERVAL, settings.DB_WRITE_BEHIND_BATCH)
+    if settings.DB_WRITE_BEHIND
+    else None
+)
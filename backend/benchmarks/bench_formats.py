@@ -0,0 +1,49 @@
+"""
+Benchmark of encode time against output size per output format.
+
+Encodes the same synthetic photo with every format the installed Pillow
+supports, using the encoder settings from `Settings`, and prints the
+encode time, the output size and the size relative to baseline JPEG.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_formats [--megapixels 12] [--repeat 3]
+"""
+import argparse
+import io
+import time
+
+from PIL import Image
+
+from app import engine
+from benchmarks.bench_white_bg import make_photo
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    image = Image.open(io.BytesIO(make_photo(args.megapixels, "PNG"))).convert("RGB")
+    image.load()
+
+    baseline = io.BytesIO()
+    image.save(baseline, format="JPEG")
+    baseline_size = len(baseline.getvalue())
+    print(f"input: {args.megapixels} MP, baseline JPEG {baseline_size / 1e3:.0f} kB")
+
+    for name in engine.available_formats():
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            output = engine.encode(image, name)
+            timings.append(time.perf_counter() - started)
+        options = ", ".join(f"{k}={v}" for k, v in engine.encoder_options(name).items())
+        print(
+            f"{name:>5}: {min(timings) * 1000:8.1f} ms  {len(output) / 1e3:8.0f} kB"
+            f"  ({len(output) / baseline_size:5.0%} of baseline)  [{options}]"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Per-stage benchmark of the edit operations over a matrix of inputs.
+
+Runs add-white-bg and add-frame on synthetic photos of several sizes,
+colour modes and input formats, and times each stage of the pipeline
+separately: decode (`engine.open_image`), composite
+(`engine.white_bg_composite` / `engine.frame_composite`), encode
+(`engine.encode`) and, optionally, the S3 upload. Every run happens in a
+fresh process so that peak RSS and the frame cache start cold, as for the
+first request after a restart.
+
+Results are written as JSON. Passing an earlier results file with
+--compare prints the change per stage and exits with status 1 when any
+stage got slower than --threshold, so the suite can gate a CI job.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_stages [--sizes 0.3,2,12] [--modes RGB,RGBA]
+        [--formats JPEG,PNG] [--output results.json]
+        [--compare baseline.json] [--upload s3]
+"""
+import argparse
+import datetime
+import io
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import PIL
+from PIL import Image
+
+from app import engine
+from app.frame_cache import frame_cache
+from benchmarks.bench_white_bg import _peak_rss_bytes, make_photo
+
+STAGES = ("decode", "composite", "encode", "upload")
+OPERATIONS = ("add-white-bg", "add-frame")
+FRAME_NAME = "bench-frame.png"
+
+# Changes smaller than these are noise and never reported as regressions.
+MIN_DELTA_MS = 1.0
+MIN_DELTA_MIB = 5.0
+
+# Modes each input format can store; other combinations are skipped.
+FORMAT_MODES = {
+    "JPEG": ("RGB", "L"),
+    "PNG": ("RGB", "RGBA", "P", "L"),
+    "WEBP": ("RGB", "RGBA"),
+}
+
+
+def make_input(megapixels: float, mode: str, fmt: str) -> bytes:
+    """
+    Builds a synthetic photo in a given colour mode and file format.
+
+    RGBA inputs get a transparent border so the alpha path is exercised.
+    """
+    image = Image.open(io.BytesIO(make_photo(megapixels, "PNG")))
+    if mode == "RGBA":
+        alpha = Image.new("L", image.size, 0)
+        border = max(image.width // 20, 1)
+        alpha.paste(255, (border, border, image.width - border, image.height - border))
+        image = image.convert("RGBA")
+        image.putalpha(alpha)
+    elif mode == "P":
+        image = image.quantize(256)
+    elif mode == "L":
+        image = image.convert("L")
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def make_frame(frames_dir: Path) -> None:
+    """
+    Writes a semi-transparent frame for the add-frame runs.
+    """
+    frame = Image.new("RGBA", (1000, 1000), (0, 0, 0, 0))
+    frame.paste((120, 80, 40, 255), (0, 0, 1000, 60))
+    frame.paste((120, 80, 40, 255), (0, 940, 1000, 1000))
+    frame.paste((120, 80, 40, 255), (0, 0, 60, 1000))
+    frame.paste((120, 80, 40, 255), (940, 0, 1000, 1000))
+    frame.save(frames_dir / FRAME_NAME)
+
+
+def _upload(data: bytes, output_format: str) -> None:
+    from app.config import settings
+    from app.s3 import s3_bucket_service_factory
+
+    s3 = s3_bucket_service_factory(settings)
+    encoding = engine.OUTPUT_FORMATS[output_format]
+    key = f"bench/{uuid.uuid4()}{encoding.extension}"
+    s3.upload_object(key, data, content_type=encoding.content_type)
+    s3.client.delete_object(Bucket=s3.bucket_name, Key=key)
+
+
+def _measure(cell: dict, data: bytes, frames_dir: str, upload: bool, queue) -> None:
+    frame_cache.frames_dir = Path(frames_dir)
+    baseline = _peak_rss_bytes()
+    timings = {}
+
+    started = time.perf_counter()
+    image = engine.open_image(data)
+    image.load()
+    timings["decode"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if cell["operation"] == "add-white-bg":
+        result = engine.white_bg_composite(image, 1.3)
+    else:
+        result = engine.frame_composite(image, FRAME_NAME)
+    timings["composite"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    output = engine.encode(result, cell["output_format"])
+    timings["encode"] = time.perf_counter() - started
+
+    if upload:
+        started = time.perf_counter()
+        _upload(output, cell["output_format"])
+        timings["upload"] = time.perf_counter() - started
+
+    queue.put((timings, len(output), _peak_rss_bytes() - baseline))
+
+
+def run_cell(cell: dict, data: bytes, frames_dir: Path, upload: bool, repeat: int) -> dict:
+    """
+    Runs one cell of the matrix `repeat` times, each in a fresh process.
+
+    Returns:
+        dict: The cell with the best time per stage in milliseconds, the
+              output size and the largest peak RSS growth in MiB.
+    """
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        queue = context.Queue()
+        process = context.Process(
+            target=_measure, args=(cell, data, str(frames_dir), upload, queue)
+        )
+        process.start()
+        runs.append(queue.get())
+        process.join()
+
+    result = dict(cell, input_bytes=len(data), output_bytes=runs[0][1])
+    for stage in STAGES:
+        times = [timings[stage] for timings, _, _ in runs if stage in timings]
+        result[f"{stage}_ms"] = round(min(times) * 1000, 2) if times else None
+    result["total_ms"] = round(
+        sum(result[f"{stage}_ms"] or 0 for stage in STAGES), 2
+    )
+    result["peak_rss_mib"] = round(max(peak for _, _, peak in runs) / 2**20, 1)
+    return result
+
+
+def cell_id(cell: dict) -> tuple:
+    return (
+        cell["operation"], cell["megapixels"], cell["mode"],
+        cell["input_format"], cell["output_format"],
+    )
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """
+    Compares results against an earlier run, cell by cell and stage by stage.
+
+    Returns:
+        list[str]: One line per stage that got slower than the threshold.
+    """
+    previous = {cell_id(cell): cell for cell in baseline}
+    regressions = []
+    for cell in results:
+        old = previous.get(cell_id(cell))
+        if old is None:
+            continue
+        for metric in [f"{stage}_ms" for stage in STAGES] + ["peak_rss_mib"]:
+            before, after = old.get(metric), cell.get(metric)
+            if not before or after is None:
+                continue
+            min_delta = MIN_DELTA_MIB if metric == "peak_rss_mib" else MIN_DELTA_MS
+            change = after / before - 1
+            if change > threshold and after - before >= min_delta:
+                regressions.append(
+                    f"{' '.join(map(str, cell_id(cell)))}: {metric} "
+                    f"{before} -> {after} ({change:+.0%})"
+                )
+    return regressions
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=_csv, default=["0.3", "2", "12", "24", "50"],
+                        help="Comma-separated input sizes in megapixels.")
+    parser.add_argument("--modes", type=_csv, default=["RGB", "RGBA", "P", "L"])
+    parser.add_argument("--formats", type=_csv, default=["JPEG", "PNG", "WEBP"],
+                        help="Comma-separated input formats.")
+    parser.add_argument("--output-formats", type=_csv, default=["jpeg"])
+    parser.add_argument("--operations", type=_csv, default=list(OPERATIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--upload", choices=("none", "s3"), default="none",
+                        help="Also time an upload to the configured S3 bucket.")
+    parser.add_argument("--output", type=Path, help="Where to write the JSON results.")
+    parser.add_argument("--compare", type=Path, help="An earlier results file.")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown ratio reported as a regression.")
+    args = parser.parse_args()
+
+    available = engine.available_formats()
+    frames_dir = Path(tempfile.mkdtemp(prefix="bench-frames-"))
+    make_frame(frames_dir)
+
+    results = []
+    print(f"{'operation':<13}{'MP':>6} {'mode':<5}{'in':<5}{'out':<5}"
+          + "".join(f"{stage:>11}" for stage in STAGES) + f"{'peak RSS':>11}")
+    for megapixels in map(float, args.sizes):
+        for fmt in args.formats:
+            for mode in args.modes:
+                if mode not in FORMAT_MODES.get(fmt, ()):
+                    continue
+                data = make_input(megapixels, mode, fmt)
+                for output_format in args.output_formats:
+                    if output_format not in available:
+                        continue
+                    for operation in args.operations:
+                        cell = {
+                            "operation": operation,
+                            "megapixels": megapixels,
+                            "mode": mode,
+                            "input_format": fmt,
+                            "output_format": output_format,
+                        }
+                        result = run_cell(cell, data, frames_dir, args.upload == "s3", args.repeat)
+                        results.append(result)
+                        stages = "".join(
+                            f"{result[f'{stage}_ms']:>9.1f}ms" if result[f"{stage}_ms"] is not None
+                            else f"{'-':>11}"
+                            for stage in STAGES
+                        )
+                        print(f"{operation:<13}{megapixels:>6g} {mode:<5}{fmt:<5}"
+                              f"{output_format:<5}{stages}{result['peak_rss_mib']:>8.1f}MiB")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "encoder_options": {name: engine.encoder_options(name) for name in available},
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions above {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark for the opaque-input fast path of add-white-bg.
+
+Compares the current `engine.add_white_bg` against the previous
+always-RGBA implementation on a large photo, measuring wall time and peak
+resident memory. Each measurement runs in a fresh process so peak RSS is
+not polluted by earlier runs.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_white_bg [--megapixels 24] [--repeat 3]
+"""
+import argparse
+import io
+import multiprocessing
+import resource
+import sys
+import time
+
+from PIL import Image
+
+from app import engine
+
+
+def legacy_add_white_bg(data: bytes, bg_coefficient: float) -> bytes:
+    """
+    The add-white-bg implementation before the opaque fast path.
+
+    The result is encoded through `engine.encode`, so both sides use the
+    same encoder settings and only the compositing differs.
+    """
+    user_image = Image.open(io.BytesIO(data)).convert("RGBA")
+    new_width = int(user_image.width * bg_coefficient)
+    new_height = int(user_image.height * bg_coefficient)
+    background = Image.new("RGBA", (new_width, new_height), "WHITE")
+    paste_x = (new_width - user_image.width) // 2
+    paste_y = (new_height - user_image.height) // 2
+    background.paste(user_image, (paste_x, paste_y), user_image)
+    return engine.encode(background.convert("RGB"))
+
+
+IMPLEMENTATIONS = {
+    "legacy": legacy_add_white_bg,
+    "fast_path": engine.add_white_bg,
+}
+
+
+def make_photo(megapixels: float, fmt: str) -> bytes:
+    """
+    Builds a synthetic 3:2 photo with enough detail to be realistic to encode.
+    """
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+    image = Image.effect_mandelbrot((width, height), (-2.0, -1.0, 1.0, 1.0), 64)
+    image = Image.merge("RGB", (image, image.rotate(180), image.transpose(Image.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _measure(name: str, data: bytes, bg_coefficient: float, queue) -> None:
+    baseline = _peak_rss_bytes()
+    started = time.perf_counter()
+    IMPLEMENTATIONS[name](data, bg_coefficient)
+    elapsed = time.perf_counter() - started
+    queue.put((elapsed, _peak_rss_bytes() - baseline))
+
+
+def run(name: str, data: bytes, bg_coefficient: float) -> tuple[float, int]:
+    """
+    Runs one implementation in a fresh process.
+
+    Returns:
+        tuple[float, int]: The wall time in seconds and the peak RSS growth
+                           in bytes.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(name, data, bg_coefficient, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--bg-coefficient", type=float, default=1.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format", default="JPEG")
+    args = parser.parse_args()
+
+    data = make_photo(args.megapixels, args.format)
+    print(f"input: {args.megapixels} MP {args.format}, {len(data) / 1e6:.1f} MB encoded")
+    print(f"encoder: {engine.encoder_options('jpeg')}")
+    for name in IMPLEMENTATIONS:
+        runs = [run(name, data, args.bg_coefficient) for _ in range(args.repeat)]
+        best_time = min(t for t, _ in runs)
+        peak = max(m for _, m in runs)
+        print(f"{name:>10}: {best_time * 1000:8.1f} ms  peak RSS +{peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
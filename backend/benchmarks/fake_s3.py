@@ -0,0 +1,131 @@
+"""
+In-memory stand-in for the boto3 S3 client, for load tests.
+
+Implements the subset of the S3 API that `S3BucketService` uses, keeping
+objects in a dict. An optional per-call latency approximates the round
+trip to a real bucket, so that worker and pool sizes can be tuned without
+one.
+"""
+import datetime
+import hashlib
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+class _Body:
+    """
+    A minimal StreamingBody: `read(amt)` and `close()`.
+    """
+    def __init__(self, data: bytes) -> None:
+        self._data = memoryview(data)
+        self._position = 0
+
+    def read(self, amt: int | None = None) -> bytes:
+        end = len(self._data) if amt is None else self._position + amt
+        chunk = self._data[self._position:end].tobytes()
+        self._position += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        pass
+
+
+class FakeS3Client:
+    """
+    A thread-safe in-memory S3 client.
+    """
+    def __init__(self, latency: float = 0.0) -> None:
+        """
+        Initializes the FakeS3Client.
+
+        Args:
+            latency (float): The delay added to every call, in seconds.
+        """
+        self.latency = latency
+        self.calls = 0
+        self._objects: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _call(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _store(self, key: str, data: bytes, content_type: str | None) -> str:
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._lock:
+            self._objects[key] = {
+                "data": data,
+                "ContentType": content_type or "binary/octet-stream",
+                "ETag": etag,
+                "LastModified": time.time(),
+            }
+        return etag
+
+    def _get(self, key: str, operation: str) -> dict:
+        with self._lock:
+            obj = self._objects.get(key)
+        if obj is None:
+            code = "404" if operation == "HeadObject" else "NoSuchKey"
+            raise ClientError({"Error": {"Code": code}}, operation)
+        return obj
+
+    @staticmethod
+    def _meta(obj: dict, length: int) -> dict:
+        return {
+            "ContentLength": length,
+            "ContentType": obj["ContentType"],
+            "ETag": obj["ETag"],
+            "LastModified": datetime.datetime.fromtimestamp(
+                int(obj["LastModified"]), datetime.timezone.utc
+            ),
+        }
+
+    def create_bucket(self, Bucket: str, **kwargs) -> dict:
+        self._call()
+        return {}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, ContentType: str | None = None,
+                   **kwargs) -> dict:
+        self._call()
+        return {"ETag": self._store(Key, bytes(Body), ContentType)}
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, ExtraArgs=None, Config=None) -> None:
+        self._call()
+        self._store(Key, Fileobj.read(), (ExtraArgs or {}).get("ContentType"))
+
+    def head_object(self, Bucket: str, Key: str) -> dict:
+        self._call()
+        obj = self._get(Key, "HeadObject")
+        return self._meta(obj, len(obj["data"]))
+
+    def get_object(self, Bucket: str, Key: str, Range: str | None = None) -> dict:
+        self._call()
+        obj = self._get(Key, "GetObject")
+        data = obj["data"]
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            data = data[int(start):int(end) + 1]
+        return {"Body": _Body(data), **self._meta(obj, len(data))}
+
+    def delete_object(self, Bucket: str, Key: str) -> dict:
+        self._call()
+        with self._lock:
+            self._objects.pop(Key, None)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", MaxKeys: int = 1000,
+                        ContinuationToken: str | None = None, **kwargs) -> dict:
+        self._call()
+        with self._lock:
+            keys = sorted(key for key in self._objects if key.startswith(Prefix))
+        if ContinuationToken:
+            keys = [key for key in keys if key > ContinuationToken]
+        page = keys[:MaxKeys]
+        response = {"Contents": [{"Key": key} for key in page], "IsTruncated": len(keys) > MaxKeys}
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1]
+        return response
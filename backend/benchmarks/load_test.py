@@ -0,0 +1,316 @@
+"""
+End-to-end load test of the backend against a local S3 stand-in.
+
+Starts the FastAPI app under uvicorn in this process, with a temporary
+SQLite database, a temporary working directory and one of:
+
+- "memory": the in-process `FakeS3Client` (no extra dependencies);
+- "moto": a moto S3 server on a free local port (needs `moto[server]`);
+- the URL of a local S3-compatible server, such as the minio container.
+
+It then drives the edit, S3 file and file list endpoints at each
+concurrency level and reports throughput, latency percentiles and the
+error rate per endpoint. Server settings such as IMAGE_WORKERS are read
+from the environment as usual.
+
+Usage (from the backend directory, or `python alicecom.py bench` from the
+repository root):
+    python -m benchmarks.load_test [--concurrency 1,4,16] [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image
+
+ENDPOINTS = ("edit", "s3-file", "thumbnail", "files-list")
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+SEED_OBJECTS = 8
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    # Nearest-rank percentile.
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(endpoint: str, concurrency: int, latencies: list[float], errors: int,
+              elapsed: float) -> dict:
+    """
+    Turns the raw measurements of one run into its report line.
+
+    Args:
+        endpoint (str): The scenario name.
+        concurrency (int): The number of concurrent clients.
+        latencies (list[float]): The latency of every request, in seconds.
+        errors (int): The number of failed requests.
+        elapsed (float): The wall time of the run, in seconds.
+
+    Returns:
+        dict: Throughput, error rate and latency percentiles in ms.
+    """
+    ordered = sorted(latencies)
+    total = len(latencies)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 2) if ordered else None,
+        "p95_ms": round(_percentile(ordered, 95) * 1000, 2) if ordered else None,
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 2) if ordered else None,
+    }
+
+
+class _Server:
+    """
+    Runs uvicorn in a background thread.
+    """
+    def __init__(self, app, port: int) -> None:
+        import uvicorn
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "_Server":
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("The app server did not start.")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def _drive(base_url: str, endpoints: list[str], levels: list[int], requests: int,
+                 image: bytes) -> list[dict]:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        keys = []
+        for index in range(SEED_OBJECTS):
+            response = await client.post(
+                "/edit/add-white-bg/",
+                files={"file": ("seed.jpg", image + index.to_bytes(4, "big"), "image/jpeg")},
+            )
+            response.raise_for_status()
+            keys.append(response.json()["url"].rsplit("/", 1)[1])
+
+        counter = 0
+
+        def request(endpoint: str):
+            nonlocal counter
+            counter += 1
+            if endpoint == "edit":
+                # Bytes after the JPEG end marker are ignored by the decoder
+                # but change the content hash, so every request misses the
+                # edit cache and does the full decode/composite/upload.
+                body = image + f"bench-{counter}".encode()
+                return client.post(
+                    "/edit/add-white-bg/", files={"file": ("bench.jpg", body, "image/jpeg")}
+                )
+            key = keys[counter % len(keys)]
+            if endpoint == "s3-file":
+                return client.get(f"/s3/file/{key}")
+            if endpoint == "thumbnail":
+                return client.get(f"/s3/file/{key}", params={"w": 256})
+            return client.get("/files/list", params={"limit": 20})
+
+        report = []
+        for endpoint in endpoints:
+            for concurrency in levels:
+                latencies: list[float] = []
+                errors = 0
+                remaining = requests
+
+                async def worker() -> None:
+                    nonlocal remaining, errors
+                    while remaining > 0:
+                        remaining -= 1
+                        started = time.perf_counter()
+                        try:
+                            response = await request(endpoint)
+                            failed = response.status_code >= 400
+                        except httpx.HTTPError:
+                            failed = True
+                        latencies.append(time.perf_counter() - started)
+                        errors += failed
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                line = summarize(endpoint, concurrency, latencies, errors,
+                                 time.perf_counter() - started)
+                report.append(line)
+                print_line(line)
+        return report
+
+
+def print_header() -> None:
+    print(f"{'endpoint':<12}{'conc':>5}{'reqs':>7}{'rps':>9}{'p50':>10}{'p95':>10}"
+          f"{'p99':>10}{'errors':>9}")
+
+
+def print_line(line: dict) -> None:
+    print(
+        f"{line['endpoint']:<12}{line['concurrency']:>5}{line['requests']:>7}"
+        f"{line['throughput_rps']:>9.1f}{line['p50_ms']:>8.1f}ms{line['p95_ms']:>8.1f}ms"
+        f"{line['p99_ms']:>8.1f}ms{line['error_rate']:>9.1%}"
+    )
+
+
+def run_load_test(
+    concurrency: list[int],
+    requests: int,
+    endpoints: list[str],
+    megapixels: float = 2.0,
+    s3: str = "memory",
+    s3_latency_ms: float = 0.0,
+    output: Path | None = None,
+) -> list[dict]:
+    """
+    Runs the load test and prints one line per endpoint and concurrency.
+
+    The app's settings are read when it is first imported, so this must run
+    before anything else in the process imports `app`. For the same reason
+    every `app` import, including the benchmark helpers that use it, happens
+    here once the environment is set.
+
+    Args:
+        concurrency (list[int]): The concurrency levels to run.
+        requests (int): The number of requests per endpoint and level.
+        endpoints (list[str]): The scenarios to run, from ENDPOINTS.
+        megapixels (float): The size of the test photo sent to /edit.
+        s3 (str): "memory", "moto", or the URL of a local S3 server.
+        s3_latency_ms (float): The latency added to every call of the
+                               in-memory S3, in milliseconds.
+        output (Path | None): Where to write the report as JSON.
+
+    Returns:
+        list[dict]: The report lines.
+    """
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise ValueError(f"Unknown endpoints {sorted(unknown)}; choose from {ENDPOINTS}.")
+
+    # The app is imported after the chdir below, so it must not be found
+    # through a relative path entry such as "" or ".".
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    workdir = Path(tempfile.mkdtemp(prefix="image-framer-bench-"))
+    previous_cwd = os.getcwd()
+    moto_server = None
+    try:
+        os.chdir(workdir)
+        (workdir / "frames").mkdir()
+        Image.new("RGBA", (600, 600), (120, 80, 40, 160)).save(workdir / "frames" / "frame.png")
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{workdir / 'bench.db'}",
+            "OBJECT_CACHE_DIR": str(workdir / "object_cache"),
+            "JOB_SPOOL_DIR": str(workdir / "job_spool"),
+        })
+        os.environ.setdefault("BUCKET_NAME", "image-framer-bench")
+        if s3 == "moto":
+            from moto.server import ThreadedMotoServer
+
+            moto_port = _free_port()
+            moto_server = ThreadedMotoServer(ip_address="127.0.0.1", port=moto_port)
+            moto_server.start()
+            os.environ.update({
+                "ENDPOINT": f"http://127.0.0.1:{moto_port}",
+                "ACCESS_KEY": "testing",
+                "SECRET_KEY": "testing",
+            })
+        elif s3 != "memory":
+            os.environ["ENDPOINT"] = s3
+        else:
+            os.environ.update({
+                "ENDPOINT": "http://s3.invalid",
+                "ACCESS_KEY": "testing",
+                "SECRET_KEY": "testing",
+            })
+
+        from app import s3 as s3_module
+        from app.main import app
+        from benchmarks.bench_white_bg import make_photo
+        from benchmarks.fake_s3 import FakeS3Client
+
+        services = list(s3_module._services.values())
+        if s3 == "memory":
+            client = FakeS3Client(latency=s3_latency_ms / 1000)
+            for service in services:
+                service._client = client
+        for service in services:
+            service.create_bucket()
+
+        image = make_photo(megapixels, "JPEG")
+
+        port = _free_port()
+        print(f"app on :{port}, S3: {s3}, photo: {megapixels} MP ({len(image) / 1e6:.1f} MB)")
+        print_header()
+        with _Server(app, port):
+            report = asyncio.run(
+                _drive(f"http://127.0.0.1:{port}", endpoints, concurrency, requests, image)
+            )
+    finally:
+        os.chdir(previous_cwd)
+        if moto_server is not None:
+            moto_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if output is not None:
+        output.write_text(json.dumps({"s3": s3, "megapixels": megapixels, "results": report},
+                                     indent=2))
+        print(f"report written to {output}")
+    return report
+
+
+def _csv(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=_csv, default=["1", "4", "16"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--endpoints", type=_csv, default=list(ENDPOINTS))
+    parser.add_argument("--megapixels", type=float, default=2.0)
+    parser.add_argument("--s3", default="memory",
+                        help='"memory", "moto" or the URL of a local S3 server.')
+    parser.add_argument("--s3-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    run_load_test(
+        [int(level) for level in args.concurrency],
+        args.requests,
+        args.endpoints,
+        megapixels=args.megapixels,
+        s3=args.s3,
+        s3_latency_ms=args.s3_latency_ms,
+        output=args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
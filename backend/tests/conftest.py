@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, get_async_db, get_db, get_session_factory
+from app.frame_cache import frame_cache
+from app.main import app
+from app.object_cache import object_cache
+from app.routers import editHandler, s3Handler
+from app.s3 import S3BucketService
+from tests.helpers import KEY, WritableClient, jpeg_bytes
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    """
+    Points the sync and async session dependencies at one temporary
+    SQLite database and returns the sync session factory.
+    """
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    Base.metadata.create_all(bind=engine)
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    yield TestingSessionLocal
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    app.dependency_overrides.pop(get_session_factory, None)
+    engine.dispose()
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture()
+def client(monkeypatch, tmp_path, session_factory):
+    """
+    A client of the app run from a temporary directory holding one frame,
+    with edit results uploaded to an in-memory list.
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "frames").mkdir()
+    Image.new("RGBA", (20, 20), (255, 0, 0, 128)).save(tmp_path / "frames" / "frame.png")
+    frame_cache.clear()
+
+    class DummyS3:
+        def __init__(self):
+            self.objects = []
+
+        def upload_object(self, name: str, content, content_type=None) -> None:
+            if hasattr(content, "read"):
+                content = content.read()
+            self.objects.append((name, content))
+
+        async def aupload_object(self, name: str, content, content_type=None) -> None:
+            self.upload_object(name, content, content_type)
+
+        def delete_object(self, name: str) -> None:
+            self.objects = [obj for obj in self.objects if obj[0] != name]
+
+    dummy_s3 = DummyS3()
+    monkeypatch.setattr(editHandler, "s3", dummy_s3)
+
+    return TestClient(app)
+
+
+@pytest.fixture()
+def s3_client(monkeypatch):
+    """
+    Points the S3 router at an in-memory bucket holding a JPEG under KEY.
+    """
+    object_cache.clear()
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    service._client = WritableClient({KEY: jpeg_bytes()})
+    monkeypatch.setattr(s3Handler, "s3", service)
+    return service._client
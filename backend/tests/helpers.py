@@ -0,0 +1,89 @@
+"""
+Helpers shared by the test modules: sample images and in-memory stand-ins
+for the boto3 S3 client.
+"""
+import datetime
+import io
+
+from botocore.exceptions import ClientError
+from PIL import Image
+
+KEY = "0b8f1c8e-8d1c-4c3e-9a63-2d0d6b3b1f7a.jpg"
+LAST_MODIFIED = datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+
+
+def image_bytes(color: str = "blue") -> bytes:
+    img = Image.new("RGB", (10, 10), color)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    buf.seek(0)
+    return buf.getvalue()
+
+
+def jpeg_bytes(size=(800, 400)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, "red").save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class FakeBody(io.BytesIO):
+    pass
+
+
+class InMemoryClient:
+    def __init__(self, objects, content_types=None):
+        self.objects = objects
+        self.content_types = content_types or {}
+        self.calls = []
+
+    def _missing(self, operation):
+        return ClientError({"Error": {"Code": "NoSuchKey"}}, operation)
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(("head_object", None))
+        if Key not in self.objects:
+            raise self._missing("HeadObject")
+        return {
+            "ContentLength": len(self.objects[Key]),
+            "ContentType": self.content_types.get(Key, "image/jpeg"),
+            "ETag": '"abc123"',
+            "LastModified": LAST_MODIFIED,
+        }
+
+    def get_object(self, Bucket, Key, Range=None):
+        self.calls.append(("get_object", Range))
+        if Key not in self.objects:
+            raise self._missing("GetObject")
+        data = self.objects[Key]
+        if Range:
+            start, end = (int(v) for v in Range.removeprefix("bytes=").split("-"))
+            data = data[start:end + 1]
+        return {
+            "Body": FakeBody(data),
+            "ContentLength": len(data),
+            "ContentType": self.content_types.get(Key, "image/jpeg"),
+            "ETag": '"abc123"',
+            "LastModified": LAST_MODIFIED,
+        }
+
+
+class WritableClient(InMemoryClient):
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls.append(("put_object", Key))
+        self.objects[Key] = Body
+
+
+class DedupClient:
+    def __init__(self):
+        self.objects = {}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": len(self.objects[Key])}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self.objects[key] = fileobj.read()
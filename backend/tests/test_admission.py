@@ -0,0 +1,105 @@
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+from app import admission, engine
+from app.admission import ImageTooLarge, MemoryBudget, MemoryBudgetExceeded
+
+
+def _image(size=(400, 300), fmt="JPEG") -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, "green").save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def test_estimate_follows_size_coefficient_and_limits():
+    data = _image()
+
+    base = engine.estimate_memory(data, "add-white-bg", bg_coefficient=1.0)
+    scaled = engine.estimate_memory(data, "add-white-bg", bg_coefficient=2.0)
+    limited = engine.estimate_memory(data, "add-white-bg", bg_coefficient=1.0, max_width=100)
+    thumbnail = engine.estimate_memory(data, "resize", width=64, output_format="jpeg")
+
+    assert base >= 400 * 300 * (3 + 4 + 7)
+    assert scaled > base
+    assert limited < base
+    assert thumbnail < base
+
+
+def test_estimate_counts_buffering_jpeg_encoder(monkeypatch):
+    data = _image()
+    monkeypatch.setattr(engine.settings, "JPEG_OPTIMIZE", False)
+    monkeypatch.setattr(engine.settings, "JPEG_PROGRESSIVE", False)
+    baseline = engine.estimate_memory(data, "add-white-bg", bg_coefficient=2.0)
+    webp = engine.estimate_memory(data, "add-white-bg", bg_coefficient=2.0, output_format="webp")
+    monkeypatch.setattr(engine.settings, "JPEG_PROGRESSIVE", True)
+    progressive = engine.estimate_memory(data, "add-white-bg", bg_coefficient=2.0)
+    monkeypatch.setattr(engine.settings, "JPEG_PROGRESSIVE", False)
+    monkeypatch.setattr(engine.settings, "JPEG_OPTIMIZE", True)
+    optimized = engine.estimate_memory(data, "add-white-bg", bg_coefficient=2.0)
+
+    # The coefficient buffer covers the 800x600 output, not the input.
+    assert progressive - baseline >= 800 * 600 * 3
+    assert optimized == progressive
+    assert webp == baseline
+
+
+def test_budget_rejects_after_wait_and_refuses_oversized_work():
+    budget = MemoryBudget(max_bytes=100, max_wait=0.0)
+
+    with budget.reserve(60):
+        with pytest.raises(MemoryBudgetExceeded):
+            with budget.reserve(50):
+                pass
+        assert budget.in_use == 60
+    with pytest.raises(ImageTooLarge):
+        with budget.reserve(10_000):
+            pass
+    assert budget.in_use == 0
+
+
+def test_budget_queues_until_memory_is_released():
+    budget = MemoryBudget(max_bytes=100, max_wait=5.0)
+    admitted = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with budget.reserve(100):
+            admitted.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    admitted.wait()
+    threading.Timer(0.05, release.set).start()
+    with budget.reserve(100):
+        assert budget.in_use == 100
+    holder.join()
+
+
+def test_edit_returns_503_when_budget_is_full(client, monkeypatch):
+    budget = MemoryBudget(max_bytes=2**30, max_wait=0.0, retry_after=7)
+    monkeypatch.setattr(admission, "memory_budget", budget)
+
+    with budget.reserve(2**30):
+        response = client.post(
+            "/edit/add-white-bg/",
+            files={"file": ("big.png", _image(fmt="PNG"), "image/png")},
+        )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+
+
+def test_edit_over_the_whole_budget_is_refused(client, monkeypatch):
+    monkeypatch.setattr(admission, "memory_budget", MemoryBudget(max_bytes=1000, max_wait=0.0))
+    image = ("big.png", _image(fmt="PNG"), "image/png")
+
+    single = client.post("/edit/add-white-bg/", files={"file": image})
+    job = client.post("/edit/jobs", files={"file": image})
+
+    assert single.status_code == 413
+    assert "limit" in single.json()["detail"]
+    assert job.status_code == 413
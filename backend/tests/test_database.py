@@ -0,0 +1,31 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base, upgrade_schema
+
+
+def test_upgrade_schema_adds_missing_columns_and_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        # processed_images as it was before cache_key was added.
+        connection.execute(text(
+            "CREATE TABLE processed_images (id INTEGER NOT NULL PRIMARY KEY, "
+            "original_filename VARCHAR, processed_url VARCHAR UNIQUE)"
+        ))
+        connection.execute(text(
+            "INSERT INTO processed_images (original_filename, processed_url) "
+            "VALUES ('a.jpg', 'https://example.com/a.jpg')"
+        ))
+
+    upgrade_schema(engine, Base.metadata)
+    upgrade_schema(engine, Base.metadata)
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("processed_images")}
+    assert {"cache_key", "created_at"} <= columns
+    indexes = {index["name"]: index for index in inspector.get_indexes("processed_images")}
+    assert indexes["ix_processed_images_cache_key"]["unique"]
+    assert indexes["ix_processed_images_created_at_id"]["column_names"] == ["created_at", "id"]
+    assert "edit_jobs" in inspector.get_table_names()
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM processed_images")).scalar() == 1
+    engine.dispose()
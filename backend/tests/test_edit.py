@@ -1,54 +1,14 @@
 import io
+import json
 
-import pytest
-from fastapi.testclient import TestClient
 from PIL import Image
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
-from app.database import Base, get_db
-from app.main import app
 from app.routers import editHandler
-
-
-@pytest.fixture()
-def client(monkeypatch):
-    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base.metadata.create_all(bind=engine)
-
-    def override_get_db():
-        db = TestingSessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
-
-    app.dependency_overrides[get_db] = override_get_db
-
-    class DummyS3:
-        def __init__(self):
-            self.objects = []
-
-        def upload_object(self, name: str, content: bytes) -> None:
-            self.objects.append((name, content))
-
-    dummy_s3 = DummyS3()
-    monkeypatch.setattr(editHandler, "s3", dummy_s3)
-
-    return TestClient(app)
-
-
-def _image_bytes(color: str = "blue") -> bytes:
-    img = Image.new("RGB", (10, 10), color)
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
-    return buf.getvalue()
+from tests.helpers import image_bytes
 
 
 def test_add_white_bg(client):
-    image_content = _image_bytes()
+    image_content = image_bytes()
     response = client.post(
         "/edit/add-white-bg/",
         files={"file": ("test.png", image_content, "image/png")},
@@ -60,7 +20,7 @@ def test_add_white_bg(client):
 
 
 def test_add_frame(client):
-    image_content = _image_bytes("red")
+    image_content = image_bytes("red")
     response = client.post(
         "/edit/add-frame/",
         files={"file": ("test.png", image_content, "image/png")},
@@ -69,3 +29,176 @@ def test_add_frame(client):
     body = response.json()
     assert body["filename"] == "test.png"
     assert body["url"]
+
+
+def test_repeated_edit_is_served_from_cache(client):
+    image_content = image_bytes("green")
+    files = {"file": ("test.png", image_content, "image/png")}
+
+    first = client.post("/edit/add-white-bg/", files=files)
+    second = client.post("/edit/add-white-bg/", files=files)
+    other = client.post("/edit/add-white-bg/?bg_coefficient=2", files=files)
+
+    assert first.json()["url"] == second.json()["url"]
+    assert other.json()["url"] != first.json()["url"]
+    assert len(editHandler.s3.objects) == 2
+
+
+def test_repeated_frame_edit_is_served_from_cache(client):
+    files = {"file": ("test.png", image_bytes("red"), "image/png")}
+
+    first = client.post("/edit/add-frame/", files=files)
+    second = client.post("/edit/add-frame/", files=files)
+
+    assert first.json()["url"] == second.json()["url"]
+    assert len(editHandler.s3.objects) == 1
+
+
+def test_batch_streams_ndjson_results(client):
+    files = [
+        ("files", (f"img{i}.png", image_bytes(color), "image/png"))
+        for i, color in enumerate(["red", "green", "blue"])
+    ]
+    # The same image again is served from the cache of the first request.
+    client.post("/edit/add-white-bg/", files={"file": ("red.png", image_bytes("red"), "image/png")})
+
+    response = client.post("/edit/batch?operation=add-white-bg", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results, summary = lines[:-1], lines[-1]
+    assert sorted(r["index"] for r in results) == [0, 1, 2]
+    assert all(r["url"] for r in results)
+    assert summary == {"done": True, "total": 3, "processed": 2, "cached": 1, "failed": 0}
+    assert len(editHandler.s3.objects) == 3
+
+    listed = client.get("/files/list").json()
+    assert len(listed) == 3
+
+
+def test_batch_reports_per_image_errors(client):
+    files = [
+        ("files", ("good.png", image_bytes(), "image/png")),
+        ("files", ("bad.png", b"not an image", "image/png")),
+    ]
+
+    response = client.post("/edit/batch?operation=add-frame", files=files)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    errors = [line for line in lines if "error" in line]
+    assert [e["filename"] for e in errors] == ["bad.png"]
+    assert lines[-1]["failed"] == 1
+    assert lines[-1]["processed"] == 1
+
+
+def test_batch_processes_repeated_images_once(client):
+    files = [
+        ("files", (f"copy{i}.png", image_bytes("orange"), "image/png")) for i in range(3)
+    ]
+
+    response = client.post("/edit/batch?operation=add-white-bg", files=files)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results, summary = lines[:-1], lines[-1]
+    assert len({r["url"] for r in results}) == 1
+    assert summary == {"done": True, "total": 3, "processed": 1, "cached": 2, "failed": 0}
+    assert len(editHandler.s3.objects) == 1
+
+
+def test_batch_reports_url_recorded_by_a_concurrent_request(client, monkeypatch):
+    files = [("files", ("racy.png", image_bytes("purple"), "image/png"))]
+    first = client.post("/edit/batch?operation=add-white-bg", files=files)
+    recorded = json.loads(first.text.splitlines()[0])["url"]
+    # The second batch misses the cache as if the first hadn't committed yet.
+    find_cached = editHandler._find_cached
+    missed = []
+
+    def miss_once(db, cache_key):
+        if not missed:
+            missed.append(cache_key)
+            return None
+        return find_cached(db, cache_key)
+
+    monkeypatch.setattr(editHandler, "_find_cached", miss_once)
+
+    second = client.post("/edit/batch?operation=add-white-bg", files=files)
+
+    lines = [json.loads(line) for line in second.text.splitlines()]
+    assert lines[0]["url"] != recorded
+    assert lines[-1]["reconciled"] == [{"index": 0, "url": recorded}]
+    assert [item["processed_url"] for item in client.get("/files/list").json()] == [recorded]
+    # The second batch's own upload is deleted again.
+    assert len(editHandler.s3.objects) == 1
+
+
+def test_edit_losing_a_race_deletes_its_upload(client, monkeypatch):
+    files = {"file": ("racy.png", image_bytes("purple"), "image/png")}
+    first = client.post("/edit/add-white-bg/", files=files)
+    find_cached = editHandler._find_cached
+    missed = []
+
+    def miss_once(db, cache_key):
+        if not missed:
+            missed.append(cache_key)
+            return None
+        return find_cached(db, cache_key)
+
+    monkeypatch.setattr(editHandler, "_find_cached", miss_once)
+
+    second = client.post("/edit/add-white-bg/", files=files)
+
+    assert second.json()["url"] == first.json()["url"]
+    assert [name for name, _ in editHandler.s3.objects] == [
+        first.json()["url"].rsplit("/", 1)[-1]
+    ]
+
+
+def test_out_of_range_bg_coefficient_is_rejected(client):
+    upload = ("test.png", image_bytes(), "image/png")
+    for value in ("0", "-1", "0.5", "1e6"):
+        query = f"bg_coefficient={value}"
+        assert client.post(f"/edit/add-white-bg/?{query}", files={"file": upload}).status_code == 422
+        assert client.post(f"/edit/batch?{query}", files=[("files", upload)]).status_code == 422
+        assert client.post(f"/edit/jobs?{query}", files={"file": upload}).status_code == 422
+
+
+def test_batch_rejects_unknown_operation(client):
+    files = [("files", ("a.png", image_bytes(), "image/png"))]
+    assert client.post("/edit/batch?operation=rotate", files=files).status_code == 400
+
+
+def test_add_frame_with_max_size(client):
+    image = Image.new("RGB", (200, 100), "blue")
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG")
+
+    response = client.post(
+        "/edit/add-frame/?max_width=50",
+        files={"file": ("big.jpg", buf.getvalue(), "image/jpeg")},
+    )
+
+    assert response.status_code == 200
+    _, content = editHandler.s3.objects[-1]
+    assert Image.open(io.BytesIO(content)).size == (50, 25)
+
+
+def test_output_format_parameter_and_accept_header(client):
+    files = {"file": ("test.png", image_bytes("purple"), "image/png")}
+
+    response = client.post("/edit/add-white-bg/?output_format=webp", files=files)
+    assert response.json()["url"].endswith(".webp")
+
+    response = client.post(
+        "/edit/add-frame/", files=files, headers={"Accept": "image/webp,image/*;q=0.8"}
+    )
+    assert response.json()["url"].endswith(".webp")
+
+    response = client.post("/edit/add-frame/", files=files, headers={"Accept": "*/*"})
+    assert response.json()["url"].endswith(".jpg")
+
+
+def test_unknown_output_format_is_rejected(client):
+    files = {"file": ("test.png", image_bytes(), "image/png")}
+    response = client.post("/edit/add-white-bg/?output_format=bmp", files=files)
+    assert response.status_code == 400
@@ -0,0 +1,122 @@
+import io
+
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+
+from app import engine
+
+
+def _encode(image: Image.Image, fmt: str = "PNG") -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def _legacy_add_white_bg(data: bytes, bg_coefficient: float) -> Image.Image:
+    user_image = Image.open(io.BytesIO(data)).convert("RGBA")
+    new_width = int(user_image.width * bg_coefficient)
+    new_height = int(user_image.height * bg_coefficient)
+    background = Image.new("RGBA", (new_width, new_height), "WHITE")
+    paste_x = (new_width - user_image.width) // 2
+    paste_y = (new_height - user_image.height) // 2
+    background.paste(user_image, (paste_x, paste_y), user_image)
+    return background.convert("RGB")
+
+
+def _decode(data: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(data))
+
+
+def test_has_transparency():
+    assert not engine.has_transparency(Image.new("RGB", (4, 4)))
+    assert not engine.has_transparency(Image.new("RGBA", (4, 4), (1, 2, 3, 255)))
+    assert engine.has_transparency(Image.new("RGBA", (4, 4), (1, 2, 3, 0)))
+    palette = Image.new("P", (4, 4))
+    palette.info["transparency"] = 0
+    assert engine.has_transparency(palette)
+
+
+def test_opaque_fast_path_matches_rgba_path():
+    for image in (
+        Image.new("RGB", (30, 20), "blue"),
+        Image.new("L", (30, 20), 128),
+        Image.new("RGBA", (30, 20), (10, 200, 30, 255)),
+    ):
+        data = _encode(image)
+        expected = engine.encode(_legacy_add_white_bg(data, 1.5))
+        assert engine.add_white_bg(data, 1.5) == expected
+
+
+def test_transparent_input_is_composited_on_white():
+    image = Image.new("RGBA", (10, 10), (255, 0, 0, 0))
+    image.putpixel((5, 5), (255, 0, 0, 255))
+
+    result = _decode(engine.add_white_bg(_encode(image), 2.0))
+
+    assert result.mode == "RGB"
+    assert result.size == (20, 20)
+    r, g, b = result.getpixel((6, 6))
+    assert r > 240 and g > 240 and b > 240
+
+
+def test_open_image_uses_jpeg_draft_mode(monkeypatch):
+    data = _encode(Image.new("RGB", (800, 600), "green"), "JPEG")
+    drafts = []
+    original_draft = JpegImageFile.draft
+
+    def spy_draft(self, mode, size):
+        result = original_draft(self, mode, size)
+        drafts.append(self.size)
+        return result
+
+    monkeypatch.setattr(JpegImageFile, "draft", spy_draft)
+
+    image = engine.open_image(data, max_width=100, max_height=100)
+
+    assert image.size == (100, 75)
+    # The DCT-domain scale is chosen to stay at or above the requested box.
+    assert drafts[0] == (200, 150)
+
+
+def test_open_image_reduces_other_formats():
+    data = _encode(Image.new("RGB", (800, 600), "green"))
+
+    image = engine.open_image(data, max_width=100)
+
+    assert image.size == (100, 75)
+
+
+def test_16_bit_and_palette_images_can_be_shrunk():
+    sixteen_bit = _encode(Image.new("I;16", (400, 200), 40000))
+    image = engine.open_image(sixteen_bit, max_width=100)
+    assert (image.mode, image.size) == ("L", (100, 50))
+    assert image.getpixel((0, 0)) == 40000 // 256
+
+    palette = _encode(Image.new("RGB", (400, 200), "red").convert("P"))
+    assert engine.open_image(palette, max_width=100).size == (100, 50)
+
+    result = _decode(engine.resize(sixteen_bit, 64, 64, fit="cover"))
+    assert result.size == (64, 64)
+
+
+def test_open_image_leaves_small_images_alone():
+    data = _encode(Image.new("RGB", (80, 60), "green"))
+
+    assert engine.open_image(data, max_width=100, max_height=100).size == (80, 60)
+
+
+def test_add_white_bg_respects_output_limit():
+    data = _encode(Image.new("RGB", (1000, 500), "green"), "JPEG")
+
+    result = _decode(engine.add_white_bg(data, 2.0, max_width=400))
+
+    assert result.width <= 400
+    assert result.size == (400, 200)
+
+
+def test_output_formats_encode_with_matching_type():
+    data = _encode(Image.new("RGB", (32, 32), "blue"))
+
+    for name in engine.available_formats():
+        result = _decode(engine.add_white_bg(data, 1.0, output_format=name))
+        assert result.format == engine.OUTPUT_FORMATS[name].pil_format
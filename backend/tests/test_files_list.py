@@ -0,0 +1,106 @@
+import asyncio
+import datetime
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from app.main import app
+from app.models import ProcessedImage
+from app.routers import dbHandler
+
+START = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture()
+def client(session_factory):
+    with session_factory() as db:
+        db.add_all(
+            ProcessedImage(
+                original_filename="album.jpg" if n % 2 else f"photo{n}.jpg",
+                processed_url=f"/s3/file/{n}.jpg",
+                created_at=START + datetime.timedelta(days=n),
+            )
+            for n in range(5)
+        )
+        db.commit()
+    return TestClient(app)
+
+
+def test_keyset_pagination(client):
+    first = client.get("/files/list", params={"limit": 2})
+    assert [item["id"] for item in first.json()] == [1, 2]
+    assert first.headers["x-next-cursor"] == "2"
+
+    second = client.get("/files/list", params={"limit": 2, "cursor": 2})
+    third = client.get("/files/list", params={"limit": 2, "cursor": 4})
+
+    assert [item["id"] for item in second.json()] == [3, 4]
+    assert [item["id"] for item in third.json()] == [5]
+    assert "x-next-cursor" not in third.headers
+
+
+def test_next_cursor_is_exposed_to_browsers(client):
+    response = client.get(
+        "/files/list", params={"limit": 2}, headers={"Origin": "http://localhost:5173"}
+    )
+    assert "x-next-cursor" in response.headers["access-control-expose-headers"].lower()
+
+
+def test_filters(client):
+    by_name = client.get("/files/list", params={"original_filename": "album.jpg"}).json()
+    assert [item["id"] for item in by_name] == [2, 4]
+
+    in_range = client.get(
+        "/files/list",
+        params={
+            "created_after": "2025-01-02T00:00:00Z",
+            "created_before": "2025-01-04T00:00:00+00:00",
+        },
+    ).json()
+    assert [item["id"] for item in in_range] == [2, 3]
+
+
+def test_items_do_not_expose_internal_columns(client):
+    item = client.get("/files/list").json()[0]
+    assert set(item) == {"id", "original_filename", "processed_url", "created_at"}
+
+
+def test_slow_list_does_not_block_other_requests(client, monkeypatch):
+    delay = 0.3
+    build_query = dbHandler.list_images_query
+
+    def slow_query(*args):
+        # test_sleep() runs inside SQLite, on the aiosqlite worker thread.
+        return build_query(*args).add_columns(func.test_sleep(delay))
+
+    monkeypatch.setattr(dbHandler, "list_images_query", slow_query)
+    override = app.dependency_overrides[dbHandler.get_async_db]
+
+    async def sleepy_db():
+        async for db in override():
+            connection = await db.connection()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.create_function(
+                "test_sleep", 1, lambda seconds: time.sleep(seconds) or 0
+            )
+            yield db
+
+    monkeypatch.setitem(app.dependency_overrides, dbHandler.get_async_db, sleepy_db)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            listing = asyncio.gather(*(http.get("/files/list") for _ in range(3)))
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            unrelated = await http.get("/openapi.json")
+            unrelated_latency = time.perf_counter() - started
+            return await listing, unrelated, unrelated_latency
+
+    listings, unrelated, latency = asyncio.run(run())
+
+    assert all(r.status_code == 200 and len(r.json()) == 5 for r in listings)
+    assert unrelated.status_code == 200
+    assert latency < delay
@@ -0,0 +1,87 @@
+import os
+
+from PIL import Image
+
+from app.frame_cache import FrameCache
+
+
+def _write_frame(path, color=(255, 0, 0, 128), size=(20, 20)):
+    Image.new("RGBA", size, color).save(path)
+
+
+def test_frame_cache_hits_and_misses(tmp_path):
+    _write_frame(tmp_path / "frame.png")
+    cache = FrameCache(tmp_path, max_bytes=1024 * 1024, resize_admit_after=2)
+
+    first = cache.get("frame.png", (10, 10))
+    second = cache.get("frame.png", (10, 10))
+    third = cache.get("frame.png", (10, 10))
+
+    assert second is third
+    assert first is not second
+    assert third.size == (10, 10)
+    assert third.mode == "RGBA"
+    stats = cache.stats()
+    # The resize is cached on its second miss; fetching the decoded frame to
+    # resize from is not counted.
+    assert stats["misses"] == 2
+    assert stats["hits"] == 1
+    assert stats["entries"] == 2
+
+
+def test_frame_cache_invalidated_by_mtime(tmp_path):
+    frame_path = tmp_path / "frame.png"
+    _write_frame(frame_path, color=(255, 0, 0, 255))
+    cache = FrameCache(tmp_path, max_bytes=1024 * 1024)
+    assert cache.get("frame.png").getpixel((0, 0)) == (255, 0, 0, 255)
+
+    _write_frame(frame_path, color=(0, 255, 0, 255))
+    stat = frame_path.stat()
+    os.utime(frame_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert cache.get("frame.png").getpixel((0, 0)) == (0, 255, 0, 255)
+
+
+def test_frame_cache_evicts_to_byte_budget(tmp_path):
+    _write_frame(tmp_path / "frame.png", size=(10, 10))
+    # Room for the 400 byte frame plus a single 400 byte resize.
+    cache = FrameCache(tmp_path, max_bytes=800, resize_admit_after=1)
+
+    cache.get("frame.png", (10, 10))
+    cache.get("frame.png", (5, 20))
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 800
+    assert stats["evictions"] >= 1
+    # The older resize went, not the frame it was made from.
+    cache.get("frame.png")
+    assert cache.stats()["hits"] == 1
+
+
+def test_one_off_sizes_leave_the_frame_cached(tmp_path):
+    _write_frame(tmp_path / "frame.png", size=(10, 10))
+    cache = FrameCache(tmp_path, max_bytes=2000, resize_admit_after=2)
+    base = cache.get("frame.png")
+
+    for width in range(1, 50):
+        cache.get("frame.png", (width, 7))
+
+    assert cache.get("frame.png") is base
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["evictions"] == 0
+    assert stats["misses"] == 50
+
+
+def test_frame_cache_keeps_the_entry_being_stored(tmp_path):
+    _write_frame(tmp_path / "frame.png", size=(10, 10))
+    # The 800 byte resize only fits once the 400 byte frame has gone.
+    cache = FrameCache(tmp_path, max_bytes=800, resize_admit_after=1)
+
+    resized = cache.get("frame.png", (20, 10))
+
+    assert cache.get("frame.png", (20, 10)) is resized
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["entries"] == 1
+    assert stats["evictions"] == 1
@@ -0,0 +1,29 @@
+from app.http_utils import negotiate_image_format, parse_range
+
+FORMATS = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def test_negotiate_prefers_explicit_modern_formats():
+    assert negotiate_image_format("image/avif,image/webp,*/*;q=0.8", FORMATS, "jpeg") == "avif"
+    assert negotiate_image_format("image/webp,image/*", FORMATS, "jpeg") == "webp"
+
+
+def test_negotiate_falls_back_to_default():
+    assert negotiate_image_format(None, FORMATS, "jpeg") == "jpeg"
+    assert negotiate_image_format("*/*", FORMATS, "jpeg") == "jpeg"
+    assert negotiate_image_format("image/webp;q=0", FORMATS, "jpeg") == "jpeg"
+
+
+def test_parse_range_variants():
+    assert parse_range("bytes=0-9", 100) == [(0, 9)]
+    assert parse_range("bytes=90-", 100) == [(90, 99)]
+    assert parse_range("bytes=-10", 100) == [(90, 99)]
+    assert parse_range("bytes=0-1,5-6", 100) == [(0, 1), (5, 6)]
+    assert parse_range("items=0-1", 100) is None
+
+
+def test_parse_range_merges_and_caps_ranges():
+    assert parse_range("bytes=5-9,0-4,20-29,25-30", 100) == [(0, 9), (20, 30)]
+    many = ",".join(f"{i * 3}-{i * 3}" for i in range(20))
+    assert parse_range(f"bytes={many}", 100) is None
+    assert parse_range(f"bytes={many}", 100, max_ranges=20) is not None
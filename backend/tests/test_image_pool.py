@@ -0,0 +1,54 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app import engine
+from app.frame_cache import frame_cache
+from app.image_pool import ImagePool
+
+
+def _image_bytes(color="blue", size=(32, 24)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture()
+def frames_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "frames").mkdir()
+    Image.new("RGBA", (20, 20), (255, 0, 0, 128)).save(tmp_path / "frames" / "frame.png")
+    frame_cache.clear()
+    return tmp_path / "frames"
+
+
+def test_inline_pool_runs_engine_directly(frames_dir):
+    pool = ImagePool(0, frames_dir)
+    data = _image_bytes()
+
+    assert pool.run("add-white-bg", data, bg_coefficient=1.5) == engine.add_white_bg(data, 1.5)
+
+
+def test_process_pool_matches_inline_results(frames_dir):
+    pool = ImagePool(2, frames_dir)
+    pool.start()
+    try:
+        data = _image_bytes("green")
+        white_bg = pool.run("add-white-bg", data, bg_coefficient=1.3)
+        framed = pool.run("add-frame", data, frame_name="frame.png")
+    finally:
+        pool.shutdown()
+
+    assert white_bg == engine.add_white_bg(data, 1.3)
+    assert framed == engine.add_frame(data, "frame.png")
+    assert Image.open(io.BytesIO(white_bg)).size == (41, 31)
+
+
+def test_process_pool_propagates_errors(frames_dir):
+    pool = ImagePool(1, frames_dir)
+    try:
+        with pytest.raises(Exception):
+            pool.run("add-white-bg", b"not an image", bg_coefficient=1.3)
+    finally:
+        pool.shutdown()
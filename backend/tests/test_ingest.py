@@ -0,0 +1,86 @@
+import io
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.config import settings
+from app.ingest import UploadLimitMiddleware, sniff_content_type
+from app.main import app
+from app.routers import s3Handler
+from app.s3 import S3BucketService
+from tests.helpers import DedupClient
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "blue").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_sniff_content_type():
+    assert sniff_content_type(_png()) == "image/png"
+    assert sniff_content_type(b"\xff\xd8\xff\xe0\x00\x10JFIF") == "image/jpeg"
+    assert sniff_content_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert sniff_content_type(b"\x00\x00\x00\x1cftypavif") == "image/avif"
+    assert sniff_content_type(b"%PDF-1.7") == "application/pdf"
+    assert sniff_content_type(b"<html>") is None
+
+
+def test_s3_upload_uses_sniffed_type(monkeypatch):
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    service._client = DedupClient()
+    monkeypatch.setattr(s3Handler, "s3", service)
+    upload = TestClient(app)
+
+    spoofed = upload.post("/s3/upload", files={"file": ("doc.png", b"%PDF-1.7 ...", "image/png")})
+    bogus = upload.post("/s3/upload", files={"file": ("x.png", b"<script>", "image/png")})
+
+    assert spoofed.json()["data"]["content_type"] == "application/pdf"
+    assert bogus.status_code == 415
+    assert len(service._client.objects) == 1
+
+
+def test_edit_rejects_bogus_and_oversized_uploads(client, monkeypatch):
+    bogus = client.post(
+        "/edit/add-white-bg/", files={"file": ("x.png", b"<html></html>", "image/png")}
+    )
+    monkeypatch.setattr(settings, "EDIT_MAX_FILE_SIZE", 10)
+    oversized = client.post(
+        "/edit/add-frame/", files={"file": ("x.png", _png(), "image/png")}
+    )
+
+    assert bogus.status_code == 415
+    assert oversized.status_code == 413
+
+
+def _limited_app(calls: list) -> UploadLimitMiddleware:
+    inner = FastAPI()
+
+    @inner.post("/up")
+    async def up(request: Request):
+        calls.append("called")
+        return {"size": len(await request.body())}
+
+    return UploadLimitMiddleware(inner, limits={"/up": 100})
+
+
+def test_upload_limit_middleware():
+    calls = []
+    limited = TestClient(_limited_app(calls))
+
+    declared = limited.post("/up", content=b"x" * 500)
+    assert declared.status_code == 413
+    assert calls == []
+
+    streamed = limited.post("/up", content=iter([b"x" * 60, b"x" * 60]))
+    small = limited.post("/up", content=b"x" * 50)
+
+    assert streamed.status_code == 413
+    assert small.json() == {"size": 50}
+
+
+def test_batch_body_limit_is_its_own_setting():
+    middleware = next(m for m in app.user_middleware if m.cls is UploadLimitMiddleware)
+    assert middleware.kwargs["limits"]["/edit/batch"] == settings.BATCH_MAX_BYTES
+    assert settings.BATCH_MAX_BYTES < settings.BATCH_MAX_FILES * settings.EDIT_MAX_FILE_SIZE
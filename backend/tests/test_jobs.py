@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.jobs import JobQueue, QueueFull
+from app.routers import editHandler
+from tests.helpers import image_bytes
+
+
+@pytest.fixture()
+def queue(monkeypatch, tmp_path, session_factory):
+    job_queue = JobQueue(session_factory, tmp_path / "spool", workers=1,
+                         max_pending=2, poll_interval=0.05)
+    monkeypatch.setattr(editHandler, "job_queue", job_queue)
+    yield job_queue
+    job_queue.stop()
+
+
+def _submit(client, color="blue", **params):
+    return client.post(
+        "/edit/jobs",
+        params=params,
+        files={"file": ("test.png", image_bytes(color), "image/png")},
+    )
+
+
+def test_job_runs_and_long_poll_returns_result(client, queue):
+    queue.start(editHandler.run_job)
+    submitted = _submit(client)
+    assert submitted.status_code == 202
+    job = submitted.json()
+    assert job["status"] in ("queued", "running", "succeeded")
+    assert submitted.headers["location"].endswith(f"/edit/jobs/{job['id']}")
+
+    body = client.get(f"/edit/jobs/{job['id']}", params={"wait": 5}).json()
+
+    assert body["status"] == "succeeded"
+    assert body["url"].endswith(".jpg")
+    assert body["timings"]["cached"] is False
+    assert {"queue_wait_ms", "process_ms", "upload_ms", "run_ms"} <= body["timings"].keys()
+    assert body["finished_at"] is not None
+    assert len(editHandler.s3.objects) == 1
+    assert not any(queue.spool_dir.iterdir())
+
+
+def test_repeated_job_is_served_from_cache(client, queue):
+    queue.start(editHandler.run_job)
+    first = _submit(client, "green", operation="add-frame").json()
+    first = client.get(f"/edit/jobs/{first['id']}", params={"wait": 5}).json()
+    second = _submit(client, "green", operation="add-frame").json()
+    second = client.get(f"/edit/jobs/{second['id']}", params={"wait": 5}).json()
+
+    assert second["url"] == first["url"]
+    assert second["timings"]["cached"] is True
+    assert len(editHandler.s3.objects) == 1
+
+
+def test_full_queue_is_refused(client, queue):
+    assert _submit(client).status_code == 202
+    assert _submit(client).status_code == 202
+
+    refused = _submit(client)
+
+    assert refused.status_code == 503
+    assert int(refused.headers["retry-after"]) >= 1
+
+
+def test_concurrent_submits_respect_the_limit(queue, session_factory, monkeypatch):
+    pending = queue.pending
+
+    def slow_pending(db):
+        count = pending(db)
+        # Give the other submits time to count before this one inserts.
+        time.sleep(0.05)
+        return count
+
+    monkeypatch.setattr(queue, "pending", slow_pending)
+    outcomes = []
+
+    def submit():
+        with session_factory() as db:
+            try:
+                queue.submit(db, "add-frame", {}, "test.png", image_bytes())
+                outcomes.append("queued")
+            except QueueFull:
+                outcomes.append("full")
+
+    threads = [threading.Thread(target=submit) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ["full"] * 3 + ["queued"] * 2
+    with session_factory() as db:
+        assert pending(db) == 2
+
+
+def test_cancel_queued_job(client, queue):
+    job = _submit(client).json()
+
+    cancelled = client.delete(f"/edit/jobs/{job['id']}")
+
+    assert cancelled.status_code == 200
+    assert cancelled.json()["status"] == "cancelled"
+    assert not any(queue.spool_dir.iterdir())
+    assert client.delete(f"/edit/jobs/{job['id']}").status_code == 409
+
+    queue.start(editHandler.run_job)
+    assert client.get(f"/edit/jobs/{job['id']}", params={"wait": 0.2}).json()["status"] == "cancelled"
+    assert editHandler.s3.objects == []
+
+
+def test_failed_job_reports_error(client, queue):
+    queue.start(editHandler.run_job)
+    job = client.post(
+        "/edit/jobs",
+        # A PNG signature gets past upload validation, but doesn't decode.
+        files={"file": ("test.png", b"\x89PNG\r\n\x1a\nnot an image", "image/png")},
+    ).json()
+
+    body = client.get(f"/edit/jobs/{job['id']}", params={"wait": 5}).json()
+
+    assert body["status"] == "failed"
+    assert body["error"].startswith("An error occurred during processing")
+
+
+def test_job_fails_when_its_outcome_cannot_be_committed(client, queue):
+    def runner(db, job, contents):
+        def fail_commit(session):
+            raise RuntimeError("database is locked")
+
+        event.listen(db, "before_commit", fail_commit, once=True)
+        return "/s3/file/result.jpg", {}
+
+    queue.start(runner)
+    job = _submit(client).json()
+
+    body = client.get(f"/edit/jobs/{job['id']}", params={"wait": 5}).json()
+
+    assert body["status"] == "failed"
+    assert body["error"] == "The job's result could not be recorded."
+    assert not any(queue.spool_dir.iterdir())
+
+
+def test_unknown_job_and_operation(client, queue):
+    assert client.get("/edit/jobs/missing").status_code == 404
+    assert client.delete("/edit/jobs/missing").status_code == 404
+    assert _submit(client, operation="rotate").status_code == 400
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def _run(code: str, **env) -> str:
+    # The test process has already imported `app`, so the load test runs in a
+    # fresh interpreter where its environment overrides can still apply.
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_importing_load_test_does_not_build_settings():
+    out = _run("import sys, benchmarks.load_test; print('app.config' in sys.modules)")
+
+    assert out == "False"
+
+
+def test_load_test_uses_configured_bucket():
+    out = _run(
+        "from benchmarks.load_test import run_load_test\n"
+        "report = run_load_test([1], 2, ['files-list'], megapixels=0.01)\n"
+        "from app import s3\n"
+        "from app.config import settings\n"
+        "buckets = sorted({s.bucket_name for s in s3._services.values()})\n"
+        "print(settings.BUCKET_NAME, ','.join(buckets), report[0]['errors'])\n",
+        BUCKET_NAME="custom-bench-bucket",
+    )
+
+    assert out == "custom-bench-bucket custom-bench-bucket 0"
@@ -0,0 +1,64 @@
+import io
+from types import SimpleNamespace
+
+from botocore.awsrequest import HeadersDict
+from PIL import Image
+
+from app import engine, metrics
+from tests.helpers import KEY
+
+
+def _sample(name, **labels):
+    return metrics.registry.get_sample_value(name, labels) or 0.0
+
+
+def jpeg_bytes() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (300, 200), "red").save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_engine_reports_stage_timings():
+    timings = {}
+
+    engine.add_white_bg(jpeg_bytes(), 1.3, timings=timings)
+
+    assert set(timings) == {"decode", "composite", "encode"}
+    assert all(seconds >= 0 for seconds in timings.values())
+
+
+def test_metrics_endpoint_reports_stages_and_requests(client, s3_client):
+    encodes = _sample("image_framer_stage_seconds_count", stage="encode")
+    uploads = _sample("image_framer_stage_seconds_count", stage="upload")
+
+    assert client.get(f"/s3/file/{KEY}", params={"w": 64}).status_code == 200
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "image_framer_http_requests_in_flight" in response.text
+    assert "image_framer_threadpool_tasks" in response.text
+    assert _sample("image_framer_stage_seconds_count", stage="encode") == encodes + 1
+    assert _sample("image_framer_stage_seconds_count", stage="upload") == uploads + 1
+    assert _sample(
+        "image_framer_http_request_duration_seconds_count",
+        method="GET", handler="get_file_by_key", status="200",
+    ) >= 1
+
+
+def test_s3_hooks_count_calls_and_bytes():
+    sent = _sample("image_framer_s3_bytes_total", direction="sent")
+    received = _sample("image_framer_s3_bytes_total", direction="received")
+    calls = _sample("image_framer_s3_calls_total", operation="GetObject", status="200")
+    model = SimpleNamespace(name="GetObject")
+
+    metrics._on_s3_send(SimpleNamespace(headers=HeadersDict({"Content-Length": "10"})))
+    metrics._on_s3_call(
+        SimpleNamespace(status_code=200, headers={"content-length": "1234"}), {}, model
+    )
+
+    assert _sample("image_framer_s3_bytes_total", direction="sent") == sent + 10
+    assert _sample("image_framer_s3_bytes_total", direction="received") == received + 1234
+    assert _sample(
+        "image_framer_s3_calls_total", operation="GetObject", status="200"
+    ) == calls + 1
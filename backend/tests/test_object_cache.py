@@ -0,0 +1,149 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.object_cache import ObjectCache
+from app.routers import editHandler, s3Handler
+from app.s3 import S3BucketService
+from tests.helpers import KEY, InMemoryClient, image_bytes
+
+LARGE_KEY = "1c9a2d9f-9e2d-4d4f-8b74-3e1e7c4c2a8b.jpg"
+SMALL = bytes(range(256)) * 4
+LARGE = bytes(range(256)) * 64
+
+
+@pytest.fixture()
+def cache(monkeypatch, tmp_path):
+    object_cache = ObjectCache(
+        memory_max_bytes=4096,
+        memory_max_object_bytes=2048,
+        disk_dir=tmp_path / "cache",
+        disk_max_bytes=40000,
+        max_object_bytes=20000,
+    )
+    monkeypatch.setattr(s3Handler, "object_cache", object_cache)
+    monkeypatch.setattr(editHandler, "object_cache", object_cache)
+    yield object_cache
+    object_cache.clear()
+
+
+@pytest.fixture()
+def s3_client(monkeypatch):
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    service._client = InMemoryClient({KEY: SMALL, LARGE_KEY: LARGE, "notes.txt": b"hello"})
+    monkeypatch.setattr(s3Handler, "s3", service)
+    return service._client
+
+
+def test_tiers_and_lru_eviction(cache):
+    for n in range(3):
+        cache.put(f"small-{n}", b"x" * 1500, "image/jpeg")
+    cache.put("large", b"y" * 16000, "image/jpeg")
+    cache.put("huge", b"z" * 30000, "image/jpeg")
+
+    assert cache.get("small-0") is None
+    assert cache.get("small-2").data == b"x" * 1500
+    large = cache.get("large")
+    assert large.data is None and large.path.read_bytes() == b"y" * 16000
+    assert cache.get("huge") is None
+    assert cache.stats()["evictions"] == 1
+
+    for n in range(2):
+        cache.put(f"large-{n}", b"y" * 16000, "image/jpeg")
+    assert cache.get("large") is None
+    assert not large.path.exists()
+
+
+def test_reads_go_through_cache(cache, s3_client):
+    client = TestClient(app)
+
+    first = client.get(f"/s3/file/{KEY}")
+    s3_client.calls.clear()
+    second = client.get(f"/s3/file/{KEY}")
+    partial = client.get(f"/s3/file/{KEY}", headers={"Range": "bytes=0-9"})
+    not_modified = client.get(f"/s3/file/{KEY}", headers={"If-None-Match": '"abc123"'})
+
+    assert second.content == first.content == SMALL
+    assert second.headers["etag"] == '"abc123"'
+    assert partial.status_code == 206 and partial.content == SMALL[:10]
+    assert not_modified.status_code == 304
+    assert s3_client.calls == []
+
+
+def test_large_objects_are_served_from_disk(cache, s3_client):
+    client = TestClient(app)
+
+    client.get(f"/s3/file/{LARGE_KEY}")
+    s3_client.calls.clear()
+    full = client.get(f"/s3/file/{LARGE_KEY}")
+    partial = client.get(f"/s3/file/{LARGE_KEY}", headers={"Range": "bytes=100-199"})
+
+    assert full.content == LARGE
+    assert full.headers["etag"] == '"abc123"'
+    assert partial.status_code == 206 and partial.content == LARGE[100:200]
+    assert s3_client.calls == []
+    assert cache.stats()["disk_entries"] == 1
+
+
+def test_evicted_disk_file_falls_back_to_s3(cache, s3_client):
+    client = TestClient(app)
+    client.get(f"/s3/file/{LARGE_KEY}")
+    cache.get(LARGE_KEY).path.unlink()
+    s3_client.calls.clear()
+
+    response = client.get(f"/s3/file/{LARGE_KEY}")
+
+    assert response.status_code == 200
+    assert response.content == LARGE
+    assert response.headers["etag"] == '"abc123"'
+    assert s3_client.calls
+
+
+def test_disk_entry_without_etag_is_read_from_s3(cache, s3_client):
+    client = TestClient(app)
+    cache.put(LARGE_KEY, LARGE, "image/jpeg")
+
+    first = client.get(f"/s3/file/{LARGE_KEY}")
+    s3_client.calls.clear()
+    second = client.get(f"/s3/file/{LARGE_KEY}")
+
+    assert first.headers["etag"] == second.headers["etag"] == '"abc123"'
+    assert cache.get(LARGE_KEY).etag == '"abc123"'
+    assert s3_client.calls == []
+
+
+def test_mutable_keys_are_not_cached(cache, s3_client):
+    client = TestClient(app)
+    client.get("/s3/file/notes.txt")
+    client.get("/s3/file/notes.txt")
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_edit_results_are_cached_on_upload(cache, client):
+    response = client.post(
+        "/edit/add-white-bg/",
+        files={"file": ("test.png", image_bytes(), "image/png")},
+    )
+    key = response.json()["url"].rsplit("/", 1)[1]
+    cached = cache.get(key)
+    assert cached.data == editHandler.s3.objects[0][1]
+    assert cached.content_type == "image/jpeg"
+    assert cached.last_modified <= datetime.datetime.now(datetime.timezone.utc)
+
+
+def test_stale_disk_directories_are_pruned(cache, tmp_path):
+    cache.put(LARGE_KEY, LARGE, "image/jpeg")
+    live = cache._root()
+    other = ObjectCache(4096, 2048, tmp_path / "cache", 40000, 20000)
+    other.put(LARGE_KEY, LARGE, "image/jpeg")
+    dead = other._root()
+    # A process that died released its lock without removing the directory.
+    other._root_lock_file.close()
+
+    assert cache.prune_stale() == 1
+
+    assert live.is_dir() and not dead.exists()
+    cache.clear()
+    assert not live.exists()
@@ -0,0 +1,102 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.routers import s3Handler
+from app.s3 import S3BucketService
+from tests.helpers import InMemoryClient
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+class DeletingClient(InMemoryClient):
+    def delete_object(self, Bucket, Key):
+        self.calls.append(("delete_object", Key))
+        self.objects.pop(Key, None)
+
+
+@pytest.fixture()
+def s3_client(monkeypatch):
+    # A separate public endpoint makes presigning use a real boto3 client,
+    # which signs offline, while S3 calls go to the in-memory client.
+    service = S3BucketService(
+        "bucket", "http://minio:9000", "key", "secret",
+        presign_endpoint="http://localhost:9000",
+    )
+    service._client = DeletingClient({"photo.jpg": b"\xff\xd8\xff" + b"\x00" * 10})
+    monkeypatch.setattr(s3Handler, "s3", service)
+    return service._client
+
+
+@pytest.fixture()
+def client(s3_client, session_factory):
+    return TestClient(app)
+
+
+def _presign(client, **overrides):
+    body = {"filename": "photo.PNG", "content_type": "image/png", "size": len(PNG), **overrides}
+    return client.post("/s3/presign", json=body)
+
+
+def test_presigned_post_and_completion(client, s3_client):
+    issued = _presign(client).json()
+
+    assert issued["method"] == "POST"
+    assert issued["url"].startswith("http://localhost:9000/bucket")
+    assert issued["key"].endswith(".png")
+    assert issued["fields"]["Content-Type"] == "image/png"
+    assert "policy" in issued["fields"]
+
+    early = client.post("/s3/presign/complete", json={"key": issued["key"]})
+    s3_client.objects[issued["key"]] = PNG
+    done = client.post("/s3/presign/complete", json={"key": issued["key"]})
+    again = client.post("/s3/presign/complete", json={"key": issued["key"]})
+
+    assert early.status_code == 409
+    assert done.json()["data"]["size"] == len(PNG)
+    assert done.json()["data"]["url"].endswith(issued["key"])
+    assert again.json()["data"] == done.json()["data"]
+    assert ("get_object", "bytes=0-31") in s3_client.calls
+
+
+def test_presigned_put_signs_type_and_length(client):
+    issued = _presign(client, method="put").json()
+
+    assert issued["method"] == "PUT"
+    assert issued["headers"] == {"Content-Type": "image/png"}
+    signed = parse_qs(urlparse(issued["url"]).query)["X-Amz-SignedHeaders"][0]
+    assert "content-type" in signed and "content-length" in signed
+
+
+def test_presign_rejects_bad_requests(client):
+    assert _presign(client, content_type="text/html").status_code == 415
+    assert _presign(client, size=settings.MAX_FILE_SIZE + 1).status_code == 413
+    assert _presign(client, method="get").status_code == 400
+    assert client.post("/s3/presign/complete", json={"key": "unknown"}).status_code == 404
+
+
+def test_completion_deletes_mismatched_object(client, s3_client):
+    issued = _presign(client).json()
+    s3_client.objects[issued["key"]] = b"<html>not a png</html>"
+
+    response = client.post("/s3/presign/complete", json={"key": issued["key"]})
+
+    assert response.status_code == 415
+    assert issued["key"] not in s3_client.objects
+    assert client.post("/s3/presign/complete", json={"key": issued["key"]}).status_code == 404
+
+
+def test_redirect_mode(client, s3_client, monkeypatch):
+    monkeypatch.setattr(settings, "S3_REDIRECT_DOWNLOADS", True)
+
+    response = client.get("/s3/file/photo.jpg", follow_redirects=False)
+
+    assert response.status_code == 302
+    location = urlparse(response.headers["location"])
+    assert location.netloc == "localhost:9000"
+    assert location.path == "/bucket/photo.jpg"
+    assert "X-Amz-Signature" in response.headers["location"]
+    assert s3_client.calls == []
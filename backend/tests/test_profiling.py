@@ -0,0 +1,75 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app
+from app.profiling import ProfileMiddleware, active, profiled
+from tests.helpers import KEY
+
+SECRET = "let-me-profile"
+
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 30), "blue").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture()
+def profiled_app(tmp_path):
+    return ProfileMiddleware(app, secret=SECRET, output_dir=tmp_path / "profiles")
+
+
+def test_sync_edit_route_report_is_saved(client, profiled_app, tmp_path):
+    profiled = TestClient(profiled_app)
+
+    response = profiled.post(
+        "/edit/add-white-bg/",
+        files={"file": ("test.png", _png(), "image/png")},
+        headers={"X-Profile-Token": SECRET},
+    )
+
+    assert response.status_code == 200
+    report_id = response.headers["X-Profile-Report"]
+    report = (tmp_path / "profiles" / f"{report_id}.txt").read_text()
+    assert "process_add_white_bg" in report
+    assert "allocation sites" in report
+    assert (tmp_path / "profiles" / f"{report_id}.prof").stat().st_size > 0
+
+
+def test_async_s3_route_report_is_inline(s3_client, profiled_app):
+    client = TestClient(profiled_app)
+
+    response = client.get(
+        f"/s3/file/{KEY}",
+        params={"w": 64},
+        headers={"X-Profile-Token": SECRET, "X-Profile-Output": "inline"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Profile-Status"] == "200"
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "get_file_by_key" in response.text
+
+
+def test_wrong_token_is_not_profiled(s3_client, profiled_app, tmp_path):
+    client = TestClient(profiled_app)
+
+    response = client.get(f"/s3/file/{KEY}", headers={"X-Profile-Token": "guess"})
+
+    assert response.status_code == 200
+    assert "X-Profile-Report" not in response.headers
+    assert not (tmp_path / "profiles").exists()
+
+
+def test_profiled_keeps_sync_endpoints_sync():
+    def endpoint(value: int) -> bool:
+        return active()
+
+    wrapped = profiled(endpoint)
+
+    assert wrapped(1) is False
+    assert wrapped.__wrapped__ is endpoint
+    assert profiled(wrapped) is wrapped
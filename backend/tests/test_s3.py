@@ -0,0 +1,186 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import app
+from app.routers import s3Handler
+from app.s3 import S3BucketService, s3_bucket_service_factory
+from tests.helpers import DedupClient
+
+
+def _settings(**overrides) -> Settings:
+    values = {
+        "BUCKET_NAME": "test-bucket",
+        "ENDPOINT": "http://localhost:9000",
+        "ACCESS_KEY": "key",
+        "SECRET_KEY": "secret",
+    }
+    values.update(overrides)
+    return Settings(**values)
+
+
+def test_factory_returns_shared_service():
+    settings = _settings()
+    assert s3_bucket_service_factory(settings) is s3_bucket_service_factory(settings)
+    assert s3_bucket_service_factory(settings) is not s3_bucket_service_factory(
+        _settings(BUCKET_NAME="other-bucket")
+    )
+
+
+def test_client_is_created_once_and_configured():
+    service = s3_bucket_service_factory(_settings(BUCKET_NAME="pool-bucket", S3_MAX_POOL_CONNECTIONS=7))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = list(pool.map(lambda _: service.client, range(16)))
+
+    assert all(client is clients[0] for client in clients)
+    assert clients[0].meta.config.max_pool_connections == 7
+
+
+def test_client_reused_across_calls(monkeypatch):
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    created = []
+    original = service.create_s3_client
+
+    def counting_create():
+        created.append(True)
+        return original()
+
+    monkeypatch.setattr(service, "create_s3_client", counting_create)
+    first = service.client
+
+    assert service.client is first
+    assert len(created) == 1
+
+
+class SlowBody:
+    def __init__(self, data: bytes, delay: float):
+        self._data = io.BytesIO(data)
+        self._delay = delay
+
+    def read(self, size=-1):
+        time.sleep(self._delay)
+        return self._data.read(size)
+
+    def close(self):
+        pass
+
+
+class SlowClient:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def get_object(self, Bucket, Key):
+        time.sleep(self.delay)
+        return {
+            "Body": SlowBody(b"y" * 10, self.delay / 4),
+            "ContentType": "image/jpeg",
+            "ContentLength": 10,
+        }
+
+
+def test_concurrent_slow_downloads_do_not_serialize(monkeypatch):
+    delay = 0.3
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret", io_workers=8)
+    service._client = SlowClient(delay)
+    monkeypatch.setattr(s3Handler, "s3", service)
+
+    async def download_all(count):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.get(f"/s3/file/{n}.jpg") for n in range(count))
+            )
+
+    started = time.perf_counter()
+    responses = asyncio.run(download_all(4))
+    elapsed = time.perf_counter() - started
+
+    assert all(r.status_code == 200 and r.content == b"y" * 10 for r in responses)
+    # Serialized downloads would take at least 4 * delay.
+    assert elapsed < 2.5 * delay
+
+
+def test_upload_deduplicates_identical_content(monkeypatch):
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    service._client = DedupClient()
+    monkeypatch.setattr(s3Handler, "s3", service)
+    client = TestClient(app)
+    content = b"\x89PNG\r\n\x1a\nsame bytes"
+    files = {"file": ("photo.PNG", content, "image/png")}
+
+    first = client.post("/s3/upload", files=files).json()["data"]
+    second = client.post("/s3/upload", files=files).json()["data"]
+
+    assert first["s3_filename"] == second["s3_filename"]
+    assert first["s3_filename"].endswith(".png")
+    assert first["deduplicated"] is False
+    assert second["deduplicated"] is True
+    assert list(service._client.objects.values()) == [content]
+
+
+def test_upload_dedupe_ignores_client_extension(monkeypatch):
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    service._client = DedupClient()
+    monkeypatch.setattr(s3Handler, "s3", service)
+    client = TestClient(app)
+    content = b"\xff\xd8\xff\xe0same jpeg bytes"
+
+    names = []
+    for filename in ("photo.jpeg", "photo.JPG", "photo"):
+        response = client.post("/s3/upload", files={"file": (filename, content, "image/jpeg")})
+        names.append(response.json()["data"]["s3_filename"])
+
+    assert len(set(names)) == 1
+    assert names[0].endswith(".jpg")
+    assert list(service._client.objects.values()) == [content]
+
+
+class PagedListClient:
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        self.requests = []
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None):
+        self.requests.append(MaxKeys)
+        matching = [k for k in self.keys if k.startswith(Prefix)]
+        start = int(ContinuationToken or 0)
+        page = matching[start:start + MaxKeys]
+        truncated = start + MaxKeys < len(matching)
+        response = {"IsTruncated": truncated, "KeyCount": len(page)}
+        if page:
+            response["Contents"] = [{"Key": k} for k in page]
+        if truncated:
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+
+def test_iter_object_keys_walks_every_page():
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    service._client = PagedListClient([f"{n:04d}.jpg" for n in range(2500)])
+
+    keys = list(service.iter_object_keys())
+
+    assert len(keys) == 2500
+    assert service._client.requests == [1000, 1000, 1000]
+
+
+def test_list_endpoint_paginates(monkeypatch):
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    service._client = PagedListClient(["a/1", "a/2", "a/3", "b/1"])
+    monkeypatch.setattr(s3Handler, "s3", service)
+    client = TestClient(app)
+
+    first = client.get("/s3/list", params={"prefix": "a/", "page_size": 2}).json()
+    second = client.get(
+        "/s3/list",
+        params={"prefix": "a/", "page_size": 2, "continuation_token": first["next_token"]},
+    ).json()
+
+    assert first["keys"] == ["a/1", "a/2"]
+    assert second == {"keys": ["a/3"], "next_token": None}
+    assert client.get("/s3/list", params={"page_size": 5000}).status_code == 422
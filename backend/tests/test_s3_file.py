@@ -0,0 +1,122 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.object_cache import object_cache
+from app.routers import s3Handler
+from app.s3 import S3BucketService
+from tests.helpers import KEY, InMemoryClient
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture()
+def s3_client(monkeypatch):
+    object_cache.clear()
+    service = S3BucketService("bucket", "http://localhost:9000", "key", "secret")
+    service._client = InMemoryClient({KEY: DATA, "notes.txt": b"hello"})
+    monkeypatch.setattr(s3Handler, "s3", service)
+    return service._client
+
+
+@pytest.fixture()
+def client(s3_client):
+    return TestClient(app)
+
+
+def test_full_get_passes_through_validators(client, s3_client):
+    response = client.get(f"/s3/file/{KEY}")
+
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["etag"] == '"abc123"'
+    assert response.headers["last-modified"] == "Thu, 02 Jan 2025 03:04:05 GMT"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+    assert [name for name, _ in s3_client.calls] == ["get_object"]
+
+
+def test_non_uuid_key_is_revalidated(client):
+    response = client.get("/s3/file/notes.txt")
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_if_none_match_returns_304(client, s3_client):
+    response = client.get(f"/s3/file/{KEY}", headers={"If-None-Match": '"abc123"'})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == '"abc123"'
+    assert [name for name, _ in s3_client.calls] == ["head_object"]
+
+
+def test_if_modified_since_returns_304(client):
+    response = client.get(
+        f"/s3/file/{KEY}", headers={"If-Modified-Since": "Thu, 02 Jan 2025 03:04:05 GMT"}
+    )
+    assert response.status_code == 304
+
+    response = client.get(
+        f"/s3/file/{KEY}", headers={"If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    )
+    assert response.status_code == 200
+
+
+def test_single_range_uses_ranged_get(client, s3_client):
+    response = client.get(f"/s3/file/{KEY}", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.content == DATA[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(DATA)}"
+    assert ("get_object", "bytes=10-19") in s3_client.calls
+
+
+def test_suffix_range(client):
+    response = client.get(f"/s3/file/{KEY}", headers={"Range": "bytes=-5"})
+
+    assert response.status_code == 206
+    assert response.content == DATA[-5:]
+
+
+def test_multi_range_returns_multipart(client):
+    response = client.get(f"/s3/file/{KEY}", headers={"Range": "bytes=0-3, 100-103"})
+
+    assert response.status_code == 206
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1]
+    assert int(response.headers["content-length"]) == len(response.content)
+    parts = response.content.split(f"--{boundary}".encode())
+    assert DATA[0:4] in parts[1]
+    assert DATA[100:104] in parts[2]
+    assert parts[-1].strip() == b"--"
+
+
+def test_unsatisfiable_range_returns_416(client):
+    response = client.get(f"/s3/file/{KEY}", headers={"Range": "bytes=5000-6000"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+def test_if_range_mismatch_sends_full_object(client):
+    response = client.get(
+        f"/s3/file/{KEY}", headers={"Range": "bytes=0-3", "If-Range": '"stale"'}
+    )
+
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_missing_object_returns_404(client):
+    assert client.get("/s3/file/missing.jpg").status_code == 404
+    assert client.get("/s3/file/missing.jpg", headers={"Range": "bytes=0-1"}).status_code == 404
+
+
+def test_too_many_ranges_send_full_object(client, s3_client):
+    many = ", ".join(f"{i * 10}-{i * 10 + 1}" for i in range(50))
+    response = client.get(f"/s3/file/{KEY}", headers={"Range": f"bytes={many}"})
+
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert not [call for call in s3_client.calls if call[0] == "get_object" and call[1]]
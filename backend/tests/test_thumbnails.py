@@ -0,0 +1,128 @@
+import asyncio
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import engine
+from app.config import settings
+from app.derivatives import SingleFlight, default_format, derivative_locks, derived_key
+from app.main import app
+from app.object_cache import object_cache
+from app.routers import s3Handler
+from tests.helpers import KEY, jpeg_bytes
+
+
+@pytest.fixture()
+def client(s3_client):
+    return TestClient(app)
+
+
+def test_resize_contain_and_cover():
+    data = jpeg_bytes()
+
+    contained = Image.open(io.BytesIO(engine.resize(data, 256, 256)))
+    covered = Image.open(io.BytesIO(engine.resize(data, 256, 256, fit="cover")))
+    untouched = Image.open(io.BytesIO(engine.resize(data, 1280)))
+
+    assert contained.size == (256, 128)
+    assert covered.size == (256, 256)
+    assert untouched.size == (800, 400)
+
+
+def test_derived_key_is_deterministic():
+    assert derived_key(KEY, 256, None, "contain", "webp") == f"derived/{KEY}/w256-h0-contain.webp"
+    assert default_format(KEY) == "jpeg"
+    assert default_format("abc.png") == "jpeg"
+
+
+def test_thumbnail_is_generated_once_then_read_from_s3(client, s3_client):
+    first = client.get(f"/s3/file/{KEY}", params={"w": 256})
+    s3_client.calls.clear()
+    second = client.get(f"/s3/file/{KEY}", params={"w": 256})
+
+    assert first.status_code == 200
+    assert Image.open(io.BytesIO(first.content)).size == (256, 128)
+    assert "immutable" in first.headers["cache-control"]
+    assert second.content == first.content
+    assert f"derived/{KEY}/w256-h0-contain.jpg" in s3_client.objects
+    assert s3_client.calls == []
+
+    object_cache.clear()
+    third = client.get(f"/s3/file/{KEY}", params={"w": 256})
+    assert third.content == first.content
+    assert [name for name, _ in s3_client.calls] == ["get_object"]
+
+
+def test_format_conversion(client, s3_client):
+    if "webp" not in engine.available_formats():
+        pytest.skip("Pillow built without WebP")
+    response = client.get(f"/s3/file/{KEY}", params={"w": 128, "h": 128, "fit": "cover", "format": "webp"})
+
+    image = Image.open(io.BytesIO(response.content))
+    assert image.format == "WEBP"
+    assert image.size == (128, 128)
+
+
+@pytest.mark.parametrize("params", [
+    {"w": 300},
+    {"w": 256, "fit": "stretch"},
+    {"w": 256, "fit": "cover"},
+    {"w": 256, "format": "gif"},
+])
+def test_invalid_thumbnail_params_are_refused(client, s3_client, params):
+    assert client.get(f"/s3/file/{KEY}", params=params).status_code == 400
+    assert len(s3_client.objects) == 1
+
+
+def test_thumbnail_of_non_image_is_refused(client, s3_client):
+    pdf_key = "0b8f1c8e-8d1c-4c3e-9a63-2d0d6b3b1f7b.pdf"
+    s3_client.objects[pdf_key] = b"%PDF-1.7 not an image"
+    s3_client.content_types[pdf_key] = "application/pdf"
+    s3_client.objects["corrupt.jpg"] = b"\xff\xd8\xff not really a jpeg"
+
+    assert client.get(f"/s3/file/{pdf_key}", params={"w": 256}).status_code == 415
+    assert client.get("/s3/file/corrupt.jpg", params={"w": 256}).status_code == 415
+    assert not [key for key in s3_client.objects if key.startswith("derived/")]
+
+
+def test_redirect_mode_heads_existing_derivative_outside_lock(client, s3_client, monkeypatch):
+    monkeypatch.setattr(settings, "S3_REDIRECT_DOWNLOADS", True)
+    # Presigning then uses a real boto3 client, which signs offline.
+    monkeypatch.setattr(s3Handler.s3, "presign_endpoint", "http://public:9000")
+    assert client.get(f"/s3/file/{KEY}", params={"w": 256}, follow_redirects=False).status_code == 302
+    s3_client.calls.clear()
+
+    locked = []
+    original_lock = derivative_locks.lock
+    monkeypatch.setattr(derivative_locks, "lock", lambda key: locked.append(key) or original_lock(key))
+    response = client.get(f"/s3/file/{KEY}", params={"w": 256}, follow_redirects=False)
+
+    assert response.status_code == 302
+    assert s3_client.calls == [("head_object", None)]
+    assert locked == []
+
+
+def test_thumbnail_of_missing_object_returns_404(client):
+    assert client.get("/s3/file/missing.jpg", params={"w": 256}).status_code == 404
+
+
+def test_single_flight_runs_one_generation():
+    locks = SingleFlight()
+    generations = []
+    done = set()
+
+    async def request(key):
+        async with locks.lock(key):
+            if key not in done:
+                await asyncio.sleep(0.01)
+                generations.append(key)
+                done.add(key)
+
+    async def main():
+        await asyncio.gather(*(request("a") for _ in range(5)), request("b"))
+
+    asyncio.run(main())
+    assert sorted(generations) == ["a", "b"]
+    assert len(locks) == 0
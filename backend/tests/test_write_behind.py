@@ -0,0 +1,75 @@
+import threading
+
+from sqlalchemy import func, select
+
+from app.models import ProcessedImage
+from app.routers import editHandler
+from app.write_behind import WriteBehindQueue
+from tests.helpers import image_bytes
+
+
+def _count(session_factory) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(ProcessedImage))
+
+
+def test_flush_commits_queued_rows_in_one_transaction(session_factory):
+    queue = WriteBehindQueue(session_factory, interval=60, batch_size=1000)
+    for n in range(3):
+        queue.submit(f"{n}.png", f"/s3/file/{n}.jpg", f"key-{n}")
+
+    assert _count(session_factory) == 0
+    assert queue.lookup("key-1") == "/s3/file/1.jpg"
+    assert queue.flush() == 3
+    assert queue.commits == 1
+    assert _count(session_factory) == 3
+    assert queue.lookup("key-1") is None
+
+
+def test_duplicate_cache_keys_are_dropped(session_factory):
+    queue = WriteBehindQueue(session_factory, interval=60, batch_size=1000)
+    queue.submit("a.png", "/s3/file/a.jpg", "same")
+    assert queue.submit("b.png", "/s3/file/b.jpg", "same") == "/s3/file/a.jpg"
+    queue.flush()
+
+    queue.submit("c.png", "/s3/file/c.jpg", "same")
+    queue.submit("d.png", "/s3/file/d.jpg", "other")
+
+    assert queue.flush() == 1
+    assert _count(session_factory) == 2
+
+
+def test_background_thread_commits_full_batches(session_factory):
+    queue = WriteBehindQueue(session_factory, interval=60, batch_size=2)
+    committed = threading.Event()
+    original_flush = queue.flush
+
+    def flush_and_signal():
+        written = original_flush()
+        if written:
+            committed.set()
+        return written
+
+    queue.flush = flush_and_signal
+    queue.start()
+    try:
+        queue.submit("a.png", "/s3/file/a.jpg", "a")
+        queue.submit("b.png", "/s3/file/b.jpg", "b")
+        assert committed.wait(5)
+    finally:
+        queue.stop()
+    assert _count(session_factory) == 2
+
+
+def test_edit_endpoint_uses_write_behind(client, session_factory, monkeypatch):
+    queue = WriteBehindQueue(session_factory, interval=60, batch_size=1000)
+    monkeypatch.setattr(editHandler, "write_behind", queue)
+    files = {"file": ("test.png", image_bytes("yellow"), "image/png")}
+
+    first = client.post("/edit/add-white-bg/", files=files).json()
+    second = client.post("/edit/add-white-bg/", files=files).json()
+
+    assert first["url"] == second["url"]
+    assert _count(session_factory) == 0
+    queue.flush()
+    assert _count(session_factory) == 1
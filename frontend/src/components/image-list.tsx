@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import { Alert, AlertTitle } from "@/components/ui/alert";
 import { AlertCircleIcon } from "lucide-react";
 import { apiPath } from "@/lib/api";
+import { Button } from "@/components/ui/button";
 import { Card, CardContent } from "@/components/ui/card";
 import {
   Carousel,
@@ -25,17 +26,40 @@ interface Image {
   original_filename: string;
 }
 
+/**
+ * Fetches one page of processed images.
+ *
+ * @param {string | null} cursor - The X-Next-Cursor of the previous page, or
+ *   null for the first page.
+ * @returns {Promise<{ images: Image[]; nextCursor: string | null }>} The
+ *   images of the page and the cursor of the next one, null on the last page.
+ */
+const fetchPage = async (
+  cursor: string | null,
+): Promise<{ images: Image[]; nextCursor: string | null }> => {
+  const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+  const res = await fetch(apiPath(`/api/files/list${query}`));
+
+  if (!res.ok) {
+    throw new Error(`HTTP error: Status ${res.status}`);
+  }
+
+  return { images: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
+};
+
 /**
  * A component that fetches and displays a list of processed images.
  *
- * It handles loading and error states, and renders a list of links
- * to the processed images.
+ * It handles loading and error states, and renders the first page of
+ * images; further pages are fetched on demand with the "Load more" button.
  *
  * @returns {JSX.Element} The rendered ImageList component.
  */
 export const ImageList = () => {
   const [data, setData] = useState<Image[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<Error | null>(null);
   const [api, setApi] = useState<CarouselApi>();
   const [current, setCurrent] = useState(0);
@@ -44,14 +68,9 @@ export const ImageList = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const res = await fetch(apiPath(`/api/files/list`));
-
-        if (!res.ok) {
-          throw new Error(`HTTP error: Status ${res.status}`);
-        }
-
-        const jsonData = await res.json();
-        setData(jsonData);
+        const page = await fetchPage(null);
+        setData(page.images);
+        setNextCursor(page.nextCursor);
         setError(null);
       } catch (err) {
         setError(err as Error);
@@ -63,6 +82,22 @@ export const ImageList = () => {
     fetchData();
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) {
+      return;
+    }
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      setData((images) => [...images, ...page.images]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err as Error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (!api) {
       return;
@@ -74,6 +109,10 @@ export const ImageList = () => {
     api.on("select", () => {
       setCurrent(api.selectedScrollSnap() + 1);
     });
+    // Fired when "Load more" adds slides.
+    api.on("reInit", () => {
+      setCount(api.scrollSnapList().length);
+    });
   }, [api]);
 
   if (loading) {
@@ -101,7 +140,7 @@ export const ImageList = () => {
                 <CardContent className="flex aspect-square items-center justify-center p-6">
                   <div className="text-center">
                     <img 
-                      src={apiPath(`/api${image.processed_url}`)} 
+                      src={apiPath(`/api${image.processed_url}?w=640`)} 
                       alt={image.original_filename}
                       className="max-w-full max-h-full object-contain"
                     />
@@ -120,6 +159,16 @@ export const ImageList = () => {
           Image {current} of {count}
         </div>
       )}
+      {nextCursor && (
+        <Button
+          variant="secondary"
+          className="w-full cursor-pointer"
+          disabled={loadingMore}
+          onClick={loadMore}
+        >
+          {loadingMore ? "Loading..." : "Load more"}
+        </Button>
+      )}
     </div>
   );
 };